@@ -0,0 +1,523 @@
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from hospital_system import (Appointment, BulkImporter, CredentialStore, Doctor, HospitalManagementSystem,
+                             IdGenerator, JsonStorage, Medicine, Nurse, PasswordHasher, Patient, Prescription,
+                             ROLE_POLICY, Receptionist, SqliteStorage)
+
+# ==============================================
+# أدوات مساعدة
+# ==============================================
+
+def _without_slots(cls):
+    # نسخة من الفئة تخزن خصائصها في __dict__ كما كانت قبل __slots__
+    namespace = {name: value for name, value in vars(cls).items()
+                 if name not in cls.__slots__ and name != '__slots__'}
+    return type(cls.__name__, (), namespace)
+
+def _measure(factory, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # نطرح حجم القائمة نفسها
+    return (after - before - objects.__sizeof__()) / count
+
+def _print_header(title):
+    print()
+    print(title)
+    print("-" * len(title))
+
+# ==============================================
+# قياس الذاكرة لكل سجل
+# ==============================================
+
+def bench_memory(count):
+    factories = {
+        Patient: lambda cls, i: cls(f"P{i:07d}", "Ahmed Mohamed", 35, "Male", "01001234567",
+                                    "Cairo - New Cairo", "Penicillin allergy"),
+        Doctor: lambda cls, i: cls(f"D{i:07d}", "Dr. Khalid Abdelrahman", "Internal Medicine",
+                                   "01001112233", "khalid@hospital.com", "Sun-Thu 9AM-5PM"),
+        Medicine: lambda cls, i: cls(f"M{i:07d}", "Paracetamol", 15.0, 500, "Analgesics", "500mg"),
+    }
+    
+    _print_header(f"Memory per record ({count} records)")
+    print(f"{'Record':<11}{'__dict__':>14}{'__slots__':>14}{'Saved':>10}")
+    for cls, factory in factories.items():
+        legacy_cls = _without_slots(cls)
+        before = _measure(lambda i: factory(legacy_cls, i), count)
+        after = _measure(lambda i: factory(cls, i), count)
+        print(f"{cls.__name__:<11}{before:>12.0f} B{after:>12.0f} B{1 - after / before:>9.0%}")
+    
+    # المواعيد كانت قواميس حرة تُخزن مع أسماء المريض والطبيب
+    before = _measure(lambda i: {
+        'patient_id': "P0000001", 'patient_name': "Ahmed Mohamed",
+        'doctor_id': "D0000001", 'doctor_name': "Dr. Khalid Abdelrahman",
+        'date': "2026-10-18", 'time': "10:30", 'reason': "Follow-up",
+        'appointment_id': f"A{i:013d}", 'status': "Scheduled", 'created_by': "reception",
+    }, count)
+    after = _measure(lambda i: Appointment(f"A{i:013d}", "P0000001", "D0000001", "2026-10-18", "10:30",
+                                           "Follow-up", "Scheduled", "reception"), count)
+    print(f"{'Appointment':<11}{before:>12.0f} B{after:>12.0f} B{1 - after / before:>9.0%}")
+
+# ==============================================
+# تقرير سجل المرضى: نسخ القوائم مقابل العرض للقراءة فقط
+# ==============================================
+
+class _CopyingPatient(Patient):
+    # السلوك القديم: نسخة كاملة من القائمة عند كل وصول
+    __slots__ = ()
+    
+    @property
+    def appointments(self):
+        return self._appointments.copy()
+    
+    @property
+    def prescriptions(self):
+        return self._prescriptions.copy()
+
+def _history_report(patients, appointments, prescriptions):
+    # القوائم تحمل المعرفات كما في النظام، والكائنات تُجلب من السجل
+    visits = 0
+    items = 0
+    for patient in patients:
+        for appointment_id in patient.appointments:
+            visits += appointments[appointment_id].status == 'Completed'
+        for prescription_id in patient.prescriptions:
+            items += len(prescriptions[prescription_id].items)
+    return visits, items
+
+def _history_allocations(patients):
+    # كل ما يعيده الوصول يُحتجز حتى يظهر في القياس ولو كان مؤقتاً في التقرير
+    held = [None] * (2 * len(patients))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for index, patient in enumerate(patients):
+        held[2 * index] = patient.appointments
+        held[2 * index + 1] = patient.prescriptions
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # وصول يعيد كائناً مختلفاً في كل مرة هو نسخة جديدة
+    copies = sum((patient.appointments is not patient.appointments) +
+                 (patient.prescriptions is not patient.prescriptions) for patient in patients)
+    return copies, after - before
+
+def bench_history_report(count):
+    appointments = {f"A{i}": Appointment(f"A{i}", "P0000001", "D001", "2026-10-18", "10:30", status='Completed')
+                    for i in range(24)}
+    prescriptions = {f"RX{i}": Prescription(f"RX{i}", "P0000001", [("M001", 1)], "2026-10-18 10:30:00")
+                     for i in range(6)}
+    
+    _print_header(f"Patient history report ({count} patients, "
+                  f"{len(appointments)} appointments + {len(prescriptions)} prescriptions each)")
+    print(f"{'Variant':<12}{'Time':>10}{'List copies':>14}{'Allocated':>14}{'Peak':>12}")
+    for label, cls in (("list copy", _CopyingPatient), ("read-only", Patient)):
+        patients = []
+        for i in range(count):
+            patient = cls(f"P{i:07d}", "Ahmed Mohamed", 35, "Male", "01001234567")
+            patient._appointments = list(appointments)
+            patient._prescriptions = list(prescriptions)
+            patients.append(patient)
+        
+        elapsed = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            _history_report(patients, appointments, prescriptions)
+            elapsed = min(elapsed, time.perf_counter() - started)
+        
+        # الذروة أثناء تقرير كامل، والمخصص هو مجموع ما يُنشأ عند الوصول للقوائم
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        _history_report(patients, appointments, prescriptions)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        copies, allocated = _history_allocations(patients)
+        print(f"{label:<12}{elapsed * 1000:>8.1f}ms{copies:>14}{allocated / 1024:>11.0f} KB{peak:>10,} B")
+
+# ==============================================
+# توليد المعرفات
+# ==============================================
+
+def _generate_ids(count):
+    generator = IdGenerator("A")
+    return [generator.next_id() for _ in range(count)]
+
+def bench_ids(count):
+    _print_header(f"ID generation ({count} ids per run)")
+    
+    generator = IdGenerator("A")
+    started = time.perf_counter()
+    ids = [generator.next_id() for _ in range(count)]
+    elapsed = time.perf_counter() - started
+    print(f"{'1 thread':<14}{count / elapsed:>12,.0f} ids/s   unique={len(set(ids)) == count}   sorted={ids == sorted(ids)}")
+    
+    threads_count = 8
+    shared = IdGenerator("A")
+    results = [[] for _ in range(threads_count)]
+    def worker(bucket):
+        for _ in range(count // threads_count):
+            bucket.append(shared.next_id())
+    threads = [threading.Thread(target=worker, args=(bucket,)) for bucket in results]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    ids = [value for bucket in results for value in bucket]
+    print(f"{f'{threads_count} threads':<14}{len(ids) / elapsed:>12,.0f} ids/s   unique={len(set(ids)) == len(ids)}")
+    
+    processes_count = 4
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes_count) as pool:
+        batches = pool.map(_generate_ids, [count // processes_count] * processes_count)
+    elapsed = time.perf_counter() - started
+    ids = [value for batch in batches for value in batch]
+    print(f"{f'{processes_count} processes':<14}{len(ids) / elapsed:>12,.0f} ids/s   unique={len(set(ids)) == len(ids)}")
+
+# ==============================================
+# اختبار الضغط: صرف متزامن من مخزون محدود
+# ==============================================
+
+def bench_stress(count):
+    threads_count = 8
+    operations = min(count, 20000)
+    _print_header(f"Concurrent prescriptions ({operations} requests, {threads_count} threads)")
+    
+    with tempfile.TemporaryDirectory() as data_dir:
+        hospital = HospitalManagementSystem(JsonStorage(data_dir))
+        hospital.add_patient({'patient_id': "P1", 'name': "Stress Patient", 'age': 40,
+                              'gender': "Male", 'phone': "01000000000"})
+        initial = {}
+        for i in range(10):
+            medicine_id = f"M{i}"
+            initial[medicine_id] = 1000
+            hospital.add_medicine({'medicine_id': medicine_id, 'name': f"Medicine {i}", 'price': 10.0,
+                                   'quantity': initial[medicine_id], 'category': "General"})
+        # لقطة أولى حتى تُكتب كل عملية في السجل كما في التشغيل الفعلي
+        hospital.save_data()
+        
+        dispensed = [{} for _ in range(threads_count)]
+        negative = []
+        def worker(seed, totals):
+            rng = random.Random(seed)
+            for _ in range(operations // threads_count):
+                # عدة أصناف في الوصفة الواحدة بترتيب عشوائي لإثارة الجمود لو كان الحجز خاطئاً
+                items = [{'medicine_id': f"M{rng.randrange(10)}", 'quantity': rng.randint(1, 5)}
+                         for _ in range(rng.randint(1, 3))]
+                success, _ = hospital.create_prescription({'patient_id': "P1", 'items': items})
+                if success:
+                    for item in items:
+                        totals[item['medicine_id']] = totals.get(item['medicine_id'], 0) + item['quantity']
+                medicine = hospital.get_medicine(items[0]['medicine_id'])
+                if medicine.quantity < 0:
+                    negative.append(medicine.medicine_id)
+        
+        threads = [threading.Thread(target=worker, args=(seed, totals)) for seed, totals in enumerate(dispensed)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        hospital.save_data()
+        
+        consistent = all(
+            hospital.get_medicine(medicine_id).quantity
+            == quantity - sum(totals.get(medicine_id, 0) for totals in dispensed)
+            for medicine_id, quantity in initial.items()
+        )
+        granted = len(hospital.get_prescriptions_list())
+        requested = operations // threads_count * threads_count
+        print(f"{'throughput':<14}{requested / elapsed:>12,.0f} requests/s")
+        print(f"{'granted':<14}{granted:>12,}   rejected={requested - granted:,}")
+        print(f"{'remaining':<14}{sum(m.quantity for m in hospital.get_medicines_list()):>12,}   "
+              f"consistent={consistent}   never_negative={not negative}")
+
+# ==============================================
+# كلفة كل مستوى من مستويات الأمان عند الحفظ
+# ==============================================
+
+def bench_durability(count):
+    patients = min(count, 50000)
+    flushes = 200
+    _print_header(f"Durability modes (snapshot of {patients} patients, {flushes} journal flushes)")
+    print(f"{'mode':<16}{'snapshot':>12}{'flush':>14}")
+    
+    for kind in ("json", "sqlite"):
+        for mode in JsonStorage.DURABILITY_MODES:
+            with tempfile.TemporaryDirectory() as data_dir:
+                if kind == "json":
+                    storage = JsonStorage(data_dir, durability=mode)
+                else:
+                    storage = SqliteStorage(os.path.join(data_dir, "hospital.db"), batch_size=1, durability=mode)
+                hospital = HospitalManagementSystem(storage)
+                for i in range(patients):
+                    hospital.add_patient({'patient_id': f"P{i:07d}", 'name': "Ahmed Mohamed", 'age': 35,
+                                          'gender': "Male", 'phone': "01001234567"})
+                
+                started = time.perf_counter()
+                hospital.save_data()
+                snapshot = time.perf_counter() - started
+                
+                # كل تعديل يُتبع بحفظ كما يفعل الحفظ التلقائي في أسوأ الأحوال
+                started = time.perf_counter()
+                for _ in range(flushes):
+                    hospital.adjust_stock("M001", 1)
+                    hospital.save_data()
+                flush = (time.perf_counter() - started) / flushes
+                storage.close()
+            print(f"{f'{kind}/{mode}':<16}{snapshot * 1000:>10.1f}ms{flush * 1000000:>12.0f}us")
+
+# ==============================================
+# زمن تسجيل الدخول حسب كلفة التجزئة
+# ==============================================
+
+def bench_login(count):
+    logins = min(count, 64)
+    threads_count = 4
+    _print_header(f"Login latency by hashing cost ({logins} logins per setting)")
+    print(f"{'hasher':<24}{'latency':>10}{'1 thread':>12}{f'{threads_count} threads':>14}")
+    
+    settings = [PasswordHasher('pbkdf2_sha256', iterations=iterations) for iterations in (10000, 100000, 600000)]
+    if hasattr(hashlib, 'scrypt'):
+        settings += [PasswordHasher('scrypt', n=n) for n in (2 ** 12, 2 ** 14, 2 ** 15)]
+    
+    # المستخدمون يُنشؤون مرة واحدة ثم تُعاد تجزئة كلمة المرور بكل إعداد
+    users = [Receptionist(f"user{i}", "secret") for i in range(16)]
+    for hasher in settings:
+        store = CredentialStore(hasher)
+        for user in users:
+            user.set_password("secret", hasher)
+            store.add(user)
+        attempts = [users[i % len(users)].username for i in range(logins)]
+        
+        started = time.perf_counter()
+        ok = all(store.authenticate(name, "secret") for name in attempts)
+        single = time.perf_counter() - started
+        with ThreadPoolExecutor(threads_count) as pool:
+            started = time.perf_counter()
+            ok = all(pool.map(lambda name: store.authenticate(name, "secret"), attempts)) and ok
+            threaded = time.perf_counter() - started
+        cost = f"n={hasher.n}" if hasher.algorithm == 'scrypt' else str(hasher.iterations)
+        print(f"{f'{hasher.algorithm} {cost}':<24}{single / logins * 1000:>8.1f}ms{logins / single:>10,.0f}/s"
+              f"{logins / threaded:>12,.0f}/s   ok={ok}")
+
+# ==============================================
+# كلفة فحص الصلاحيات لكل طلب
+# ==============================================
+
+def _legacy_permissions():
+    # ما كانت تفعله get_permissions() قبل تجميع السياسات: قاموس جديد في كل استدعاء
+    return {
+        'manage_patients': True,
+        'manage_doctors': False,
+        'manage_medicines': True,
+        'manage_appointments': True,
+        'manage_users': False,
+        'view_reports': True
+    }
+
+def _check_legacy(user, actions):
+    for action in actions:
+        _legacy_permissions()[action]
+
+def _check_frozen_map(user, actions):
+    for action in actions:
+        user.get_permissions()[action]
+
+def _check_can(user, actions):
+    for action in actions:
+        user.can(action)
+
+def bench_authz(count):
+    _print_header(f"Authorization checks ({count} checks)")
+    user = Nurse("nurse", "nurse123")
+    actions = (ROLE_POLICY.ACTIONS * (count // len(ROLE_POLICY.ACTIONS) + 1))[:count]
+    checks = {
+        'dict per call': _check_legacy,
+        'frozen map': _check_frozen_map,
+        'user.can()': _check_can,
+    }
+    for label, check in checks.items():
+        started = time.perf_counter()
+        check(user, actions)
+        elapsed = time.perf_counter() - started
+        
+        sample = actions[:1000]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        check(user, sample)
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        print(f"{label:<16}{elapsed / count * 1e9:>8.0f} ns/check   peak alloc {peak:>5,} B")
+
+# ==============================================
+# التجميعات: المرور على الكائنات مقابل المخزن العمودي
+# ==============================================
+
+def _walk_aggregates(hospital):
+    value_by_category = {}
+    for medicine in hospital.get_medicines_list():
+        value_by_category[medicine.category] = (value_by_category.get(medicine.category, 0.0)
+                                                + medicine.price * medicine.quantity)
+    ages = {}
+    for patient in hospital.get_patients_list():
+        ages[patient.age // 15] = ages.get(patient.age // 15, 0) + 1
+    specialties = {}
+    for appointment in hospital.get_appointments_list():
+        specialty = hospital.get_doctor(appointment.doctor_id).specialty
+        specialties[specialty] = specialties.get(specialty, 0) + 1
+    return value_by_category, ages, specialties
+
+def _columnar_aggregates(analytics):
+    return (analytics.stock_value_by_category(), analytics.age_distribution(),
+            analytics.appointments_by_specialty())
+
+def bench_analytics(count):
+    appointments = min(count, 20000)
+    _print_header(f"Dashboard aggregates ({count} patients, {count} medicines, {appointments} appointments)")
+    with tempfile.TemporaryDirectory() as data_dir:
+        hospital = HospitalManagementSystem(JsonStorage(data_dir))
+        if hospital.get_analytics() is None:
+            print("numpy is not installed; skipping")
+            return
+        rng = random.Random(7)
+        categories = ("General", "Antibiotic", "Painkiller", "Vitamin", "Cardiac")
+        specialties = ("Cardiology", "Neurology", "Pediatrics", "Orthopedics")
+        for i in range(40):
+            hospital.add_doctor({'doctor_id': f"BD{i:03d}", 'name': f"Doctor {i}",
+                                 'specialty': specialties[i % len(specialties)], 'phone': "01000000000"})
+        for i in range(count):
+            hospital.add_patient({'patient_id': f"BP{i:07d}", 'name': "Ahmed Mohamed", 'age': rng.randint(1, 95),
+                                  'gender': rng.choice(("Male", "Female")), 'phone': "01001234567"})
+            hospital.add_medicine({'medicine_id': f"BM{i:07d}", 'name': f"Medicine {i}",
+                                   'price': round(rng.uniform(1, 200), 2), 'quantity': rng.randint(0, 500),
+                                   'category': rng.choice(categories)})
+        for i in range(appointments):
+            day = datetime.date(2025, 1, 1) + datetime.timedelta(days=i // 400)
+            hospital.schedule_appointment({'patient_id': f"BP{i % count:07d}", 'doctor_id': f"BD{i % 40:03d}",
+                                           'date': day.isoformat(), 'time': f"{8 + i % 400 // 40:02d}:{i % 2 * 30:02d}"})
+        
+        # المخزن كان مبنياً قبل الإضافة فتابع كل عملية كتابة؛ نقيس بناءه من الصفر أيضاً
+        incremental = _columnar_aggregates(hospital.get_analytics())
+        hospital.save_data()
+        hospital.load_data()
+        started = time.perf_counter()
+        analytics = hospital.get_analytics()
+        build = time.perf_counter() - started
+        
+        for label, run in (('object walk', lambda: _walk_aggregates(hospital)),
+                           ('columnar', lambda: _columnar_aggregates(analytics))):
+            run()
+            started = time.perf_counter()
+            for _ in range(5):
+                run()
+            elapsed = (time.perf_counter() - started) / 5
+            print(f"{label:<14}{elapsed * 1000:>10.1f} ms/refresh")
+        print(f"{'build once':<14}{build * 1000:>10.1f} ms   incremental==rebuilt: "
+              f"{incremental == _columnar_aggregates(analytics)}")
+        total = sum(m.price * m.quantity for m in hospital.get_medicines_list())
+        print(f"{'stock value':<14}{abs(analytics.stock_value() - total) < 1e-6 * total and 'match' or 'MISMATCH':>10}")
+
+# ==============================================
+# الاستيراد الجماعي مقابل الإضافة صفاً بصف
+# ==============================================
+
+def bench_import(count):
+    _print_header(f"Bulk import ({count} patients)")
+    with tempfile.TemporaryDirectory() as data_dir:
+        rows = [{'patient_id': f"IP{i:07d}", 'name': f"Patient {i}", 'age': i % 90, 'gender': "Female",
+                 'phone': f"02{i:09d}", 'address': "Cairo"} for i in range(count)]
+        csv_path = os.path.join(data_dir, "patients.csv")
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        jsonl_path = os.path.join(data_dir, "patients.jsonl")
+        with open(jsonl_path, 'w') as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+        
+        # المسار القديم: قراءة الملف ثم add_patient لكل صف، مع فهرس البحث مبنياً كما في الواجهة
+        os.makedirs(os.path.join(data_dir, "rows"))
+        hospital = HospitalManagementSystem(JsonStorage(os.path.join(data_dir, "rows")))
+        hospital.save_data()
+        hospital.build_search_index()
+        started = time.perf_counter()
+        with open(csv_path, newline='') as f:
+            for row in csv.DictReader(f):
+                row['age'] = int(row['age'])
+                hospital.add_patient(row)
+        hospital.save_data()
+        elapsed = time.perf_counter() - started
+        print(f"{'add_patient':<14}{count / elapsed:>12,.0f} rows/s")
+        
+        for label, path in (('csv', csv_path), ('jsonl', jsonl_path)):
+            os.makedirs(os.path.join(data_dir, label))
+            hospital = HospitalManagementSystem(JsonStorage(os.path.join(data_dir, label)))
+            hospital.save_data()
+            hospital.build_search_index()
+            summary = hospital.import_records('patients', path)
+            print(f"{label:<14}{summary['rows_per_second']:>12,} rows/s   imported={summary['imported']:,}")
+        
+        # مرحلة التحقق وحدها: عملية واحدة مقابل مجمع عمليات بعدد الأنوية، مع إلغاء حد
+        # الحجم حتى يُقاس المجمع فعلاً ولو كان الملف أصغر من أن يُستخدم فيه عادة
+        checker = HospitalManagementSystem(JsonStorage(data_dir))
+        threshold = BulkImporter.PARALLEL_MIN_BYTES
+        BulkImporter.PARALLEL_MIN_BYTES = 0
+        try:
+            for workers in sorted({1, max(2, os.cpu_count() or 1)}):
+                summary = checker.validate_records('patients', csv_path, workers=workers)
+                print(f"{f'validate x{workers}':<14}{summary['rows_per_second']:>12,} rows/s   valid={summary['valid']:,}")
+        finally:
+            BulkImporter.PARALLEL_MIN_BYTES = threshold
+        size = os.path.getsize(csv_path)
+        print(f"{'':<14}{size / 2**20:>9.1f} MB file: "
+              f"{'process pool' if size >= threshold else 'validated inline'} by default "
+              f"(threshold {threshold / 2**20:.0f} MB)")
+
+# ==============================================
+# التشغيل
+# ==============================================
+
+BENCHMARKS = {
+    'memory': bench_memory,
+    'history': bench_history_report,
+    'ids': bench_ids,
+    'stress': bench_stress,
+    'durability': bench_durability,
+    'login': bench_login,
+    'authz': bench_authz,
+    'analytics': bench_analytics,
+    'import': bench_import,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Hospital system benchmarks")
+    parser.add_argument("benchmarks", nargs="*", help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    
+    started = time.perf_counter()
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](args.count)
+    print(f"\nDone in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,52 @@
-import customtkinter as ctk
-from tkinter import messagebox, ttk
+import argparse
+import asyncio
+import base64
+import bisect
+import csv
 import datetime
+import hashlib
+import hmac
+import itertools
 import json
+import os
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
 from abc import ABC, abstractmethod
+from collections import Counter, deque
+from collections.abc import Sequence
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from time import monotonic, perf_counter, time_ns
+
+try:
+    import numpy as np
+except ImportError:  # التحليلات العمودية اختيارية
+    np = None
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas as pdf_canvas
+except ImportError:  # تصدير PDF اختياري
+    pdf_canvas = None
+
+try:
+    import customtkinter as ctk
+    from tkinter import filedialog, messagebox, ttk
+except ImportError:  # الواجهة الرسومية اختيارية: الخادم والاستيراد والاختبارات تعمل بدونها
+    ctk = None
 
 # ==============================================
 # إعدادات ألوان التصميم الجديد (أصفر/أسود)
 # ==============================================
-ctk.set_appearance_mode("dark")
+if ctk is not None:
+    ctk.set_appearance_mode("dark")
 
 # الألوان الجديدة
 COLORS = {
@@ -31,7 +70,164 @@ COLORS = {
 # فئات النظام الأساسية (نفس الكود بدون تغيير)
 # ==============================================
 
+class ReadOnlyList(Sequence):
+    __slots__ = ('_items',)
+    
+    def __init__(self, items):
+        self._items = items
+    
+    def __getitem__(self, index):
+        return self._items[index]
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def __iter__(self):
+        return iter(self._items)
+    
+    def __contains__(self, value):
+        return value in self._items
+    
+    def __eq__(self, other):
+        if isinstance(other, ReadOnlyList):
+            other = other._items
+        return self._items == other
+    
+    def __repr__(self):
+        return f"ReadOnlyList({self._items!r})"
+
+def _reference_ids(references, key):
+    # الملفات القديمة كانت تخزن نسخة كاملة من كل موعد/وصفة بدلاً من المعرف
+    return [reference[key] if isinstance(reference, dict) else reference for reference in references]
+
+# ==============================================
+# قواعد التحقق (مشتركة بين الخصائص والاستيراد الجماعي)
+# ==============================================
+
+_PHONE = re.compile(r"\+?[\d\s()-]+")
+_NON_DIGIT = re.compile(r"\D+")
+
+def _is_text(value):
+    return isinstance(value, str) and bool(value.strip())
+
+def _is_age(value):
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 150
+
+def _is_phone(value):
+    value = value.strip()
+    return _PHONE.fullmatch(value) is not None and 7 <= len(_NON_DIGIT.sub("", value)) <= 15
+
+def _is_non_negative(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+def _is_count(value):
+    return _is_non_negative(value) and isinstance(value, int)
+
+def _is_items(value):
+    return (isinstance(value, list) and bool(value)
+            and all(isinstance(item, dict) and _is_text(item.get('medicine_id')) and 'quantity' in item
+                    for item in value))
+
+def _is_date(value):
+    try:
+        datetime.date.fromisoformat(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def _is_time(value):
+    try:
+        hours, minutes = (int(part) for part in value.split(":"))
+        return 0 <= hours < 24 and 0 <= minutes < 60
+    except (AttributeError, ValueError):
+        return False
+
+class RecordValidator:
+    # الحقول التي لا يُبنى السجل بدونها
+    REQUIRED = {
+        'patients': ('patient_id', 'name', 'age', 'gender', 'phone'),
+        'doctors': ('doctor_id', 'name', 'specialty', 'phone'),
+        'medicines': ('medicine_id', 'name', 'price', 'quantity', 'category'),
+        'appointments': ('patient_id', 'doctor_id', 'date', 'time'),
+        'prescriptions': ('patient_id', 'items'),
+    }
+    # (الحقل، اسم القاعدة، دالة الفحص، الرسالة) - يتوقف فحص الحقل عند أول قاعدة تفشل
+    RULES = {
+        'patients': (
+            ('patient_id', 'required', _is_text, "Patient ID cannot be empty"),
+            ('name', 'required', _is_text, "Name cannot be empty"),
+            ('age', 'age_range', _is_age, "Age must be between 0 and 150"),
+            ('gender', 'required', _is_text, "Gender cannot be empty"),
+            ('phone', 'required', _is_text, "Phone cannot be empty"),
+            ('phone', 'phone_format', _is_phone, "Phone must contain 7 to 15 digits"),
+        ),
+        'doctors': (
+            ('doctor_id', 'required', _is_text, "Doctor ID cannot be empty"),
+            ('name', 'required', _is_text, "Name cannot be empty"),
+            ('specialty', 'required', _is_text, "Specialty cannot be empty"),
+            ('phone', 'required', _is_text, "Phone cannot be empty"),
+            ('phone', 'phone_format', _is_phone, "Phone must contain 7 to 15 digits"),
+        ),
+        'medicines': (
+            ('medicine_id', 'required', _is_text, "Medicine ID cannot be empty"),
+            ('name', 'required', _is_text, "Name cannot be empty"),
+            ('price', 'non_negative', _is_non_negative, "Price cannot be negative"),
+            ('quantity', 'non_negative', _is_count, "Quantity must be a whole number of at least 0"),
+            ('category', 'required', _is_text, "Category cannot be empty"),
+        ),
+        'appointments': (
+            ('patient_id', 'required', _is_text, "Patient ID cannot be empty"),
+            ('doctor_id', 'required', _is_text, "Doctor ID cannot be empty"),
+            ('date', 'date_format', _is_date, "Date must be YYYY-MM-DD"),
+            ('time', 'time_format', _is_time, "Time must be HH:MM"),
+            ('status', 'status', lambda value: value in Appointment.STATUSES,
+             "Status must be one of: Scheduled, Completed, Cancelled"),
+            ('duration', 'duration', lambda value: _is_count(value) and value > 0, "Duration must be positive"),
+        ),
+        'prescriptions': (
+            ('patient_id', 'required', _is_text, "Patient ID cannot be empty"),
+            ('items', 'items', _is_items, "Items must be a non-empty list of medicine_id and quantity"),
+            ('items', 'quantity', lambda items: all(_is_count(item['quantity']) and item['quantity'] > 0 for item in items),
+             "Quantity must be positive"),
+        ),
+    }
+    # الحقول التي يجب أن تشير إلى سجل موجود في مجموعة أخرى
+    REFERENCES = {
+        'appointments': (('patient_id', 'patients'), ('doctor_id', 'doctors')),
+    }
+    
+    def __init__(self, known_ids=None):
+        self._known_ids = known_ids or {}
+    
+    def check(self, collection, data, failed=()):
+        # قائمة بكل الأخطاء بدل التوقف عند أول خطأ، ليكون التقرير كاملاً
+        # failed: حقول رفضها المستدعي مسبقاً فلا يُبلَّغ عنها مرة ثانية
+        errors = []
+        failed = set(failed)
+        for field in self.REQUIRED[collection]:
+            if field not in failed and field not in data:
+                failed.add(field)
+                errors.append({'field': field, 'rule': 'required', 'message': f"Missing required field '{field}'"})
+        for field, rule, check, message in self.RULES[collection]:
+            if field in failed or field not in data:
+                continue
+            if not check(data[field]):
+                failed.add(field)
+                errors.append({'field': field, 'rule': rule, 'message': message})
+        for field, target in self.REFERENCES.get(collection, ()):
+            known = self._known_ids.get(target)
+            if known is not None and field in data and field not in failed and data[field] not in known:
+                errors.append({'field': field, 'rule': 'reference',
+                               'message': f"{target[:-1].capitalize()} '{data[field]}' not found"})
+        return errors
+
+RECORD_VALIDATOR = RecordValidator()
+
 class Patient:
+    __slots__ = ('_patient_id', '_name', '_age', '_gender', '_phone', '_address',
+                 '_medical_history', '_appointments', '_prescriptions',
+                 '_appointments_view', '_prescriptions_view')
+    
     def __init__(self, patient_id, name, age, gender, phone, address="", medical_history=""):
         self._patient_id = patient_id
         self._name = name
@@ -42,6 +238,8 @@ class Patient:
         self._medical_history = medical_history
         self._appointments = []
         self._prescriptions = []
+        self._appointments_view = None
+        self._prescriptions_view = None
     
     @property
     def patient_id(self):
@@ -73,35 +271,42 @@ class Patient:
     
     @property
     def appointments(self):
-        return self._appointments.copy()
+        # عرض للقراءة فقط يُنشأ مرة واحدة بدلاً من نسخ القائمة عند كل وصول
+        if self._appointments_view is None:
+            self._appointments_view = ReadOnlyList(self._appointments)
+        return self._appointments_view
     
     @property
     def prescriptions(self):
-        return self._prescriptions.copy()
+        if self._prescriptions_view is None:
+            self._prescriptions_view = ReadOnlyList(self._prescriptions)
+        return self._prescriptions_view
     
     @name.setter
     def name(self, value):
-        if not value or not value.strip():
+        if not _is_text(value):
             raise ValueError("Name cannot be empty")
         self._name = value.strip()
     
     @age.setter
     def age(self, value):
-        if value < 0 or value > 150:
+        if not _is_age(value):
             raise ValueError("Age must be between 0 and 150")
         self._age = value
     
     @phone.setter
     def phone(self, value):
-        if not value or not value.strip():
+        if not _is_text(value):
             raise ValueError("Phone cannot be empty")
+        if not _is_phone(value):
+            raise ValueError("Phone must contain 7 to 15 digits")
         self._phone = value.strip()
     
-    def add_appointment(self, appointment_data):
-        self._appointments.append(appointment_data)
+    def add_appointment(self, appointment_id):
+        self._appointments.append(appointment_id)
     
-    def add_prescription(self, prescription_data):
-        self._prescriptions.append(prescription_data)
+    def add_prescription(self, prescription_id):
+        self._prescriptions.append(prescription_id)
     
     def to_dict(self):
         return {
@@ -127,11 +332,14 @@ class Patient:
             data.get('address', ''),
             data.get('medical_history', '')
         )
-        patient._appointments = data.get('appointments', [])
-        patient._prescriptions = data.get('prescriptions', [])
+        patient._appointments = _reference_ids(data.get('appointments', []), 'appointment_id')
+        patient._prescriptions = _reference_ids(data.get('prescriptions', []), 'prescription_id')
         return patient
 
 class Doctor:
+    __slots__ = ('_doctor_id', '_name', '_specialty', '_phone', '_email', '_schedule',
+                 '_appointments', '_appointments_view')
+    
     def __init__(self, doctor_id, name, specialty, phone, email="", schedule=""):
         self._doctor_id = doctor_id
         self._name = name
@@ -140,6 +348,7 @@ class Doctor:
         self._email = email
         self._schedule = schedule
         self._appointments = []
+        self._appointments_view = None
     
     @property
     def doctor_id(self):
@@ -167,10 +376,12 @@ class Doctor:
     
     @property
     def appointments(self):
-        return self._appointments.copy()
+        if self._appointments_view is None:
+            self._appointments_view = ReadOnlyList(self._appointments)
+        return self._appointments_view
     
-    def add_appointment(self, appointment_data):
-        self._appointments.append(appointment_data)
+    def add_appointment(self, appointment_id):
+        self._appointments.append(appointment_id)
     
     def to_dict(self):
         return {
@@ -193,10 +404,12 @@ class Doctor:
             data.get('email', ''),
             data.get('schedule', '')
         )
-        doctor._appointments = data.get('appointments', [])
+        doctor._appointments = _reference_ids(data.get('appointments', []), 'appointment_id')
         return doctor
 
 class Medicine:
+    __slots__ = ('_medicine_id', '_name', '_price', '_quantity', '_category', '_dosage')
+    
     def __init__(self, medicine_id, name, price, quantity, category, dosage=""):
         self._medicine_id = medicine_id
         self._name = name
@@ -229,6 +442,12 @@ class Medicine:
     def dosage(self):
         return self._dosage
     
+    @quantity.setter
+    def quantity(self, value):
+        if value < 0:
+            raise ValueError("Quantity cannot be negative")
+        self._quantity = value
+    
     def to_dict(self):
         return {
             'medicine_id': self._medicine_id,
@@ -250,15 +469,268 @@ class Medicine:
             data.get('dosage', '')
         )
 
+class Appointment:
+    __slots__ = ('_appointment_id', '_patient_id', '_doctor_id', '_date', '_time',
+                 '_reason', '_status', '_created_by', '_duration')
+    
+    STATUSES = ('Scheduled', 'Completed', 'Cancelled')
+    
+    def __init__(self, appointment_id, patient_id, doctor_id, date, time, reason="",
+                 status="Scheduled", created_by="Unknown", duration=30):
+        self._appointment_id = appointment_id
+        self._patient_id = patient_id
+        self._doctor_id = doctor_id
+        self._date = date
+        self._time = time
+        self._reason = reason
+        self._status = status
+        self._created_by = created_by
+        self._duration = duration
+    
+    @property
+    def appointment_id(self):
+        return self._appointment_id
+    
+    @property
+    def patient_id(self):
+        return self._patient_id
+    
+    @property
+    def doctor_id(self):
+        return self._doctor_id
+    
+    @property
+    def date(self):
+        return self._date
+    
+    @property
+    def time(self):
+        return self._time
+    
+    @property
+    def reason(self):
+        return self._reason
+    
+    @property
+    def status(self):
+        return self._status
+    
+    @property
+    def created_by(self):
+        return self._created_by
+    
+    @property
+    def duration(self):
+        return self._duration
+    
+    @status.setter
+    def status(self, value):
+        if value not in self.STATUSES:
+            raise ValueError(f"Status must be one of: {', '.join(self.STATUSES)}")
+        self._status = value
+    
+    def to_dict(self):
+        return {
+            'appointment_id': self._appointment_id,
+            'patient_id': self._patient_id,
+            'doctor_id': self._doctor_id,
+            'date': self._date,
+            'time': self._time,
+            'reason': self._reason,
+            'status': self._status,
+            'created_by': self._created_by,
+            'duration': self._duration
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['appointment_id'],
+            data['patient_id'],
+            data['doctor_id'],
+            data['date'],
+            data['time'],
+            data.get('reason', ''),
+            data.get('status', 'Scheduled'),
+            data.get('created_by', 'Unknown'),
+            data.get('duration') or 30
+        )
+
+class Prescription:
+    __slots__ = ('_prescription_id', '_patient_id', '_items', '_date', '_prescribed_by',
+                 '_doctor_id', '_notes')
+    
+    def __init__(self, prescription_id, patient_id, items, date, prescribed_by="Unknown",
+                 doctor_id="", notes=""):
+        self._prescription_id = prescription_id
+        self._patient_id = patient_id
+        # كل عنصر هو (medicine_id, quantity)
+        self._items = tuple((medicine_id, quantity) for medicine_id, quantity in items)
+        self._date = date
+        self._prescribed_by = prescribed_by
+        self._doctor_id = doctor_id
+        self._notes = notes
+    
+    @property
+    def prescription_id(self):
+        return self._prescription_id
+    
+    @property
+    def patient_id(self):
+        return self._patient_id
+    
+    @property
+    def items(self):
+        return self._items
+    
+    @property
+    def date(self):
+        return self._date
+    
+    @property
+    def prescribed_by(self):
+        return self._prescribed_by
+    
+    @property
+    def doctor_id(self):
+        return self._doctor_id
+    
+    @property
+    def notes(self):
+        return self._notes
+    
+    def to_dict(self):
+        return {
+            'prescription_id': self._prescription_id,
+            'patient_id': self._patient_id,
+            'items': [{'medicine_id': medicine_id, 'quantity': quantity} for medicine_id, quantity in self._items],
+            'date': self._date,
+            'prescribed_by': self._prescribed_by,
+            'doctor_id': self._doctor_id,
+            'notes': self._notes
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['prescription_id'],
+            data['patient_id'],
+            [(item['medicine_id'], item['quantity']) for item in data.get('items', [])],
+            data['date'],
+            data.get('prescribed_by', 'Unknown'),
+            data.get('doctor_id', ''),
+            data.get('notes', '')
+        )
+
+# ==============================================
+# تجزئة كلمات المرور
+# ==============================================
+
+class PasswordHasher:
+    ALGORITHMS = ('scrypt', 'pbkdf2_sha256')
+    
+    def __init__(self, algorithm=None, iterations=200000, n=2 ** 14, r=8, p=1, salt_size=16):
+        # scrypt غير متاح في بعض إصدارات OpenSSL فنرجع إلى PBKDF2
+        algorithm = algorithm or ('scrypt' if hasattr(hashlib, 'scrypt') else 'pbkdf2_sha256')
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown hashing algorithm '{algorithm}'")
+        self.algorithm = algorithm
+        self.iterations = iterations
+        self.n, self.r, self.p = n, r, p
+        self.salt_size = salt_size
+    
+    def _parameters(self):
+        if self.algorithm == 'scrypt':
+            return [self.n, self.r, self.p]
+        return [self.iterations]
+    
+    @staticmethod
+    def _derive(algorithm, parameters, password, salt):
+        if algorithm == 'scrypt':
+            n, r, p = parameters
+            return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                                  maxmem=n * r * 129 + (1 << 20), dklen=32)
+        if algorithm == 'pbkdf2_sha256':
+            return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, parameters[0])
+        raise ValueError(f"Unknown hashing algorithm '{algorithm}'")
+    
+    def hash(self, password):
+        salt = secrets.token_bytes(self.salt_size)
+        parameters = self._parameters()
+        digest = self._derive(self.algorithm, parameters, password, salt)
+        return "$".join([self.algorithm, *map(str, parameters), salt.hex(), digest.hex()])
+    
+    @classmethod
+    def verify(cls, password, encoded):
+        # المعاملات مخزنة مع التجزئة فتبقى التجزئات القديمة صالحة بعد تغيير الكلفة
+        algorithm, *parameters, salt, digest = encoded.split("$")
+        derived = cls._derive(algorithm, [int(value) for value in parameters], password, bytes.fromhex(salt))
+        return hmac.compare_digest(derived, bytes.fromhex(digest))
+    
+    def needs_rehash(self, encoded):
+        algorithm, *parameters, _, _ = encoded.split("$")
+        return algorithm != self.algorithm or [int(value) for value in parameters] != self._parameters()
+
+DEFAULT_HASHER = PasswordHasher()
+
+# ==============================================
+# سياسات الأدوار: صلاحيات مجمّعة مرة واحدة
+# ==============================================
+
+class RolePolicy:
+    ACTIONS = ('manage_patients', 'manage_doctors', 'manage_medicines', 'manage_appointments',
+               'manage_users', 'view_reports', 'prescribe_medicines')
+    DEFAULT_ROLES = {
+        'admin': ACTIONS,
+        'doctor': ('manage_patients', 'manage_appointments', 'view_reports', 'prescribe_medicines'),
+        'nurse': ('manage_patients', 'manage_medicines', 'manage_appointments', 'view_reports'),
+        'receptionist': ('manage_patients', 'manage_appointments'),
+    }
+    
+    def __init__(self, roles=None):
+        self._maps = {}
+        self._no_permissions = MappingProxyType(dict.fromkeys(self.ACTIONS, False))
+        for role, actions in (roles or self.DEFAULT_ROLES).items():
+            self.define_role(role, actions)
+    
+    @property
+    def roles(self):
+        return tuple(self._maps)
+    
+    def define_role(self, role, actions):
+        unknown = [action for action in actions if action not in self.ACTIONS]
+        if unknown:
+            raise ValueError(f"Unknown action(s) for role '{role}': {', '.join(unknown)}")
+        # الخريطة تُبنى مرة واحدة وتُشارك للقراءة فقط
+        self._maps[role] = MappingProxyType({action: action in actions for action in self.ACTIONS})
+    
+    def load(self, path):
+        # {"roles": {"pharmacist": ["manage_medicines", "view_reports"]}}
+        with open(path, 'r') as f:
+            config = json.load(f)
+        for role, actions in config.get('roles', {}).items():
+            self.define_role(role, actions)
+    
+    def can(self, user, action):
+        # بحثان في قاموسين مبنيين مسبقاً؛ الإجراء غير المعروف يرفع KeyError
+        return self._maps.get(user.role, self._no_permissions)[action]
+    
+    def permissions(self, role):
+        return self._maps.get(role, self._no_permissions)
+
+ROLE_POLICY = RolePolicy()
+
 # ==============================================
 # فئات إدارة المستخدمين
 # ==============================================
 
 class User(ABC):
+    __slots__ = ('_username', '_password_hash', '_role')
+    
     def __init__(self, username, password, role):
         self._username = username
-        self._password = password
         self._role = role
+        self.set_password(password)
     
     @property
     def username(self):
@@ -268,35 +740,38 @@ class User(ABC):
     def role(self):
         return self._role
     
+    @property
+    def password_hash(self):
+        return self._password_hash
+    
+    def set_password(self, password, hasher=None):
+        self._password_hash = (hasher or DEFAULT_HASHER).hash(password)
+    
     def verify_password(self, password):
-        return self._password == password
+        return PasswordHasher.verify(password, self._password_hash)
     
-    @abstractmethod
     def get_permissions(self):
-        pass
+        return ROLE_POLICY.permissions(self._role)
+    
+    def can(self, action):
+        return ROLE_POLICY.permissions(self._role)[action]
     
     def to_dict(self):
         return {
             'username': self._username,
-            'password': self._password,
+            'password_hash': self._password_hash,
             'role': self._role
         }
 
 class Admin(User):
+    __slots__ = ()
+    
     def __init__(self, username, password):
         super().__init__(username, password, "admin")
-    
-    def get_permissions(self):
-        return {
-            'manage_patients': True,
-            'manage_doctors': True,
-            'manage_medicines': True,
-            'manage_appointments': True,
-            'manage_users': True,
-            'view_reports': True
-        }
 
 class DoctorUser(User):
+    __slots__ = ('_doctor_id',)
+    
     def __init__(self, username, password, doctor_id):
         super().__init__(username, password, "doctor")
         self._doctor_id = doctor_id
@@ -304,235 +779,3130 @@ class DoctorUser(User):
     @property
     def doctor_id(self):
         return self._doctor_id
-    
-    def get_permissions(self):
-        return {
-            'manage_patients': True,
-            'manage_doctors': False,
-            'manage_medicines': False,
-            'manage_appointments': True,
-            'manage_users': False,
-            'view_reports': True
-        }
 
 class Nurse(User):
+    __slots__ = ()
+    
     def __init__(self, username, password):
         super().__init__(username, password, "nurse")
-    
-    def get_permissions(self):
-        return {
-            'manage_patients': True,
-            'manage_doctors': False,
-            'manage_medicines': True,
-            'manage_appointments': True,
-            'manage_users': False,
-            'view_reports': True
-        }
 
 class Receptionist(User):
+    __slots__ = ()
+    
     def __init__(self, username, password):
         super().__init__(username, password, "receptionist")
+
+class StaffUser(User):
+    # مستخدم بدور مخصص معرّف في ملف الإعدادات
+    __slots__ = ()
+
+class CredentialStore:
+    def __init__(self, hasher=None):
+        self._hasher = hasher or DEFAULT_HASHER
+        self._users = {}
+        self._lock = threading.Lock()
+        # تجزئة وهمية للمستخدمين غير الموجودين حتى لا يكشف زمن الرد وجود الاسم
+        self._dummy_hash = self._hasher.hash(secrets.token_hex(8))
+    
+    def __len__(self):
+        return len(self._users)
+    
+    def __iter__(self):
+        return iter(list(self._users.values()))
+    
+    def __contains__(self, username):
+        return username in self._users
+    
+    def add(self, user):
+        with self._lock:
+            if user.username in self._users:
+                raise ValueError(f"User '{user.username}' already exists")
+            self._users[user.username] = user
+    
+    def get(self, username):
+        return self._users.get(username)
+    
+    def authenticate(self, username, password):
+        user = self._users.get(username)
+        if user is None:
+            PasswordHasher.verify(password, self._dummy_hash)
+            return None
+        if not user.verify_password(password):
+            return None
+        if self._hasher.needs_rehash(user.password_hash):
+            # ترقية التجزئة إلى الكلفة الحالية عند أول دخول ناجح
+            user.set_password(password, self._hasher)
+        return user
+
+# ==============================================
+# سجل الكيانات المفهرس بالمعرف
+# ==============================================
+
+class _LazyRecord:
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+class EntityRegistry:
+    def __init__(self, key_attr, loader=None):
+        self._key_attr = key_attr
+        self._loader = loader
+        self._items = {}
+        # ترتيب الإدراج كقائمة حتى تكون الصفحة شريحة بحجمها لا نسخة من كل المفاتيح
+        self._keys = []
+        # موضع كل معرف في _keys، ليكون الحذف بكلفة ثابتة
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        # نسخة من المفاتيح حتى لا تتأثر الحلقة بالإضافات من خيوط أخرى
+        for entity_id, entity in list(self._items.items()):
+            if type(entity) is _LazyRecord:
+                entity = self._hydrate(entity_id, entity)
+            yield entity
+
+    def __contains__(self, entity_id):
+        return entity_id in self._items
+
+    def __getitem__(self, index):
+        # الفهرسة على قائمة المفاتيح: يُحمَّل العنصر المطلوب وحده لا السجل كله
+        if isinstance(index, slice):
+            return [self.get(entity_id) for entity_id in self._keys[index]]
+        return self.get(self._keys[index])
+
+    def _hydrate(self, entity_id, record):
+        # بناء الكائن الكامل عند أول وصول فقط
+        with self._lock:
+            entity = self._items.get(entity_id)
+            if entity is record:
+                entity = self._loader(entity_id, record.raw)
+                self._items[entity_id] = entity
+            return entity
+
+    def get(self, entity_id, default=None):
+        entity = self._items.get(entity_id, default)
+        if type(entity) is _LazyRecord:
+            entity = self._hydrate(entity_id, entity)
+        return entity
+
+    def page(self, offset, limit):
+        # تحميل عناصر الصفحة المطلوبة فقط دون بقية السجلات
+        ids = self._keys[offset:offset + limit]
+        return [entity for entity in map(self.get, ids) if entity is not None]
+
+    def add(self, entity):
+        entity_id = getattr(entity, self._key_attr)
+        with self._lock:
+            if entity_id in self._items:
+                raise ValueError(f"ID '{entity_id}' already exists")
+            self._items[entity_id] = entity
+            self._slots[entity_id] = len(self._keys)
+            self._keys.append(entity_id)
+
+    def ids(self):
+        return list(self._items)
+    
+    def add_many(self, entities):
+        # إضافة دفعة كاملة تحت قفل واحد؛ تُرفض الدفعة كلها عند وجود معرف مكرر
+        with self._lock:
+            batch = {getattr(entity, self._key_attr): entity for entity in entities}
+            duplicates = batch.keys() & self._items.keys()
+            if duplicates:
+                raise ValueError(f"ID '{min(duplicates)}' already exists")
+            self._items.update(batch)
+            self._slots.update(zip(batch, range(len(self._keys), len(self._keys) + len(batch))))
+            self._keys.extend(batch)
+    
+    def remove(self, entity_id):
+        with self._lock:
+            entity = self._items.pop(entity_id, None)
+            if entity is not None:
+                # آخر مفتاح يأخذ مكان المحذوف: لا إزاحة لبقية القائمة
+                slot = self._slots.pop(entity_id)
+                last = self._keys.pop()
+                if last != entity_id:
+                    self._keys[slot] = last
+                    self._slots[last] = slot
+            return entity
+
+    def reset(self, entities):
+        self._replace({getattr(entity, self._key_attr): entity for entity in entities})
+
+    def reset_lazy(self, raw_records):
+        self._replace({entity_id: _LazyRecord(raw) for entity_id, raw in raw_records})
+
+    def _replace(self, items):
+        # البناء خارج القفل، والاستبدال تحته حتى لا تتداخل معه إضافة أو حذف
+        keys = list(items)
+        slots = {entity_id: slot for slot, entity_id in enumerate(keys)}
+        with self._lock:
+            self._items, self._keys, self._slots = items, keys, slots
+
+    def dump(self, fetch_many=None):
+        # السجلات التي لم تُحمّل بعد تُكتب كما هي دون تحليلها؛ ما ليس له سطر خام يُقرأ
+        # بمرور واحد عبر fetch_many إن وُجد بدل بناء كل كائن على حدة
+        pending = set()
+        for entity_id, entity in list(self._items.items()):
+            if type(entity) is _LazyRecord:
+                if entity.raw is not None:
+                    yield entity.raw
+                    continue
+                if fetch_many is not None:
+                    pending.add(entity_id)
+                    continue
+                entity = self._hydrate(entity_id, entity)
+            yield entity.to_dict()
+        if pending:
+            for entity_id, raw in fetch_many():
+                if entity_id in pending:
+                    yield raw
+
+# ==============================================
+# توليد المعرفات (بنمط ULID)
+# ==============================================
+
+_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_BASE32_PAIRS = [first + second for first in _BASE32 for second in _BASE32]
+
+def _encode_base32(value, length):
+    # كل حرفين يمثلان 10 بتات
+    chars = []
+    for _ in range(length // 2):
+        chars.append(_BASE32_PAIRS[value & 0x3FF])
+        value >>= 10
+    return "".join(reversed(chars))
+
+# خطاف واحد للوحدة كلها: التسجيل لكل مولد لا يمكن إلغاؤه ويبقي المولدات حية إلى الأبد
+_ID_GENERATORS = weakref.WeakSet()
+
+def _reseed_id_generators():
+    for generator in list(_ID_GENERATORS):
+        generator._reseed()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_id_generators)
+
+class IdGenerator:
+    RANDOM_BITS = 80
+    
+    def __init__(self, prefix):
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._time_part = ""
+        self._random = 0
+        _ID_GENERATORS.add(self)
+    
+    def _reseed(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+    
+    def next_id(self):
+        # 48 بت للوقت بالمللي ثانية ثم 80 بت عشوائية تزداد بواحد داخل نفس المللي ثانية
+        with self._lock:
+            now = time_ns() // 1_000_000
+            if now > self._last_ms:
+                self._start_millisecond(now)
+            else:
+                self._random += 1
+                if self._random >> self.RANDOM_BITS:
+                    self._start_millisecond(self._last_ms + 1)
+            return self._time_part + _encode_base32(self._random, 16)
+    
+    def _start_millisecond(self, now):
+        self._last_ms = now
+        self._time_part = self._prefix + _encode_base32(now, 10)
+        # البت الأعلى صفر ليبقى مجال للزيادة داخل نفس المللي ثانية
+        self._random = int.from_bytes(os.urandom(10), 'big') >> 1
+
+# ==============================================
+# أقفال موزعة على شرائح
+# ==============================================
+
+class LockStripes:
+    def __init__(self, count=64):
+        self._locks = [threading.Lock() for _ in range(count)]
+    
+    def lock_for(self, key):
+        return self._locks[hash(key) % len(self._locks)]
+    
+    @contextmanager
+    def holding(self, keys):
+        # الحجز دائماً بترتيب الشرائح لتجنب الجمود (deadlock)
+        locks = [self._locks[index] for index in sorted({hash(key) % len(self._locks) for key in keys})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+# ==============================================
+# فهرس المواعيد حسب التاريخ
+# ==============================================
+
+def _date_key(value):
+    return value.isoformat() if isinstance(value, datetime.date) else value
+
+class AppointmentCalendar:
+    def __init__(self):
+        self._days = {}
+        self._dates = []
+        self._lock = threading.Lock()
+    
+    def add(self, date, appointment_id):
+        with self._lock:
+            bucket = self._days.get(date)
+            if bucket is None:
+                bucket = self._days[date] = []
+                bisect.insort(self._dates, date)
+            bucket.append(appointment_id)
+    
+    def reset(self):
+        with self._lock:
+            self._days = {}
+            self._dates = []
+    
+    def on(self, date):
+        return tuple(self._days.get(_date_key(date), ()))
+    
+    def day_counts(self):
+        with self._lock:
+            return {date: len(bucket) for date, bucket in self._days.items()}
+    
+    def between(self, start_date, end_date):
+        with self._lock:
+            start = bisect.bisect_left(self._dates, _date_key(start_date))
+            end = bisect.bisect_right(self._dates, _date_key(end_date))
+            dates = self._dates[start:end]
+            days = [tuple(self._days[date]) for date in dates]
+        for bucket in days:
+            yield from bucket
+    
+    def count_on(self, date):
+        return len(self._days.get(_date_key(date), ()))
+
+# ==============================================
+# جدول حجوزات كل طبيب
+# ==============================================
+
+def _slot_minutes(date, time):
+    # الموعد يتحول إلى دقائق منذ بداية التقويم لتسهيل مقارنة الفترات
+    day = datetime.date.fromisoformat(_date_key(date))
+    hours, minutes = (int(part) for part in time.split(":"))
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid time '{time}'")
+    return day.toordinal() * 1440 + hours * 60 + minutes
+
+def _slot_label(minutes):
+    day, minutes = divmod(minutes, 1440)
+    return datetime.date.fromordinal(day).isoformat(), f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+class DoctorSchedule:
+    def __init__(self):
+        self._starts = []
+        self._slots = []
+    
+    def __len__(self):
+        return len(self._slots)
+    
+    def find_conflict(self, start, end):
+        index = bisect.bisect_right(self._starts, start)
+        if index > 0 and self._slots[index - 1][1] > start:
+            return self._slots[index - 1][2]
+        if index < len(self._slots) and self._slots[index][0] < end:
+            return self._slots[index][2]
+        return None
+    
+    def book(self, start, end, appointment_id):
+        index = bisect.bisect_right(self._starts, start)
+        self._starts.insert(index, start)
+        self._slots.insert(index, (start, end, appointment_id))
+    
+    def next_free(self, start, duration):
+        # نبدأ من آخر حجز قبل الموعد المطلوب ثم نتقدم حتى أول فجوة تكفي
+        index = bisect.bisect_right(self._starts, start)
+        if index > 0:
+            index -= 1
+        candidate = start
+        for slot_start, slot_end, _ in itertools.islice(self._slots, index, None):
+            if slot_start >= candidate + duration:
+                break
+            candidate = max(candidate, slot_end)
+        return candidate
+
+# ==============================================
+# فهرس البحث عن المرضى
+# ==============================================
+
+_WORD = re.compile(r"\w+")
+
+def _within_one_edit(a, b):
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    # بعد أول اختلاف: حذف من الأطول أو استبدال حرف واحد
+    return a[i:] == b[i + 1:] or (len(a) == len(b) and a[i + 1:] == b[i + 1:])
+
+class PatientSearchIndex:
+    FUZZY_MIN_LENGTH = 4
+    
+    def __init__(self):
+        self._postings = {}
+        self._tokens = []
+        self._forward = {}
+        self._deletes = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._forward)
+    
+    @staticmethod
+    def _tokenize(patient_id, name, phone, address):
+        tokens = set(_WORD.findall(f"{name} {address}".lower()))
+        tokens.add(patient_id.lower())
+        digits = phone if phone.isdigit() else _NON_DIGIT.sub("", phone)
+        if digits:
+            tokens.add(digits)
+        return tokens
+    
+    @staticmethod
+    def _variants(token):
+        return {token[:i] + token[i + 1:] for i in range(len(token))}
+    
+    def _is_word(self, token):
+        return len(token) >= self.FUZZY_MIN_LENGTH and token.isalpha()
+    
+    def add(self, patient_id, name, phone="", address=""):
+        with self._lock:
+            for token in self._insert(patient_id, name, phone, address):
+                bisect.insort(self._tokens, token)
+    
+    def add_many(self, records):
+        # records: (patient_id, name, phone, address) - ترتيب الرموز مرة واحدة في النهاية
+        # آخر سجل لكل معرف فقط: حذف رموز سجل سابق من الدفعة نفسها يبحث عنها في _tokens قبل ترتيبها
+        batch = {record[0]: record for record in records}
+        with self._lock:
+            new_tokens = []
+            for record in batch.values():
+                new_tokens.extend(self._insert(*record))
+            self._tokens = sorted(itertools.chain(self._tokens, new_tokens))
+    
+    def _insert(self, patient_id, name, phone, address):
+        tokens = self._tokenize(patient_id, name, phone, address)
+        self._discard(patient_id)
+        self._forward[patient_id] = tokens
+        new_tokens = []
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                new_tokens.append(token)
+                if len(token) >= self.FUZZY_MIN_LENGTH and token.isalpha():
+                    for variant in self._variants(token):
+                        self._deletes.setdefault(variant, set()).add(token)
+            # dict مرتب حسب الإضافة فتبقى النتائج بترتيب ثابت
+            posting[patient_id] = None
+        return new_tokens
+    
+    def remove(self, patient_id):
+        with self._lock:
+            self._discard(patient_id)
+    
+    def _discard(self, patient_id):
+        for token in self._forward.pop(patient_id, ()):
+            posting = self._postings[token]
+            del posting[patient_id]
+            if posting:
+                continue
+            del self._postings[token]
+            del self._tokens[bisect.bisect_left(self._tokens, token)]
+            if self._is_word(token):
+                for variant in self._variants(token):
+                    self._deletes[variant].discard(token)
+                    if not self._deletes[variant]:
+                        del self._deletes[variant]
+    
+    def _expand(self, term):
+        # مطابقة تامة ثم بالبادئة، وإن لم يوجد شيء فمطابقة تقريبية (خطأ حرف واحد)
+        start = bisect.bisect_left(self._tokens, term)
+        end = bisect.bisect_left(self._tokens, term + "\uffff", start)
+        tokens = self._tokens[start:end]
+        if tokens or len(term) < self.FUZZY_MIN_LENGTH:
+            return tokens
+        candidates = set(self._deletes.get(term, ()))
+        for variant in self._variants(term):
+            candidates.update(self._deletes.get(variant, ()))
+            if variant in self._postings:
+                candidates.add(variant)
+        return sorted(token for token in candidates if _within_one_edit(term, token))
+    
+    def search(self, query, limit=50):
+        terms = list(dict.fromkeys(_WORD.findall(query.lower())))
+        if not terms:
+            return []
+        with self._lock:
+            expansions = [self._expand(term) for term in terms]
+            if not all(expansions):
+                return []
+            # نبدأ بأضيق شرط ونتحقق من الباقي عبر رموز كل مريض
+            expansions.sort(key=lambda tokens: sum(len(self._postings[token]) for token in tokens))
+            driver, others = expansions[0], [set(tokens) for tokens in expansions[1:]]
+            results = {}
+            for token in driver:
+                for patient_id in self._postings[token]:
+                    if patient_id in results:
+                        continue
+                    tokens = self._forward[patient_id]
+                    if all(not tokens.isdisjoint(other) for other in others):
+                        results[patient_id] = None
+                        if len(results) >= limit:
+                            return list(results)
+            return list(results)
+
+# ==============================================
+# عدادات لوحة المعلومات
+# ==============================================
+
+class HospitalMetrics:
+    COLLECTIONS = {
+        'patient': 'patients',
+        'doctor': 'doctors',
+        'medicine': 'medicines',
+        'appointment': 'appointments',
+        'prescription': 'prescriptions',
+    }
+    
+    def __init__(self, loader=None):
+        # loader() يعيد (counts, appointments_by_day, prescriptions_by_day, dispensed_by_day)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._writers = 0
+        self._loading = False
+        self._loader = loader
+        self._loaded = loader is None
+        self._counts = dict.fromkeys(self.COLLECTIONS.values(), 0)
+        self._appointments_by_day = Counter()
+        self._prescriptions_by_day = Counter()
+        self._dispensed_by_day = Counter()
+        self.version = 0
+    
+    def reset(self, counts, appointments_by_day, prescriptions_by_day, dispensed_by_day):
+        with self._lock:
+            self._apply(counts, appointments_by_day, prescriptions_by_day, dispensed_by_day)
+            self.version += 1
+    
+    def invalidate(self):
+        # الإحصاءات تُحسب من جديد عند أول طلب بدل مرور كامل عند كل تحميل
+        with self._lock:
+            self._loaded = self._loader is None
+            self.version += 1
+    
+    @contextmanager
+    def writing(self):
+        # إضافة الكيان إلى السجل ثم on_event خطوة واحدة بالنسبة للحساب الأول: لو عُدّت
+        # السجلات بينهما لاحتُسب الكيان مرة في العد ومرة في الحدث
+        with self._idle:
+            while self._loading:
+                self._idle.wait()
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._writers -= 1
+                if not self._writers:
+                    self._idle.notify_all()
+    
+    def _ensure_loaded(self):
+        # يُستدعى والقفل محجوز؛ ينتظر انتهاء الكتابات الجارية ويمنع الجديدة حتى ينتهي العد
+        if self._loaded:
+            return
+        self._loading = True
+        try:
+            while self._writers:
+                self._idle.wait()
+            self._apply(*self._loader())
+        finally:
+            self._loading = False
+            self._idle.notify_all()
+    
+    def _apply(self, counts, appointments_by_day, prescriptions_by_day, dispensed_by_day):
+        self._counts.update(counts)
+        self._appointments_by_day = Counter(appointments_by_day)
+        self._prescriptions_by_day = Counter(prescriptions_by_day)
+        self._dispensed_by_day = Counter(dispensed_by_day)
+        self._loaded = True
+    
+    def on_event(self, kind, data):
+        collection = self.COLLECTIONS.get(kind)
+        if collection is None:
+            return
+        with self._lock:
+            if not self._loaded:
+                # السجل موجود في الذاكرة مسبقاً فسيُحتسب عند الحساب الأول
+                return
+            self._counts[collection] += 1
+            if kind == 'appointment':
+                self._appointments_by_day[data['date']] += 1
+            elif kind == 'prescription':
+                day = data['date'][:10]
+                self._prescriptions_by_day[day] += 1
+                self._dispensed_by_day[day] += sum(item['quantity'] for item in data['items'])
+            self.version += 1
+    
+    def count(self, collection):
+        return self._counts[collection]
+    
+    def appointments_on(self, date):
+        return self._appointments_by_day[_date_key(date)]
+    
+    def prescriptions_on(self, date):
+        return self._prescriptions_by_day[_date_key(date)]
+    
+    def dispensed_on(self, date):
+        return self._dispensed_by_day[_date_key(date)]
+    
+    def snapshot(self, date):
+        with self._lock:
+            self._ensure_loaded()
+            stats = dict(self._counts)
+            stats['appointments_today'] = self.appointments_on(date)
+            stats['prescriptions_today'] = self.prescriptions_on(date)
+            stats['dispensed_today'] = self.dispensed_on(date)
+            stats['version'] = self.version
+        return stats
+
+# ==============================================
+# مراقبة المخزون المنخفض
+# ==============================================
+
+class InventoryMonitor:
+    REORDER_LEVEL = 50
+    
+    def __init__(self, reorder_level=REORDER_LEVEL, loader=None):
+        # loader() يعيد أزواج (medicine_id, quantity) لكل الأدوية
+        self.reorder_level = reorder_level
+        self._loader = loader
+        self._loaded = loader is None
+        self._levels = {}
+        # قائمة مرتبة (الكمية، المعرف): الأقل مخزوناً في أولها
+        self._order = []
+        self._lock = threading.Lock()
+        self._listeners = []
+    
+    def reset(self, levels):
+        with self._lock:
+            self._apply(levels)
+    
+    def invalidate(self):
+        # المستويات تُقرأ عند أول استعلام بدل مرور كامل على الأدوية عند كل تحميل
+        with self._lock:
+            self._levels = {}
+            self._order = []
+            self._loaded = self._loader is None
+            if self._listeners:
+                # مع وجود مستمعين يجب أن تكون المستويات حاضرة وإلا ضاع عبور الحد التالي
+                self._ensure_loaded()
+    
+    def _apply(self, levels):
+        self._levels = dict(levels)
+        self._order = sorted((quantity, medicine_id) for medicine_id, quantity in self._levels.items())
+        self._loaded = True
+    
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._apply(self._loader())
+    
+    def add_listener(self, callback):
+        # يُستدعى callback(event, medicine_id, quantity) عند عبور حد إعادة الطلب
+        # event هو 'low' أو 'restocked'، ويُستدعى من الخيط الذي عدّل المخزون
+        with self._lock:
+            self._ensure_loaded()
+            self._listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def on_event(self, kind, data):
+        if kind in ('medicine', 'stock'):
+            self.update(data['medicine_id'], data['quantity'])
+    
+    def update(self, medicine_id, quantity):
+        with self._lock:
+            if not self._loaded:
+                # الكمية الجديدة في السجل مسبقاً وستُقرأ عند أول استعلام
+                return
+            previous = self._levels.get(medicine_id)
+            if previous == quantity:
+                return
+            if previous is not None:
+                del self._order[bisect.bisect_left(self._order, (previous, medicine_id))]
+            self._levels[medicine_id] = quantity
+            bisect.insort(self._order, (quantity, medicine_id))
+        
+        was_low = previous is not None and previous < self.reorder_level
+        is_low = quantity < self.reorder_level
+        if is_low != was_low:
+            event = 'low' if is_low else 'restocked'
+            for listener in self._listeners:
+                listener(event, medicine_id, quantity)
+    
+    def quantity(self, medicine_id):
+        with self._lock:
+            self._ensure_loaded()
+            return self._levels.get(medicine_id)
+    
+    def lowest(self, count):
+        with self._lock:
+            self._ensure_loaded()
+            return [(medicine_id, quantity) for quantity, medicine_id in self._order[:count]]
+    
+    def below(self, threshold=None):
+        threshold = self.reorder_level if threshold is None else threshold
+        with self._lock:
+            self._ensure_loaded()
+            end = bisect.bisect_left(self._order, (threshold,))
+            return [(medicine_id, quantity) for quantity, medicine_id in self._order[:end]]
+    
+    def count_below(self, threshold=None):
+        threshold = self.reorder_level if threshold is None else threshold
+        with self._lock:
+            self._ensure_loaded()
+            return bisect.bisect_left(self._order, (threshold,))
+
+# ==============================================
+# مخزن تحليلات عمودي (NumPy) - اختياري
+# ==============================================
+
+class _Column:
+    def __init__(self, dtype, capacity=1024):
+        self._data = np.zeros(capacity, dtype=dtype)
+        self.size = 0
+    
+    @property
+    def values(self):
+        return self._data[:self.size]
+    
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed > len(self._data):
+            # مضاعفة السعة حتى تبقى الإضافة بكلفة ثابتة في المتوسط
+            data = np.zeros(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            data[:self.size] = self.values
+            self._data = data
+    
+    def append(self, value):
+        self._reserve(1)
+        self._data[self.size] = value
+        self.size += 1
+        return self.size - 1
+    
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        self._reserve(len(values))
+        self._data[self.size:self.size + len(values)] = values
+        self.size += len(values)
+    
+    def __setitem__(self, index, value):
+        self._data[index] = value
+
+class _Codes:
+    # ترميز القيم النصية بأرقام صغيرة للتجميع المتجه
+    def __init__(self):
+        self._codes = {}
+        self.labels = []
+    
+    def encode(self, label):
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+    
+    def lookup(self, label):
+        # للاستعلامات: قيمة غير معروفة تعطي -1 فلا تطابق أي صف، ولا يُضاف رمز جديد
+        return self._codes.get(label, -1)
+
+def _day_number(date):
+    try:
+        return datetime.date.fromisoformat(date).toordinal()
+    except (TypeError, ValueError):
+        return -1
+
+class ColumnarStore:
+    AGE_BINS = (0, 18, 30, 45, 60, 75)
+    
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("Columnar analytics require the optional 'numpy' package")
+        self._lock = threading.Lock()
+        self._genders = _Codes()
+        self._categories = _Codes()
+        self._specialties = _Codes()
+        self._statuses = _Codes()
+        self._doctor_specialty = {}
+        
+        self._patient_rows = {}
+        self._patient_age = _Column(np.int16)
+        self._patient_gender = _Column(np.int16)
+        
+        self._medicine_rows = {}
+        self._medicine_ids = []
+        self._medicine_price = _Column(np.float64)
+        self._medicine_quantity = _Column(np.int64)
+        self._medicine_category = _Column(np.int32)
+        
+        self._appointment_rows = {}
+        self._appointment_day = _Column(np.int32)
+        self._appointment_specialty = _Column(np.int32)
+        self._appointment_status = _Column(np.int16)
+    
+    @classmethod
+    def from_hospital(cls, hospital):
+        store = cls()
+        for data in hospital.iter_records('doctors', ('doctor_id', 'specialty')):
+            store.add_doctor(data['doctor_id'], data['specialty'])
+        for data in hospital.iter_records('patients', ('patient_id', 'age', 'gender')):
+            store.add_patient(data['patient_id'], data['age'], data['gender'])
+        for data in hospital.iter_records('medicines', ('medicine_id', 'price', 'quantity', 'category')):
+            store.add_medicine(data['medicine_id'], data['price'], data['quantity'], data['category'])
+        for data in hospital.iter_records('appointments', ('appointment_id', 'date', 'doctor_id', 'status')):
+            store.add_appointment(data['appointment_id'], data['date'], data['doctor_id'], data['status'])
+        return store
+    
+    # ---------- المزامنة مع عمليات الكتابة ----------
+    
+    def on_event(self, kind, data):
+        if kind == 'patient':
+            self.add_patient(data['patient_id'], data['age'], data['gender'])
+        elif kind == 'doctor':
+            self.add_doctor(data['doctor_id'], data['specialty'])
+        elif kind == 'medicine':
+            self.add_medicine(data['medicine_id'], data['price'], data['quantity'], data['category'])
+        elif kind == 'appointment':
+            self.add_appointment(data['appointment_id'], data['date'], data['doctor_id'], data['status'])
+        elif kind == 'stock':
+            self.set_stock(data['medicine_id'], data['quantity'])
+    
+    def add_patient(self, patient_id, age, gender):
+        # الإضافة المكررة لنفس المعرف تحدّث الصف بدل تكراره
+        with self._lock:
+            row = self._patient_rows.get(patient_id)
+            if row is None:
+                self._patient_rows[patient_id] = self._patient_age.append(age)
+                self._patient_gender.append(self._genders.encode(gender))
+            else:
+                self._patient_age[row] = age
+                self._patient_gender[row] = self._genders.encode(gender)
+    
+    def add_doctor(self, doctor_id, specialty):
+        with self._lock:
+            self._doctor_specialty[doctor_id] = self._specialties.encode(specialty)
+    
+    def add_medicine(self, medicine_id, price, quantity, category):
+        with self._lock:
+            row = self._medicine_rows.get(medicine_id)
+            if row is None:
+                self._medicine_rows[medicine_id] = self._medicine_price.append(price)
+                self._medicine_ids.append(medicine_id)
+                self._medicine_quantity.append(quantity)
+                self._medicine_category.append(self._categories.encode(category))
+            else:
+                self._medicine_price[row] = price
+                self._medicine_quantity[row] = quantity
+                self._medicine_category[row] = self._categories.encode(category)
+    
+    def set_stock(self, medicine_id, quantity):
+        with self._lock:
+            row = self._medicine_rows.get(medicine_id)
+            if row is not None:
+                self._medicine_quantity[row] = quantity
+    
+    def add_appointment(self, appointment_id, date, doctor_id, status):
+        with self._lock:
+            specialty = self._doctor_specialty.get(doctor_id)
+            if specialty is None:
+                specialty = self._specialties.encode("Unknown")
+            values = (_day_number(date), specialty, self._statuses.encode(status))
+            row = self._appointment_rows.get(appointment_id)
+            if row is None:
+                self._appointment_rows[appointment_id] = self._appointment_day.append(values[0])
+                self._appointment_specialty.append(values[1])
+                self._appointment_status.append(values[2])
+            else:
+                self._appointment_day[row], self._appointment_specialty[row], self._appointment_status[row] = values
+    
+    # ---------- الاستعلامات المتجهة ----------
+    
+    def stock_value(self, category=None):
+        with self._lock:
+            values = self._medicine_price.values * self._medicine_quantity.values
+            if category is not None:
+                values = values[self._medicine_category.values == self._categories.lookup(category)]
+            return float(values.sum())
+    
+    def stock_value_by_category(self):
+        with self._lock:
+            totals = np.bincount(self._medicine_category.values,
+                                 weights=self._medicine_price.values * self._medicine_quantity.values,
+                                 minlength=len(self._categories.labels))
+            return dict(zip(self._categories.labels, totals.tolist()))
+    
+    def low_stock(self, threshold):
+        with self._lock:
+            rows = np.flatnonzero(self._medicine_quantity.values < threshold)
+            return [self._medicine_ids[row] for row in rows.tolist()]
+    
+    def age_distribution(self, bins=AGE_BINS):
+        labels = [f"{low}-{high - 1}" for low, high in zip(bins, bins[1:])] + [f"{bins[-1]}+"]
+        with self._lock:
+            groups = np.searchsorted(np.asarray(bins), self._patient_age.values, side='right') - 1
+            counts = np.bincount(groups[groups >= 0], minlength=len(bins))
+        return dict(zip(labels, counts.tolist()))
+    
+    def patients_by_gender(self):
+        with self._lock:
+            counts = np.bincount(self._patient_gender.values, minlength=len(self._genders.labels))
+            return dict(zip(self._genders.labels, counts.tolist()))
+    
+    def appointments_by_specialty(self, start_date=None, end_date=None, status=None):
+        with self._lock:
+            days = self._appointment_day.values
+            mask = np.ones(len(days), dtype=bool)
+            if start_date is not None:
+                mask &= days >= _day_number(_date_key(start_date))
+            if end_date is not None:
+                mask &= days <= _day_number(_date_key(end_date))
+            if status is not None:
+                mask &= self._appointment_status.values == self._statuses.lookup(status)
+            counts = np.bincount(self._appointment_specialty.values[mask], minlength=len(self._specialties.labels))
+            return dict(zip(self._specialties.labels, counts.tolist()))
+
+# ==============================================
+# واجهات التخزين
+# ==============================================
+
+class StorageBackend(ABC):
+    # هل توفر الواجهة iter_raw لقراءة السجلات غير المحمّلة دفعة واحدة
+    BATCH_READS = False
+    
+    @property
+    @abstractmethod
+    def attached(self):
+        pass
+    
+    @abstractmethod
+    def record(self, kind, data):
+        pass
+    
+    def has_data(self):
+        # هل توجد بيانات محفوظة مسبقاً؟ تُستخدم لمنع الكتابة فوقها قبل تحميلها
+        return False
+    
+    def record_many(self, kind, records):
+        for data in records:
+            self.record(kind, data)
+    
+    @abstractmethod
+    def flush(self):
+        pass
+    
+    @abstractmethod
+    def write_snapshot(self, state):
+        pass
+    
+    @abstractmethod
+    def load(self):
+        pass
+    
+    def fetch(self, collection, entity_id):
+        raise KeyError(entity_id)
+    
+    def close(self):
+        pass
+
+# ==============================================
+# تخزين JSON: سجل الكتابة المسبقة (Journal) واللقطات
+# ==============================================
+
+class JsonStorage(StorageBackend):
+    SNAPSHOT_FILES = {
+        'patients': 'patients.json',
+        'doctors': 'doctors.json',
+        'medicines': 'medicines.json',
+        'appointments': 'appointments.json',
+        'prescriptions': 'prescriptions.json',
+    }
+    ID_KEYS = {
+        'patients': 'patient_id',
+        'doctors': 'doctor_id',
+        'medicines': 'medicine_id',
+        'appointments': 'appointment_id',
+        'prescriptions': 'prescription_id',
+    }
+    
+    # off: بدون fsync | normal: fsync للقطات فقط | full: fsync للسجل أيضاً عند كل تفريغ
+    DURABILITY_MODES = ('off', 'normal', 'full')
+    # مُرمِّز واحد لكل السطور بدل إنشاء مُرمِّز جديد في كل استدعاء لـ json.dumps
+    _encode = json.JSONEncoder(separators=(',', ':')).encode
+    
+    def __init__(self, data_dir=".", compact_threshold=5000, durability="normal"):
+        if durability not in self.DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode '{durability}'")
+        self._data_dir = data_dir
+        self._compact_threshold = compact_threshold
+        self._durability = durability
+        self._journal_path = os.path.join(data_dir, 'journal.log')
+        self._compacting_path = os.path.join(data_dir, 'journal.compacting')
+        self._manifest_path = os.path.join(data_dir, 'snapshot.json')
+        self._commit_path = os.path.join(data_dir, 'snapshot.commit')
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._pending = 0
+        self._compactor = None
+    
+    @property
+    def attached(self):
+        return self._file is not None
+    
+    def has_data(self):
+        return any(os.path.exists(os.path.join(self._data_dir, filename))
+                   for filename in self.SNAPSHOT_FILES.values())
+    
+    def record(self, kind, data):
+        with self._lock:
+            if self._file is None:
+                return
+            self._seq += 1
+            self._file.write(self._encode({'seq': self._seq, 'kind': kind, 'data': data}) + "\n")
+            self._pending += 1
+    
+    def record_many(self, kind, records):
+        # قفل واحد وكتابة واحدة للدفعة كلها؛ الدمج في اللقطات يتولاه الضغط عند الحفظ
+        with self._lock:
+            if self._file is None:
+                return
+            encode, lines = self._encode, []
+            for data in records:
+                self._seq += 1
+                lines.append(encode({'seq': self._seq, 'kind': kind, 'data': data}) + "\n")
+            self._file.writelines(lines)
+            self._pending += len(lines)
+    
+    def flush(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            if self._durability == 'full':
+                os.fsync(self._file.fileno())
+            if self._compactor and self._compactor.is_alive():
+                return
+            if not os.path.exists(self._compacting_path):
+                if self._pending < self._compact_threshold:
+                    return
+                # تدوير السجل ثم دمجه في اللقطات في الخلفية
+                self._file.close()
+                os.replace(self._journal_path, self._compacting_path)
+                self._file = open(self._journal_path, 'a')
+                self._pending = 0
+            self._compactor = threading.Thread(target=self._compact, daemon=True)
+            self._compactor.start()
+    
+    def wait_for_compaction(self):
+        compactor = self._compactor
+        if compactor:
+            compactor.join()
+    
+    def close(self):
+        # الضغط يعمل في خيط خلفي، فالخروج قبل انتهائه قد يقطع كتابة اللقطات
+        self.wait_for_compaction()
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            if self._durability == 'full':
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+    
+    def write_snapshot(self, state):
+        self.wait_for_compaction()
+        with self._lock, self._snapshot_lock:
+            if self._file:
+                self._file.close()
+            self._recover_snapshot()
+            self._write_snapshot_files(state, self._seq)
+            for path in (self._journal_path, self._compacting_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._file = open(self._journal_path, 'a')
+            self._pending = 0
+    
+    def load(self):
+        self.wait_for_compaction()
+        with self._lock, self._snapshot_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._recover_snapshot()
+            state, snapshot_seq = self._read_snapshot(lazy=True)
+            records = []
+            for path in (self._compacting_path, self._journal_path):
+                records.extend(self._read_journal(path, snapshot_seq))
+            self._seq = max([snapshot_seq] + [record['seq'] for record in records])
+            self._pending = len(records)
+            self._file = open(self._journal_path, 'a')
+        return state, records
+    
+    def _read_snapshot(self, lazy=False):
+        state = {}
+        for key, filename in self.SNAPSHOT_FILES.items():
+            path = os.path.join(self._data_dir, filename)
+            if key == 'prescriptions' and not os.path.exists(path):
+                state[key] = self._embedded_prescriptions(state['patients'], lazy)
+                continue
+            with open(path, 'r') as f:
+                if lazy:
+                    state[key] = list(self._iter_keyed_records(f, self.ID_KEYS[key]))
+                else:
+                    state[key] = [
+                        json.loads(record) if isinstance(record, str) else record
+                        for record in self._iter_array_records(f)
+                    ]
+        snapshot_seq = 0
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, 'r') as f:
+                snapshot_seq = json.load(f)['seq']
+        return state, snapshot_seq
+    
+    @staticmethod
+    def _embedded_prescriptions(patients, lazy):
+        # اللقطات القديمة كانت تحفظ الوصفات داخل سجلات المرضى فقط
+        prescriptions = []
+        for record in patients:
+            data = record[1] if lazy else record
+            if isinstance(data, str):
+                data = json.loads(data)
+            for prescription in data.get('prescriptions', []):
+                if isinstance(prescription, dict):
+                    prescriptions.append((prescription['prescription_id'], prescription) if lazy else prescription)
+        return prescriptions
+    
+    def _read_journal(self, path, after_seq):
+        records = []
+        if not os.path.exists(path):
+            return records
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # سطر أخير مبتور بسبب انقطاع الكتابة
+                    break
+                if record['seq'] > after_seq:
+                    records.append(record)
+        return records
+    
+    def _iter_keyed_records(self, f, id_key):
+        # المعرف هو أول مفتاح في كل سجل فيُقرأ دون تحليل السجل كاملاً
+        prefix = '{"%s":"' % id_key
+        start = len(prefix)
+        for record in self._iter_array_records(f):
+            end = record.find('"', start) if isinstance(record, str) and record.startswith(prefix) else -1
+            if end > 0 and "\\" not in record[start:end]:
+                yield record[start:end], record
+            else:
+                data = json.loads(record) if isinstance(record, str) else record
+                yield data[id_key], data
+    
+    def _iter_array_records(self, f):
+        # اللقطات تُكتب بسجل واحد في كل سطر فتُقرأ سطراً بسطر دون تحليلها
+        first_line = f.readline()
+        second_line = f.readline() if first_line == "[\n" else ""
+        if second_line == "]\n":
+            return
+        if second_line.startswith("{"):
+            for line in itertools.chain((second_line,), f):
+                line = line.rstrip("\n")
+                if line == "]":
+                    return
+                yield line[:-1] if line.endswith(",") else line
+            return
+        f.seek(0)
+        yield from self._iter_json_array(f)
+    
+    @staticmethod
+    def _iter_json_array(f, chunk_size=1 << 16):
+        # تحليل تدريجي لملفات JSON القديمة (المنسقة بـ indent) عنصراً بعنصر
+        decoder = json.JSONDecoder()
+        buffer, pos, opened, eof = "", 0, False, False
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer) - 1 and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            if pos >= len(buffer):
+                raise ValueError("Unexpected end of JSON array")
+            if not opened:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                opened, pos = True, pos + 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield record
+            pos = end
+    
+    def _sync_file(self, f):
+        if self._durability != 'off':
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _sync_dir(self):
+        # ويندوز لا يسمح بـ fsync على المجلدات، وإعادة التسمية فيه مضمونة بدونها
+        if self._durability != 'off' and os.name != 'nt':
+            fd = os.open(self._data_dir or ".", os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+    
+    def _write_snapshot_files(self, state, seq):
+        # 1) كل ملف يُكتب في نسخة مؤقتة بجانبه ولا يُلمس الملف الأصلي
+        staged = []
+        for key, filename in self.SNAPSHOT_FILES.items():
+            with open(os.path.join(self._data_dir, filename + '.tmp'), 'w') as f:
+                f.write("[\n")
+                separator = ""
+                for record in state[key]:
+                    if not isinstance(record, str):
+                        record = json.dumps(record, separators=(',', ':'))
+                    f.write(separator + record)
+                    separator = ",\n"
+                f.write("\n]\n")
+                self._sync_file(f)
+            staged.append(filename)
+        with open(self._manifest_path + '.tmp', 'w') as f:
+            json.dump({'seq': seq}, f)
+            self._sync_file(f)
+        staged.append(os.path.basename(self._manifest_path))
+        
+        # 2) علامة الالتزام: بعد ظهورها تُعتبر اللقطة الجديدة كاملة
+        with open(self._commit_path + '.tmp', 'w') as f:
+            json.dump({'seq': seq, 'files': staged}, f)
+            self._sync_file(f)
+        os.replace(self._commit_path + '.tmp', self._commit_path)
+        self._sync_dir()
+        
+        # 3) استبدال الملفات ثم حذف العلامة
+        self._apply_commit(staged)
+    
+    def _apply_commit(self, filenames):
+        for filename in filenames:
+            path = os.path.join(self._data_dir, filename)
+            if os.path.exists(path + '.tmp'):
+                os.replace(path + '.tmp', path)
+        self._sync_dir()
+        os.remove(self._commit_path)
+        self._sync_dir()
+    
+    def _recover_snapshot(self):
+        # إكمال لقطة ملتزمة انقطعت أثناء الاستبدال، أو تجاهل لقطة لم تكتمل
+        if os.path.exists(self._commit_path):
+            with open(self._commit_path, 'r') as f:
+                self._apply_commit(json.load(f)['files'])
+            return
+        leftovers = [os.path.join(self._data_dir, filename) for filename in self.SNAPSHOT_FILES.values()]
+        for path in leftovers + [self._manifest_path, self._commit_path]:
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+    
+    def _compact(self):
+        with self._snapshot_lock:
+            self._recover_snapshot()
+            state, snapshot_seq = self._read_snapshot()
+            records = self._read_journal(self._compacting_path, snapshot_seq)
+            if records:
+                state = self._fold_records(state, records)
+                self._write_snapshot_files(state, records[-1]['seq'])
+            os.remove(self._compacting_path)
+    
+    @staticmethod
+    def _fold_records(state, records):
+        patients = {data['patient_id']: data for data in state['patients']}
+        doctors = {data['doctor_id']: data for data in state['doctors']}
+        medicines = {data['medicine_id']: data for data in state['medicines']}
+        appointments = {data['appointment_id']: data for data in state['appointments']}
+        prescriptions = {data['prescription_id']: data for data in state['prescriptions']}
+        
+        # مثل _apply_record: سطر لكيان موجود في اللقطة يُتجاهل، فنسخة اللقطة هي الأحدث
+        for record in records:
+            kind, data = record['kind'], record['data']
+            if kind == 'patient':
+                patients.setdefault(data['patient_id'], data)
+            elif kind == 'doctor':
+                doctors.setdefault(data['doctor_id'], data)
+            elif kind == 'medicine':
+                medicines.setdefault(data['medicine_id'], data)
+            elif kind == 'appointment':
+                if data['appointment_id'] in appointments:
+                    continue
+                appointments[data['appointment_id']] = data
+                if data['patient_id'] in patients:
+                    patients[data['patient_id']].setdefault('appointments', []).append(data['appointment_id'])
+                if data['doctor_id'] in doctors:
+                    doctors[data['doctor_id']].setdefault('appointments', []).append(data['appointment_id'])
+            elif kind == 'prescription':
+                if data['prescription_id'] in prescriptions:
+                    continue
+                prescriptions[data['prescription_id']] = data
+                if data['patient_id'] in patients:
+                    patients[data['patient_id']].setdefault('prescriptions', []).append(data['prescription_id'])
+            elif kind == 'stock':
+                if data['medicine_id'] in medicines:
+                    medicines[data['medicine_id']]['quantity'] = data['quantity']
+        
+        # dict.fromkeys يحذف المعرفات المكررة مع الإبقاء على ترتيبها
+        for data in itertools.chain(patients.values(), doctors.values()):
+            data['appointments'] = list(dict.fromkeys(_reference_ids(data.get('appointments', []), 'appointment_id')))
+        for data in patients.values():
+            data['prescriptions'] = list(dict.fromkeys(_reference_ids(data.get('prescriptions', []), 'prescription_id')))
+        
+        return {
+            'patients': list(patients.values()),
+            'doctors': list(doctors.values()),
+            'medicines': list(medicines.values()),
+            'appointments': list(appointments.values()),
+            'prescriptions': list(prescriptions.values()),
+        }
+
+# ==============================================
+# تخزين SQLite
+# ==============================================
+
+class SqliteStorage(StorageBackend):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS patients (
+            patient_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            age INTEGER,
+            gender TEXT,
+            phone TEXT,
+            address TEXT,
+            medical_history TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_patients_name ON patients(name);
+        CREATE INDEX IF NOT EXISTS idx_patients_phone ON patients(phone);
+        
+        CREATE TABLE IF NOT EXISTS doctors (
+            doctor_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            specialty TEXT,
+            phone TEXT,
+            email TEXT,
+            schedule TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_doctors_specialty ON doctors(specialty);
+        
+        CREATE TABLE IF NOT EXISTS medicines (
+            medicine_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            price REAL,
+            quantity INTEGER,
+            category TEXT,
+            dosage TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_medicines_category ON medicines(category);
+        CREATE INDEX IF NOT EXISTS idx_medicines_quantity ON medicines(quantity);
+        
+        CREATE TABLE IF NOT EXISTS appointments (
+            appointment_id TEXT PRIMARY KEY,
+            patient_id TEXT NOT NULL,
+            doctor_id TEXT NOT NULL,
+            date TEXT,
+            time TEXT,
+            reason TEXT,
+            status TEXT,
+            created_by TEXT,
+            duration INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(date, time);
+        CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments(patient_id);
+        CREATE INDEX IF NOT EXISTS idx_appointments_doctor ON appointments(doctor_id, date);
+        
+        CREATE TABLE IF NOT EXISTS prescriptions (
+            prescription_id TEXT PRIMARY KEY,
+            patient_id TEXT NOT NULL,
+            items TEXT NOT NULL,
+            date TEXT,
+            prescribed_by TEXT,
+            doctor_id TEXT,
+            notes TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_prescriptions_patient ON prescriptions(patient_id);
+    """
+    
+    COLUMNS = {
+        'patients': ('patient_id', 'name', 'age', 'gender', 'phone', 'address', 'medical_history'),
+        'doctors': ('doctor_id', 'name', 'specialty', 'phone', 'email', 'schedule'),
+        'medicines': ('medicine_id', 'name', 'price', 'quantity', 'category', 'dosage'),
+        'appointments': ('appointment_id', 'patient_id', 'doctor_id', 'date', 'time', 'reason', 'status',
+                         'created_by', 'duration'),
+        'prescriptions': ('prescription_id', 'patient_id', 'items', 'date', 'prescribed_by', 'doctor_id', 'notes'),
+    }
+    
+    SYNCHRONOUS = {'off': 'OFF', 'normal': 'NORMAL', 'full': 'FULL'}
+    
+    RAW_PAGE_SIZE = 1000
+    BATCH_READS = True
+    
+    def __init__(self, path="hospital.db", batch_size=500, durability="normal"):
+        if durability not in self.SYNCHRONOUS:
+            raise ValueError(f"Unknown durability mode '{durability}'")
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._batch = []
+        self._attached = False
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={self.SYNCHRONOUS[durability]}")
+        self._conn.executescript(self.SCHEMA)
+    
+    @property
+    def attached(self):
+        return self._attached
+    
+    def has_data(self):
+        with self._lock:
+            return any(self._conn.execute(f"SELECT 1 FROM {collection} LIMIT 1").fetchone()
+                       for collection in self.COLUMNS)
+    
+    def record(self, kind, data):
+        with self._lock:
+            if not self._attached:
+                return
+            self._batch.append(self._statement(kind, data))
+            if len(self._batch) >= self._batch_size:
+                self._commit_batch()
+    
+    def record_many(self, kind, records):
+        # الدفعة كلها في معاملة واحدة مهما كان حجمها
+        with self._lock:
+            if not self._attached:
+                return
+            self._batch.extend(self._statement(kind, data) for data in records)
+            self._commit_batch()
+    
+    def flush(self):
+        with self._lock:
+            self._commit_batch()
+    
+    def write_snapshot(self, state):
+        with self._lock:
+            self._batch = []
+            with self._conn:
+                for collection in self.COLUMNS:
+                    self._conn.execute(f"DELETE FROM {collection}")
+                    for data in state[collection]:
+                        if isinstance(data, str):
+                            data = json.loads(data)
+                        self._conn.execute(*self._statement(collection[:-1], data))
+            self._attached = True
+    
+    def load(self):
+        with self._lock:
+            self._commit_batch()
+            state = {}
+            # لا يُقرأ من جداول الكيانات إلا المعرفات، وتُجلب الصفوف عند الحاجة
+            for collection, columns in self.COLUMNS.items():
+                if collection == 'appointments':
+                    # المواعيد تُقرأ كاملة لأن فهرس التقويم يحتاجها عند التحميل
+                    rows = self._conn.execute("SELECT * FROM appointments ORDER BY date, time")
+                    state[collection] = [(row[0], dict(row)) for row in rows]
+                    continue
+                rows = self._conn.execute(f"SELECT {columns[0]} FROM {collection}")
+                state[collection] = [(row[0], None) for row in rows]
+            self._attached = True
+        return state, []
+    
+    def fetch(self, collection, entity_id):
+        with self._lock:
+            id_column = self.COLUMNS[collection][0]
+            row = self._conn.execute(
+                f"SELECT * FROM {collection} WHERE {id_column} = ?", (entity_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(entity_id)
+            data = dict(row)
+            if collection in ('patients', 'doctors'):
+                rows = self._conn.execute(
+                    f"SELECT appointment_id FROM appointments WHERE {id_column} = ? ORDER BY date, time", (entity_id,)
+                )
+                data['appointments'] = [row[0] for row in rows]
+            if collection == 'patients':
+                rows = self._conn.execute(
+                    "SELECT prescription_id FROM prescriptions WHERE patient_id = ? ORDER BY date", (entity_id,)
+                )
+                data['prescriptions'] = [row[0] for row in rows]
+            if collection == 'prescriptions':
+                data['items'] = json.loads(data['items'])
+            return data
+    
+    def iter_raw(self, collection, fields=None):
+        # استعلام واحد لكل دفعة من الصفوف بدل ثلاثة استعلامات لكل سجل عبر fetch؛
+        # بدون fields تُعاد الصفوف بنفس شكل fetch مع قوائم المواعيد والوصفات
+        id_column = self.COLUMNS[collection][0]
+        columns = list(fields or self.COLUMNS[collection])
+        unknown = set(columns) - set(self.COLUMNS[collection])
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {collection}: {', '.join(sorted(unknown))}")
+        if id_column not in columns:
+            columns.insert(0, id_column)
+        selected = [f"t.{column}" for column in columns]
+        if fields is None and collection in ('patients', 'doctors'):
+            selected.append(self._related_ids('appointment_id', 'appointments', id_column, "date, time"))
+        if fields is None and collection == 'patients':
+            selected.append(self._related_ids('prescription_id', 'prescriptions', id_column, "date"))
+        query = (f"SELECT {', '.join(selected)} FROM {collection} t "
+                 f"WHERE t.{id_column} > ? ORDER BY t.{id_column} LIMIT {self.RAW_PAGE_SIZE}")
+        last_id = ""
+        with self._lock:
+            self._commit_batch()
+        while True:
+            # القفل يُحرر بين الدفعات حتى لا تنتظر الكتابات انتهاء المرور كله
+            with self._lock:
+                rows = self._conn.execute(query, (last_id,)).fetchall()
+            for row in rows:
+                data = dict(row)
+                for key in ('appointments', 'prescriptions'):
+                    if key in data:
+                        data[key] = json.loads(data[key])
+                if 'items' in data:
+                    data['items'] = json.loads(data['items'])
+                yield row[0], data
+            if len(rows) < self.RAW_PAGE_SIZE:
+                return
+            last_id = rows[-1][0]
+    
+    @staticmethod
+    def _related_ids(key, table, id_column, order):
+        return (f"(SELECT json_group_array({key}) FROM (SELECT {key} FROM {table} "
+                f"WHERE {id_column} = t.{id_column} ORDER BY {order})) AS {table}")
+    
+    def close(self):
+        self.flush()
+        self._conn.close()
+    
+    def _commit_batch(self):
+        if not self._batch:
+            return
+        # دفعة واحدة داخل معاملة واحدة
+        with self._conn:
+            for statement in self._batch:
+                self._conn.execute(*statement)
+        self._batch = []
+    
+    def _statement(self, kind, data):
+        if kind == 'stock':
+            return "UPDATE medicines SET quantity = ? WHERE medicine_id = ?", (data['quantity'], data['medicine_id'])
+        collection = kind + 's'
+        columns = self.COLUMNS[collection]
+        values = [data.get(column) for column in columns]
+        if kind == 'prescription':
+            values[columns.index('items')] = json.dumps(data['items'], separators=(',', ':'))
+        placeholders = ", ".join("?" * len(columns))
+        return (
+            f"INSERT OR REPLACE INTO {collection} ({', '.join(columns)}) VALUES ({placeholders})",
+            tuple(values),
+        )
+
+# ==============================================
+# نظام إدارة المستشفى
+# ==============================================
+
+class HospitalManagementSystem:
+    def __init__(self, storage=None):
+        self._storage = storage or JsonStorage()
+        self._patients = EntityRegistry('patient_id', self._entity_loader('patients', Patient))
+        self._doctors = EntityRegistry('doctor_id', self._entity_loader('doctors', Doctor))
+        self._medicines = EntityRegistry('medicine_id', self._entity_loader('medicines', Medicine))
+        self._appointments = EntityRegistry('appointment_id', self._entity_loader('appointments', Appointment))
+        self._prescriptions = EntityRegistry('prescription_id', self._entity_loader('prescriptions', Prescription))
+        self._calendar = AppointmentCalendar()
+        self._schedules = {}
+        self._appointment_ids = IdGenerator("A")
+        self._prescription_ids = IdGenerator("RX")
+        self._stock_locks = LockStripes()
+        self._doctor_locks = LockStripes()
+        self._schedules_lock = threading.Lock()
+        self._patient_index = None
+        self._patient_index_lock = threading.Lock()
+        self._metrics = HospitalMetrics(self._metrics_state)
+        self._inventory = InventoryMonitor(loader=self._stock_levels)
+        self._analytics = None
+        self._analytics_lock = threading.Lock()
+        # أحداث الكتابة التي تصل أثناء بناء المخزن العمودي، تُطبق عليه بعد اكتماله
+        self._analytics_pending = None
+        self._analytics_event_lock = threading.Lock()
+        self._listeners = []
+        self._users = CredentialStore()
+        self._current_user = None
+        self._initialize_default_users()
+        self._load_sample_data()
+        self._reset_metrics()
+        self._reset_inventory()
+    
+    def _entity_loader(self, collection, cls):
+        def load(entity_id, raw):
+            if raw is None:
+                raw = self._storage.fetch(collection, entity_id)
+            return cls.from_dict(json.loads(raw) if isinstance(raw, str) else raw)
+        return load
+    
+    def _initialize_default_users(self):
+        default_admin = Admin("admin", "admin123")
+        default_doctor = DoctorUser("doctor", "doc123", "D001")
+        default_nurse = Nurse("nurse", "nurse123")
+        default_reception = Receptionist("reception", "reception123")
+        for user in (default_admin, default_doctor, default_nurse, default_reception):
+            self._users.add(user)
+    
+    def _load_sample_data(self):
+        sample_patients = [
+            Patient("P001", "Ahmed Mohamed", 35, "Male", "01001234567", "Cairo - New Cairo", "Penicillin allergy"),
+            Patient("P002", "Fatma Ali", 28, "Female", "01009876543", "Giza - Dokki", "No medical history"),
+            Patient("P003", "Mohamed Said", 45, "Male", "01005556677", "Alexandria - Smouha", "High blood pressure, Diabetes"),
+        ]
+        self._patients.reset(sample_patients)
+        
+        sample_doctors = [
+            Doctor("D001", "Dr. Khalid Abdelrahman", "Internal Medicine", "01001112233", "khalid@hospital.com", "Sun-Thu 9AM-5PM"),
+            Doctor("D002", "Dr. Mona Hussein", "Gynecology", "01002223344", "mona@hospital.com", "Sat-Wed 10AM-6PM"),
+            Doctor("D003", "Dr. Amr Ibrahim", "Orthopedic Surgery", "01003334455", "amr@hospital.com", "Mon-Fri 8AM-4PM"),
+            Doctor("D004", "Dr. Sara Mahmoud", "Pediatrics", "01004445566", "sara@hospital.com", "Sun-Thu 11AM-7PM"),
+        ]
+        self._doctors.reset(sample_doctors)
+        
+        sample_medicines = [
+            Medicine("M001", "Paracetamol", 15, 500, "Analgesics", "500mg"),
+            Medicine("M002", "Amoxicillin", 45, 200, "Antibiotics", "500mg"),
+            Medicine("M003", "Atenolol", 30, 150, "Cardiac", "50mg"),
+            Medicine("M004", "Metformin", 25, 300, "Diabetes", "850mg"),
+            Medicine("M005", "Ibuprofen", 20, 400, "Anti-inflammatory", "400mg"),
+            Medicine("M006", "Loratadine", 35, 250, "Antihistamine", "10mg"),
+            Medicine("M007", "Omeprazole", 40, 180, "Gastrointestinal", "20mg"),
+            Medicine("M008", "Citalopram", 55, 120, "Antidepressants", "20mg"),
+        ]
+        self._medicines.reset(sample_medicines)
+    
+    def add_listener(self, callback):
+        # يُستدعى callback(kind, data) بعد كل تعديل يُسجَّل في التخزين
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _record(self, kind, data):
+        self._storage.record(kind, data)
+        self._metrics.on_event(kind, data)
+        self._inventory.on_event(kind, data)
+        if self._analytics is not None or self._analytics_pending is not None:
+            with self._analytics_event_lock:
+                if self._analytics_pending is not None:
+                    self._analytics_pending.append((kind, data))
+                elif self._analytics is not None:
+                    self._analytics.on_event(kind, data)
+        for listener in self._listeners:
+            listener(kind, data)
+    
+    def authenticate(self, username, password):
+        # التحقق دون تغيير المستخدم الحالي: للخدمات التي تخدم عدة جلسات معاً
+        return self._users.authenticate(username, password)
+    
+    def login(self, username, password):
+        user = self.authenticate(username, password)
+        if user is None:
+            return False
+        self._current_user = user
+        return True
+    
+    def logout(self):
+        self._current_user = None
+    
+    def can(self, user, action):
+        return ROLE_POLICY.can(user, action)
+    
+    def load_roles(self, path):
+        try:
+            ROLE_POLICY.load(path)
+            return True, f"Roles loaded: {', '.join(ROLE_POLICY.roles)}"
+        except Exception as e:
+            return False, f"Error loading roles: {e}"
+    
+    def add_user(self, username, password, role):
+        if role not in ROLE_POLICY.roles:
+            return False, f"Unknown role '{role}'"
+        try:
+            self._users.add(StaffUser(username, password, role))
+            return True, f"User '{username}' added successfully!"
+        except ValueError as e:
+            return False, str(e)
+    
+    def get_current_user(self):
+        return self._current_user
+    
+    def _actor_name(self, user):
+        user = user or self._current_user
+        return user.username if user else "Unknown"
+    
+    def get_storage(self):
+        return self._storage
+    
+    def get_patients_list(self):
+        return self._patients
+    
+    def get_doctors_list(self):
+        return self._doctors
+    
+    def get_medicines_list(self):
+        return self._medicines
+    
+    def get_appointments_list(self):
+        return self._appointments
+    
+    def get_prescriptions_list(self):
+        return self._prescriptions
+    
+    def _registry(self, collection):
+        return {
+            'patients': self._patients,
+            'doctors': self._doctors,
+            'medicines': self._medicines,
+            'appointments': self._appointments,
+            'prescriptions': self._prescriptions,
+        }[collection]
+    
+    def get_page(self, collection, offset=0, limit=50):
+        registry = self._registry(collection)
+        return registry.page(offset, limit), len(registry)
+    
+    def count(self, collection):
+        return len(self._registry(collection))
+    
+    def iter_records(self, collection, fields=None):
+        # قواميس مؤقتة من السجلات الخام دون الاحتفاظ بالكائنات في الذاكرة؛ fields تحدد
+        # الحد الأدنى من الحقول المطلوبة وقد تحتوي السجلات المحمّلة حقولاً أكثر
+        # الواجهات التي تحتفظ بالسطر الخام لا تحتاج iter_raw؛ وإلا يُبنى كل سجل على حدة
+        fetch_many = (lambda: self._storage.iter_raw(collection, fields)) if self._storage.BATCH_READS else None
+        for record in self._registry(collection).dump(fetch_many):
+            yield json.loads(record) if isinstance(record, str) else record
+    
+    def bulk_add(self, collection, entities, rejected=None):
+        # إضافة دفعة واحدة ثم إعادة بناء الفهارس مرة واحدة وحفظ واحد للدفعة كلها؛
+        # المواعيد التي حُجز وقتها منذ التحقق لا تُضاف وتُجمع في rejected إن أُعطيت
+        entities = list(entities)
+        skipped = 0
+        try:
+            if collection == 'appointments':
+                entities, conflicts = self._book_many(entities)
+                skipped = len(conflicts)
+                if rejected is not None:
+                    rejected.extend(conflicts)
+            else:
+                self._registry(collection).add_many(entities)
+        except ValueError as e:
+            return False, str(e)
+        if collection == 'patients':
+            with self._patient_index_lock:
+                if self._patient_index is not None:
+                    self._patient_index.add_many((patient.patient_id, patient.name, patient.phone, patient.address)
+                                                 for patient in entities)
+        elif collection == 'medicines':
+            self._reset_inventory()
+        with self._analytics_lock:
+            self._analytics = None
+        self._reset_metrics()
+        self._storage.record_many(collection[:-1], (entity.to_dict() for entity in entities))
+        success, message = self.save_data()
+        if not success:
+            return False, message
+        if skipped:
+            return True, f"{len(entities)} {collection} imported successfully! {skipped} skipped: doctor already booked"
+        return True, f"{len(entities)} {collection} imported successfully!"
+    
+    def _book_many(self, appointments):
+        # نفس قفل الطبيب في schedule_appointment: فحص التعارض والحجز عملية واحدة
+        seen = set()
+        for appointment in appointments:
+            if appointment.appointment_id in seen or appointment.appointment_id in self._appointments:
+                raise ValueError(f"ID '{appointment.appointment_id}' already exists")
+            seen.add(appointment.appointment_id)
+        booked, conflicts = [], []
+        with self._doctor_locks.holding({appointment.doctor_id for appointment in appointments}):
+            for appointment in appointments:
+                if appointment.status != 'Cancelled' and self._slot_conflict(appointment):
+                    conflicts.append(appointment)
+                    continue
+                self._index_appointment(appointment)
+                booked.append(appointment)
+            self._appointments.add_many(booked)
+        for appointment in booked:
+            self._link_owners(appointment)
+        return booked, conflicts
+    
+    def _slot_conflict(self, appointment):
+        try:
+            start = _slot_minutes(appointment.date, appointment.time)
+        except ValueError:
+            return None
+        return self.find_conflict(appointment.doctor_id, start, start + appointment.duration)
+    
+    def import_records(self, collection, path, fmt=None, workers=None, progress=None, error_report=None):
+        return BulkImporter(self, workers).run(collection, path, fmt, progress, error_report)
+    
+    def validate_records(self, collection, path, fmt=None, workers=None, progress=None, error_report=None):
+        # نفس مسار الاستيراد دون إضافة أي سجل: لفحص ملف قبل استيراده
+        return BulkImporter(self, workers).run(collection, path, fmt, progress, error_report, dry_run=True)
+    
+    def get_ids(self, collection):
+        return set(self._registry(collection).ids())
+    
+    def next_id(self, collection):
+        generators = {'appointments': self._appointment_ids, 'prescriptions': self._prescription_ids}
+        return generators[collection].next_id()
+    
+    def find_conflict(self, doctor_id, start, end):
+        # start و end بالدقائق كما تعيدها _slot_minutes
+        schedule = self._schedules.get(doctor_id)
+        return schedule.find_conflict(start, end) if schedule else None
+    
+    def build_search_index(self):
+        # البناء من السجلات الخام دون تحميل كائنات المرضى، مرة واحدة فقط
+        with self._patient_index_lock:
+            if self._patient_index is None:
+                index = PatientSearchIndex()
+                records = self.iter_records('patients', ('patient_id', 'name', 'phone', 'address'))
+                index.add_many((data['patient_id'], data['name'], data.get('phone') or '', data.get('address') or '')
+                               for data in records)
+                self._patient_index = index
+            return self._patient_index
+    
+    def search_patients(self, query, limit=50):
+        # الفهرس الفارغ قيمته False، فالمقارنة مع None لا بالصحة
+        index = self._patient_index
+        if index is None:
+            index = self.build_search_index()
+        return [patient for patient in map(self._patients.get, index.search(query, limit)) if patient]
+    
+    def _index_patient(self, patient):
+        with self._patient_index_lock:
+            if self._patient_index is not None:
+                self._patient_index.add(patient.patient_id, patient.name, patient.phone, patient.address)
+    
+    def get_patient(self, patient_id):
+        return self._patients.get(patient_id)
+    
+    def get_doctor(self, doctor_id):
+        return self._doctors.get(doctor_id)
+    
+    def get_medicine(self, medicine_id):
+        return self._medicines.get(medicine_id)
+    
+    def get_appointment(self, appointment_id):
+        return self._appointments.get(appointment_id)
+    
+    def get_prescription(self, prescription_id):
+        return self._prescriptions.get(prescription_id)
+    
+    def get_analytics(self, build=True):
+        # None عندما لا تكون NumPy مثبتة؛ يُبنى المخزن مرة واحدة ثم يُحدّث مع كل كتابة
+        # build=False للواجهة: يعيد المخزن إن كان جاهزاً دون انتظار بنائه
+        if np is None or not build:
+            return self._analytics
+        with self._analytics_lock:
+            if self._analytics is None:
+                # البناء يمر على كل السجلات؛ ما يُكتب خلاله يُجمع ثم يُعاد تطبيقه
+                # والإعادة آمنة لأن إضافة نفس المعرف تحدّث صفه بدل تكراره
+                with self._analytics_event_lock:
+                    self._analytics_pending = []
+                store = None
+                try:
+                    store = ColumnarStore.from_hospital(self)
+                finally:
+                    with self._analytics_event_lock:
+                        pending, self._analytics_pending = self._analytics_pending, None
+                        if store is not None:
+                            for kind, data in pending:
+                                store.on_event(kind, data)
+                            self._analytics = store
+            return self._analytics
+    
+    def get_dashboard_stats(self, date=None):
+        # قيم محسوبة مسبقاً: لا مسح للسجلات عند كل عرض
+        return self._metrics.snapshot(date or datetime.date.today())
+    
+    def _reset_metrics(self):
+        self._metrics.invalidate()
+    
+    def _metrics_state(self):
+        # يُستدعى مرة عند أول طلب للوحة؛ الوصفات وحدها تحتاج مروراً متدفقاً على السجلات
+        prescriptions_by_day, dispensed_by_day = Counter(), Counter()
+        for data in self.iter_records('prescriptions', ('date', 'items')):
+            prescriptions_by_day[data['date'][:10]] += 1
+            dispensed_by_day[data['date'][:10]] += sum(item['quantity'] for item in data['items'])
+        return ({
+            'patients': len(self._patients),
+            'doctors': len(self._doctors),
+            'medicines': len(self._medicines),
+            'appointments': len(self._appointments),
+            'prescriptions': len(self._prescriptions),
+        }, self._calendar.day_counts(), prescriptions_by_day, dispensed_by_day)
+    
+    def _reset_inventory(self):
+        self._inventory.invalidate()
+    
+    def _stock_levels(self):
+        return [(data['medicine_id'], data['quantity'])
+                for data in self.iter_records('medicines', ('medicine_id', 'quantity'))]
+    
+    def get_low_stock(self, threshold=None):
+        # الأصناف تحت الحد مرتبة من الأقل مخزوناً، دون مرور على كل الأدوية
+        return self._inventory.below(threshold)
+    
+    def get_lowest_stock(self, count=10):
+        return self._inventory.lowest(count)
+    
+    def count_low_stock(self, threshold=None):
+        return self._inventory.count_below(threshold)
+    
+    def get_reorder_level(self):
+        return self._inventory.reorder_level
+    
+    def add_stock_listener(self, callback):
+        self._inventory.add_listener(callback)
+    
+    def remove_stock_listener(self, callback):
+        self._inventory.remove_listener(callback)
+    
+    def get_todays_appointments(self):
+        return self.get_appointments_on(datetime.date.today())
+    
+    def get_appointments_on(self, date):
+        return [self._appointments.get(appointment_id) for appointment_id in self._calendar.on(date)]
+    
+    def get_appointments_between(self, start_date, end_date):
+        return [self._appointments.get(appointment_id)
+                for appointment_id in self._calendar.between(start_date, end_date)]
+    
+    def find_next_free_slot(self, doctor_id, date, time, duration=30):
+        schedule = self._schedules.get(doctor_id)
+        start = _slot_minutes(date, time)
+        return _slot_label(schedule.next_free(start, duration) if schedule else start)
+    
+    def get_week_appointments(self, start_date=None):
+        start_date = start_date or datetime.date.today()
+        if not isinstance(start_date, datetime.date):
+            start_date = datetime.date.fromisoformat(start_date)
+        return self.get_appointments_between(start_date, start_date + datetime.timedelta(days=6))
+    
+    def add_patient(self, patient_data):
+        errors = RECORD_VALIDATOR.check('patients', patient_data)
+        if errors:
+            return False, errors[0]['message']
+        try:
+            patient = Patient(**patient_data)
+            with self._metrics.writing():
+                self._patients.add(patient)
+                self._index_patient(patient)
+                self._record('patient', patient.to_dict())
+            return True, f"Patient '{patient.name}' added successfully!"
+        except Exception as e:
+            return False, str(e)
+    
+    def add_doctor(self, doctor_data):
+        errors = RECORD_VALIDATOR.check('doctors', doctor_data)
+        if errors:
+            return False, errors[0]['message']
+        try:
+            doctor = Doctor(**doctor_data)
+            with self._metrics.writing():
+                self._doctors.add(doctor)
+                self._record('doctor', doctor.to_dict())
+            return True, f"Doctor '{doctor.name}' added successfully!"
+        except Exception as e:
+            return False, str(e)
+    
+    def add_medicine(self, medicine_data):
+        errors = RECORD_VALIDATOR.check('medicines', medicine_data)
+        if errors:
+            return False, errors[0]['message']
+        try:
+            medicine = Medicine(**medicine_data)
+            with self._metrics.writing():
+                self._medicines.add(medicine)
+                self._record('medicine', medicine.to_dict())
+            return True, f"Medicine '{medicine.name}' added successfully!"
+        except Exception as e:
+            return False, str(e)
+    
+    def schedule_appointment(self, appointment_data, user=None):
+        # user هو منفذ العملية؛ بدونه يُستخدم المستخدم الحالي للواجهة
+        errors = RECORD_VALIDATOR.check('appointments', appointment_data)
+        if errors:
+            return False, errors[0]['message']
+        if appointment_data['patient_id'] not in self._patients:
+            return False, f"Patient '{appointment_data['patient_id']}' not found"
+        if appointment_data['doctor_id'] not in self._doctors:
+            return False, f"Doctor '{appointment_data['doctor_id']}' not found"
+        
+        duration = appointment_data.get('duration', 30)
+        try:
+            start = _slot_minutes(appointment_data['date'], appointment_data['time'])
+        except ValueError:
+            return False, "Invalid date or time. Use YYYY-MM-DD and HH:MM"
+        
+        appointment = Appointment(
+            self._appointment_ids.next_id(),
+            appointment_data['patient_id'],
+            appointment_data['doctor_id'],
+            appointment_data['date'],
+            appointment_data['time'],
+            appointment_data.get('reason', ''),
+            created_by=self._actor_name(user),
+            duration=duration
+        )
+        
+        # فحص التعارض والحجز عملية واحدة لكل طبيب
+        with self._metrics.writing():
+            with self._doctor_locks.lock_for(appointment.doctor_id):
+                schedule = self._schedules.get(appointment.doctor_id)
+                if schedule and schedule.find_conflict(start, start + duration):
+                    next_date, next_time = _slot_label(schedule.next_free(start, duration))
+                    return False, f"Doctor is already booked at that time. Next free slot: {next_date} {next_time}"
+                try:
+                    self._link_appointment(appointment)
+                except ValueError as e:
+                    return False, str(e)
+            self._record('appointment', appointment.to_dict())
+        
+        return True, f"Appointment scheduled successfully! ID: {appointment.appointment_id}"
+    
+    def create_prescription(self, prescription_data, user=None):
+        # الفحص قبل أي حجز للمخزون
+        errors = RECORD_VALIDATOR.check('prescriptions', prescription_data)
+        if errors:
+            return False, errors[0]['message']
+        if prescription_data['patient_id'] not in self._patients:
+            return False, f"Patient '{prescription_data['patient_id']}' not found"
+        
+        items = [(item['medicine_id'], item['quantity']) for item in prescription_data['items']]
+        totals = {}
+        for medicine_id, quantity in items:
+            totals[medicine_id] = totals.get(medicine_id, 0) + quantity
+        
+        prescription = Prescription(
+            self._prescription_ids.next_id(),
+            prescription_data['patient_id'],
+            items,
+            datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            self._actor_name(user),
+            prescription_data.get('doctor_id', ''),
+            prescription_data.get('notes', '')
+        )
+        
+        # حجز كل الأصناف معاً: إما أن تُصرف جميعها أو لا يُصرف شيء
+        with self._metrics.writing():
+            with self._stock_locks.holding(totals):
+                medicines = []
+                for medicine_id, quantity in totals.items():
+                    medicine = self._medicines.get(medicine_id)
+                    if not medicine:
+                        return False, f"Medicine '{medicine_id}' not found"
+                    if medicine.quantity < quantity:
+                        return False, f"Insufficient stock for '{medicine.name}'"
+                    medicines.append((medicine, quantity))
+                
+                try:
+                    self._link_prescription(prescription)
+                except ValueError as e:
+                    return False, str(e)
+                
+                for medicine, quantity in medicines:
+                    medicine.quantity -= quantity
+                    self._record('stock', {'medicine_id': medicine.medicine_id, 'quantity': medicine.quantity})
+            self._record('prescription', prescription.to_dict())
+        
+        return True, f"Prescription created successfully! ID: {prescription.prescription_id}"
+    
+    def adjust_stock(self, medicine_id, delta):
+        medicine = self._medicines.get(medicine_id)
+        if not medicine:
+            return False, f"Medicine '{medicine_id}' not found"
+        with self._stock_locks.lock_for(medicine_id):
+            try:
+                medicine.quantity = medicine.quantity + delta
+            except ValueError as e:
+                return False, str(e)
+            self._record('stock', {'medicine_id': medicine_id, 'quantity': medicine.quantity})
+        return True, f"Stock for '{medicine.name}' updated to {medicine.quantity}"
+    
+    def _link_appointment(self, appointment):
+        self._appointments.add(appointment)
+        self._attach_appointment(appointment)
+    
+    def _attach_appointment(self, appointment):
+        self._index_appointment(appointment)
+        self._link_owners(appointment)
+    
+    def _link_owners(self, appointment):
+        patient = self._patients.get(appointment.patient_id)
+        if patient:
+            patient.add_appointment(appointment.appointment_id)
+        
+        doctor = self._doctors.get(appointment.doctor_id)
+        if doctor:
+            doctor.add_appointment(appointment.appointment_id)
+    
+    def _index_appointment(self, appointment):
+        self._index_slot(appointment.appointment_id, appointment.doctor_id, appointment.date,
+                         appointment.time, appointment.duration, appointment.status)
+    
+    def _index_raw_appointment(self, appointment_id, raw):
+        # الفهارس تحتاج خمسة حقول فقط، فيُحلل السطر الخام دون بناء كائن Appointment
+        data = json.loads(raw) if isinstance(raw, str) else raw
+        self._index_slot(appointment_id, data['doctor_id'], data['date'], data['time'],
+                         data.get('duration') or 30, data.get('status', 'Scheduled'))
+    
+    def _index_slot(self, appointment_id, doctor_id, date, time, duration, status):
+        self._calendar.add(date, appointment_id)
+        if status == 'Cancelled':
+            return
+        try:
+            start = _slot_minutes(date, time)
+        except ValueError:
+            # مواعيد قديمة بتنسيق غير صالح لا تدخل في جدول الحجوزات
+            return
+        schedule = self._schedules.get(doctor_id)
+        if schedule is None:
+            with self._schedules_lock:
+                schedule = self._schedules.setdefault(doctor_id, DoctorSchedule())
+        schedule.book(start, start + duration, appointment_id)
+    
+    def _link_prescription(self, prescription):
+        self._prescriptions.add(prescription)
+        
+        patient = self._patients.get(prescription.patient_id)
+        if patient:
+            patient.add_prescription(prescription.prescription_id)
+    
+    def _apply_record(self, kind, data):
+        # إعادة التشغيل يجب أن تتحمل سجلاً موجوداً في اللقطة مسبقاً: لقطة تُكتب أثناء إضافة
+        # متزامنة قد تحتوي الكيان وسطره في السجل معاً، ونسخة اللقطة هي الأحدث دائماً
+        if kind == 'patient':
+            if data['patient_id'] not in self._patients:
+                self._patients.add(Patient.from_dict(data))
+        elif kind == 'doctor':
+            if data['doctor_id'] not in self._doctors:
+                self._doctors.add(Doctor.from_dict(data))
+        elif kind == 'medicine':
+            if data['medicine_id'] not in self._medicines:
+                self._medicines.add(Medicine.from_dict(data))
+        elif kind == 'appointment':
+            if data['appointment_id'] not in self._appointments:
+                self._link_appointment(Appointment.from_dict(data))
+        elif kind == 'prescription':
+            if data['prescription_id'] not in self._prescriptions:
+                self._link_prescription(Prescription.from_dict(data))
+        elif kind == 'stock':
+            medicine = self._medicines.get(data['medicine_id'])
+            if medicine:
+                medicine.quantity = data['quantity']
+    
+    def _snapshot_state(self):
+        return {
+            'patients': self._patients.dump(),
+            'doctors': self._doctors.dump(),
+            'medicines': self._medicines.dump(),
+            'appointments': self._appointments.dump(),
+            'prescriptions': self._prescriptions.dump(),
+        }
+    
+    def save_data(self):
+        try:
+            # بعد أول لقطة كاملة يكفي تفريغ السجل بدل إعادة كتابة كل الملفات
+            if self._storage.attached:
+                self._storage.flush()
+            elif self._storage.has_data():
+                # لقطة من بيانات لم تُحمّل كانت ستمحو ما هو محفوظ على القرص
+                return False, "Saved data exists but was not loaded; load it before saving"
+            else:
+                self._storage.write_snapshot(self._snapshot_state())
+            return True, "All data saved successfully!"
+        except Exception as e:
+            return False, f"Error saving data: {e}"
+    
+    def load_data(self):
+        try:
+            state, records = self._storage.load()
+            self._patients.reset_lazy(state['patients'])
+            self._doctors.reset_lazy(state['doctors'])
+            self._medicines.reset_lazy(state['medicines'])
+            self._appointments.reset_lazy(state['appointments'])
+            self._prescriptions.reset_lazy(state['prescriptions'])
+            with self._patient_index_lock:
+                self._patient_index = None
+            with self._analytics_lock:
+                self._analytics = None
+            self._calendar.reset()
+            self._schedules = {}
+            # السجلات تبقى كسولة؛ التقويم والجداول تُبنى من الحقول الخام مباشرة
+            for appointment_id, raw in state['appointments']:
+                self._index_raw_appointment(appointment_id, raw)
+            
+            for record in records:
+                self._apply_record(record['kind'], record['data'])
+            self._reset_metrics()
+            self._reset_inventory()
+            
+            return True, "All data loaded successfully!"
+        except Exception as e:
+            return False, f"Error loading data: {e}"
+
+# ==============================================
+# الحفظ التلقائي في الخلفية
+# ==============================================
+
+class AutosaveWorker:
+    def __init__(self, hospital, delay=2.0, max_delay=10.0):
+        self._hospital = hospital
+        self._delay = delay
+        self._max_delay = max_delay
+        self._condition = threading.Condition()
+        self._first_change = None
+        self._last_change = None
+        self._force = False
+        self._running = False
+        self._thread = None
+        self.flush_count = 0
+        self.changes_saved = 0
+        self.last_latency = None
+        self.total_latency = 0.0
+        self.last_result = None
+        self._pending_changes = 0
+    
+    @property
+    def average_latency(self):
+        return self.total_latency / self.flush_count if self.flush_count else None
+    
+    @property
+    def pending_changes(self):
+        return self._pending_changes
+    
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._hospital.add_listener(self._on_change)
+            self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        # الإيقاف يحفظ ما تبقى قبل الخروج
+        if self._thread is None:
+            return
+        self._hospital.remove_listener(self._on_change)
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+    
+    def flush_now(self):
+        with self._condition:
+            self._force = True
+            self._condition.notify()
+    
+    def _on_change(self, kind, data):
+        now = monotonic()
+        with self._condition:
+            if self._first_change is None:
+                self._first_change = now
+            self._last_change = now
+            self._pending_changes += 1
+            self._condition.notify()
+    
+    def _due_at(self):
+        # التأجيل حتى تهدأ التعديلات، مع حد أقصى لنافذة التعديلات غير المحفوظة
+        return min(self._last_change + self._delay, self._first_change + self._max_delay)
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._force:
+                    if self._first_change is None:
+                        self._condition.wait()
+                        continue
+                    remaining = self._due_at() - monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                running, forced = self._running, self._force
+                changes = self._pending_changes
+                self._force = False
+                self._first_change = self._last_change = None
+                self._pending_changes = 0
+            
+            if changes or forced or not running:
+                self._flush(changes)
+            if not running:
+                return
+    
+    def _flush(self, changes):
+        started = perf_counter()
+        result = self._hospital.save_data()
+        self.last_latency = perf_counter() - started
+        self.total_latency += self.last_latency
+        self.flush_count += 1
+        self.changes_saved += changes
+        self.last_result = result
+
+# ==============================================
+# محرك التقارير: تجميع متدفق في مرور واحد
+# ==============================================
+
+class _CsvReportWriter:
+    def __init__(self, path, title, columns):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+    
+    def write_row(self, row):
+        self._writer.writerow(row)
+    
+    def close(self, summary):
+        self._writer.writerow(())
+        for key, value in summary.items():
+            self._writer.writerow((key, value))
+        self._file.close()
+
+class _JsonlReportWriter:
+    def __init__(self, path, title, columns):
+        self._file = open(path, 'w', encoding='utf-8')
+        self._columns = columns
+    
+    def write_row(self, row):
+        self._file.write(json.dumps(dict(zip(self._columns, row)), separators=(',', ':')) + "\n")
+    
+    def close(self, summary):
+        self._file.write(json.dumps({'summary': summary}, separators=(',', ':')) + "\n")
+        self._file.close()
+
+class _PdfReportWriter:
+    LINE_HEIGHT = 14
+    MARGIN = 40
+    
+    def __init__(self, path, title, columns):
+        if pdf_canvas is None:
+            raise RuntimeError("PDF reports require the optional 'reportlab' package")
+        self._canvas = pdf_canvas.Canvas(path, pagesize=A4)
+        self._width, self._height = A4
+        self._title = title
+        self._columns = columns
+        self._column_width = (self._width - 2 * self.MARGIN) / len(columns)
+        self._new_page()
+    
+    def _new_page(self):
+        self._canvas.setFont("Helvetica-Bold", 14)
+        self._canvas.drawString(self.MARGIN, self._height - self.MARGIN, self._title)
+        self._y = self._height - self.MARGIN - 2 * self.LINE_HEIGHT
+        self._draw(self._columns, "Helvetica-Bold")
+    
+    def _draw(self, row, font="Helvetica"):
+        if self._y < self.MARGIN:
+            # كل صفحة تُغلق فور امتلائها
+            self._canvas.showPage()
+            self._new_page()
+        self._canvas.setFont(font, 8)
+        for index, value in enumerate(row):
+            self._canvas.drawString(self.MARGIN + index * self._column_width, self._y, str(value)[:24])
+        self._y -= self.LINE_HEIGHT
+    
+    def write_row(self, row):
+        self._draw(row)
+    
+    def close(self, summary):
+        self._y -= self.LINE_HEIGHT
+        for key, value in summary.items():
+            self._draw((key, value), "Helvetica-Bold")
+        self._canvas.save()
+
+class ReportEngine:
+    WRITERS = {
+        'csv': _CsvReportWriter,
+        'jsonl': _JsonlReportWriter,
+        'pdf': _PdfReportWriter,
+    }
+    REPORTS = ('patients', 'inventory', 'daily', 'prescriptions')
+    LOW_STOCK = InventoryMonitor.REORDER_LEVEL
+    PROGRESS_EVERY = 1000
+    
+    def __init__(self, hospital):
+        self._hospital = hospital
+    
+    def generate(self, report, path, fmt=None, date=None, progress=None):
+        if report not in self.REPORTS:
+            raise ValueError(f"Unknown report '{report}'")
+        fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in self.WRITERS:
+            raise ValueError(f"Unknown report format '{fmt}'")
+        
+        title, columns, total, rows, summary = getattr(self, f"_{report}_report")(date or datetime.date.today())
+        writer = self.WRITERS[fmt](path, title, columns)
+        done = 0
+        try:
+            for row in rows:
+                writer.write_row(row)
+                done += 1
+                if progress and done % self.PROGRESS_EVERY == 0:
+                    progress(done, total)
+        finally:
+            # الملخص يكتمل بعد انتهاء المرور على الصفوف
+            summary = summary()
+            writer.close(summary)
+        if progress:
+            progress(done, done)
+        return summary
+    
+    def _patients_report(self, date):
+        stats = {'patients': 0, 'age_total': 0, 'genders': Counter(), 'appointments': 0, 'prescriptions': 0}
+        
+        def rows():
+            for data in self._hospital.iter_records('patients'):
+                appointments = len(data.get('appointments', ()))
+                prescriptions = len(data.get('prescriptions', ()))
+                stats['patients'] += 1
+                stats['age_total'] += data['age']
+                stats['genders'][data['gender']] += 1
+                stats['appointments'] += appointments
+                stats['prescriptions'] += prescriptions
+                yield (data['patient_id'], data['name'], data['age'], data['gender'], data['phone'],
+                       appointments, prescriptions)
+        
+        def summary():
+            return {
+                'total_patients': stats['patients'],
+                'average_age': round(stats['age_total'] / stats['patients'], 1) if stats['patients'] else 0,
+                'genders': dict(stats['genders']),
+                'total_appointments': stats['appointments'],
+                'total_prescriptions': stats['prescriptions'],
+            }
+        
+        columns = ('patient_id', 'name', 'age', 'gender', 'phone', 'appointments', 'prescriptions')
+        return "Patient Report", columns, self._hospital.count('patients'), rows(), summary
+    
+    def _inventory_report(self, date):
+        stats = {'medicines': 0, 'units': 0, 'value': 0.0, 'low_stock': 0, 'categories': Counter()}
+        
+        def rows():
+            for data in self._hospital.iter_records('medicines'):
+                value = data['price'] * data['quantity']
+                stats['medicines'] += 1
+                stats['units'] += data['quantity']
+                stats['value'] += value
+                stats['categories'][data['category']] += value
+                if data['quantity'] < self.LOW_STOCK:
+                    stats['low_stock'] += 1
+                yield (data['medicine_id'], data['name'], data['category'], data['quantity'],
+                       f"{data['price']:.2f}", f"{value:.2f}")
+        
+        def summary():
+            return {
+                'total_medicines': stats['medicines'],
+                'total_units': stats['units'],
+                'stock_value': round(stats['value'], 2),
+                'low_stock_items': stats['low_stock'],
+                'value_by_category': {category: round(value, 2) for category, value in stats['categories'].items()},
+            }
+        
+        columns = ('medicine_id', 'name', 'category', 'quantity', 'price', 'stock_value')
+        return "Inventory Report", columns, self._hospital.count('medicines'), rows(), summary
+    
+    def _daily_report(self, date):
+        day = _date_key(date)
+        stats = {'statuses': Counter(), 'prescriptions': 0, 'units': 0}
+        appointments = self._hospital.get_appointments_on(day)
+        
+        def rows():
+            for appointment in sorted(appointments, key=lambda appointment: appointment.time):
+                stats['statuses'][appointment.status] += 1
+                yield ('appointment', appointment.appointment_id, appointment.time, appointment.patient_id,
+                       appointment.doctor_id, appointment.status)
+            for data in self._hospital.iter_records('prescriptions'):
+                if not data['date'].startswith(day):
+                    continue
+                units = sum(item['quantity'] for item in data['items'])
+                stats['prescriptions'] += 1
+                stats['units'] += units
+                yield ('prescription', data['prescription_id'], data['date'][11:16], data['patient_id'],
+                       data.get('doctor_id', ''), units)
+        
+        def summary():
+            return {
+                'date': day,
+                'appointments': sum(stats['statuses'].values()),
+                'appointments_by_status': dict(stats['statuses']),
+                'prescriptions': stats['prescriptions'],
+                'units_dispensed': stats['units'],
+            }
+        
+        columns = ('type', 'id', 'time', 'patient_id', 'doctor_id', 'status_or_units')
+        total = len(appointments) + self._hospital.count('prescriptions')
+        return f"Daily Report - {day}", columns, total, rows(), summary
+    
+    def _prescriptions_report(self, date):
+        stats = {'prescriptions': 0, 'units': 0, 'medicines': Counter()}
+        
+        def rows():
+            for data in self._hospital.iter_records('prescriptions'):
+                units = 0
+                for item in data['items']:
+                    units += item['quantity']
+                    stats['medicines'][item['medicine_id']] += item['quantity']
+                stats['prescriptions'] += 1
+                stats['units'] += units
+                yield (data['prescription_id'], data['date'], data['patient_id'], data.get('doctor_id', ''),
+                       len(data['items']), units, data.get('prescribed_by', ''))
+        
+        def summary():
+            return {
+                'total_prescriptions': stats['prescriptions'],
+                'total_units': stats['units'],
+                'top_medicines': dict(stats['medicines'].most_common(5)),
+            }
+        
+        columns = ('prescription_id', 'date', 'patient_id', 'doctor_id', 'items', 'units', 'prescribed_by')
+        return "Prescription Report", columns, self._hospital.count('prescriptions'), rows(), summary
+
+# ==============================================
+# الاستيراد الجماعي من CSV و JSON-lines
+# ==============================================
+
+def _read_csv_rows(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+def _read_jsonl_rows(path):
+    # الأسطر تُحلَّل داخل مجمع التحقق لا في خيط القراءة
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+_IMPORT_VALIDATOR = RECORD_VALIDATOR
+
+def _init_import_worker(validator):
+    # يُنفَّذ مرة في كل عملية من المجمع: المعرفات المعروفة لا تُرسل مع كل دفعة
+    global _IMPORT_VALIDATOR
+    _IMPORT_VALIDATOR = validator
+
+def _validate_import_chunk(collection, chunk, validator=None):
+    validator = validator or _IMPORT_VALIDATOR
+    required, optional = BulkImporter.SCHEMAS[collection]
+    key = BulkImporter.KEYS[collection]
+    # وصف كل حقل يُحسب مرة للدفعة بدل البحث في القواميس لكل صف
+    fields = [(field, field in required, BulkImporter.NUMBERS.get(field), BulkImporter.DEFAULTS.get(field, ""))
+              for field in required + optional]
+    results = []
+    for line, row in chunk:
+        if isinstance(row, str):
+            try:
+                row = json.loads(row)
+            except json.JSONDecodeError as e:
+                results.append((line, None, None, [{'field': None, 'rule': 'format', 'message': f"Invalid JSON: {e.msg}"}]))
+                continue
+        if not isinstance(row, dict):
+            results.append((line, None, None, [{'field': None, 'rule': 'format', 'message': "Row must be an object"}]))
+            continue
+        
+        data, errors = {}, []
+        for field, is_required, number, default in fields:
+            value = row.get(field)
+            if type(value) is str:
+                value = value.strip()
+            if value is None or value == "":
+                # الحقل المطلوب يُترك خارج data ليبلّغ عنه المدقق
+                if is_required:
+                    continue
+                value = default
+            elif number is not None:
+                try:
+                    value = number(value)
+                except (TypeError, ValueError):
+                    errors.append({'field': field, 'rule': 'number', 'message': f"Field '{field}' must be a number"})
+                    continue
+            elif type(value) is not str:
+                value = str(value).strip()
+            data[field] = value
+        errors.extend(validator.check(collection, data, [error['field'] for error in errors]))
+        results.append((line, row.get(key), data, errors))
+    return results
+
+class BulkImporter:
+    SCHEMAS = {
+        'patients': (RecordValidator.REQUIRED['patients'], ('address', 'medical_history')),
+        'doctors': (RecordValidator.REQUIRED['doctors'], ('email', 'schedule')),
+        'medicines': (RecordValidator.REQUIRED['medicines'], ('dosage',)),
+        'appointments': (RecordValidator.REQUIRED['appointments'], ('appointment_id', 'reason', 'status', 'duration')),
+    }
+    KEYS = {
+        'patients': 'patient_id',
+        'doctors': 'doctor_id',
+        'medicines': 'medicine_id',
+        'appointments': 'appointment_id',
+    }
+    ENTITIES = {
+        'patients': Patient,
+        'doctors': Doctor,
+        'medicines': Medicine,
+        'appointments': Appointment,
+    }
+    NUMBERS = {'age': int, 'price': float, 'quantity': int, 'duration': int}
+    DEFAULTS = {'status': 'Scheduled', 'duration': 30}
+    READERS = {
+        'csv': _read_csv_rows,
+        'jsonl': _read_jsonl_rows,
+    }
+    CHUNK_SIZE = 2000
+    MAX_ERRORS = 100
+    # الملفات الأصغر تُفحص في العملية نفسها: بدء المجمع ونقل الدفعات يكلف أكثر مما يوفّر
+    PARALLEL_MIN_BYTES = 16 << 20
+    
+    def __init__(self, hospital, workers=None):
+        self._hospital = hospital
+        if workers is None:
+            # الأنوية المتاحة فعلاً لهذه العملية، لا كل أنوية الجهاز
+            workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+        self._workers = workers
+    
+    def run(self, collection, path, fmt=None, progress=None, error_report=None, dry_run=False):
+        # error_report: ملف JSON-lines يُكتب فيه كل خطأ بالتفصيل، بلا حد أقصى
+        if collection not in self.SCHEMAS:
+            raise ValueError(f"Cannot import '{collection}'")
+        fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in self.READERS:
+            raise ValueError(f"Unknown import format '{fmt}'")
+        
+        started = perf_counter()
+        key = self.KEYS[collection]
+        seen_ids, seen_phones = self._existing_keys(collection, key)
+        schedules = {}
+        validator = RecordValidator({target: self._hospital.get_ids(target)
+                                     for _, target in RecordValidator.REFERENCES.get(collection, ())})
+        entity_cls = self.ENTITIES[collection]
+        entities = []
+        errors = []
+        stats = Counter()
+        by_rule, by_field = Counter(), Counter()
+        # سطر كل موعد مقبول، لربط ما يرفضه bulk_add لاحقاً بسطره في الملف
+        lines = {}
+        report = open(error_report, 'w', encoding='utf-8') if error_report else None
+        
+        def reject(line, record_id, row_errors):
+            for error in row_errors:
+                entry = {'line': line, 'id': record_id, **error}
+                by_rule[error['rule']] += 1
+                by_field[error['field']] += 1
+                if len(errors) < self.MAX_ERRORS:
+                    errors.append(entry)
+                if report:
+                    report.write(json.dumps(entry) + "\n")
+        
+        try:
+            for results in self._validated_chunks(collection, path, fmt, validator):
+                for line, record_id, data, row_errors in results:
+                    stats['rows'] += 1
+                    if not row_errors:
+                        row_errors = self._duplicate_errors(collection, key, data, seen_ids, seen_phones, schedules)
+                        if not row_errors:
+                            if collection == 'appointments':
+                                data['created_by'] = "Import"
+                                lines[data['appointment_id']] = (line, record_id)
+                            entities.append(entity_cls(**data))
+                            continue
+                        stats['conflicts' if row_errors[0]['rule'] == 'conflict' else 'duplicates'] += 1
+                    else:
+                        stats['invalid'] += 1
+                    reject(line, record_id, row_errors)
+                if progress:
+                    progress(stats['rows'], len(entities))
+            
+            if not dry_run:
+                rejected = []
+                success, message = self._hospital.bulk_add(collection, entities, rejected)
+                if not success:
+                    raise RuntimeError(message)
+                stats['conflicts'] += len(rejected)
+                for appointment in rejected:
+                    conflict = self._hospital.find_conflict(appointment.doctor_id,
+                                                            *self._slot_bounds(appointment))
+                    reject(*lines[appointment.appointment_id],
+                           [{'field': 'time', 'rule': 'conflict', 'message': f"Doctor is already booked by '{conflict}'"}])
+        finally:
+            if report:
+                report.close()
+        
+        valid = len(entities) - (0 if dry_run else len(rejected))
+        elapsed = perf_counter() - started
+        return {
+            'collection': collection,
+            'rows': stats['rows'],
+            'valid': valid,
+            'imported': 0 if dry_run else valid,
+            'duplicates': stats['duplicates'],
+            'conflicts': stats['conflicts'],
+            'invalid': stats['invalid'],
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(stats['rows'] / elapsed) if elapsed else 0,
+            'errors_by_rule': dict(by_rule),
+            'errors_by_field': dict(by_field),
+            'errors': errors,
+        }
+    
+    def _duplicate_errors(self, collection, key, data, seen_ids, seen_phones, schedules):
+        # فحوص تعتمد على الصفوف السابقة في نفس الملف، لذا تتم بالترتيب في العملية الرئيسية
+        if collection == 'appointments':
+            if not data['appointment_id']:
+                data['appointment_id'] = self._hospital.next_id(collection)
+            elif data['appointment_id'] in seen_ids:
+                return [{'field': key, 'rule': 'duplicate', 'message': f"Duplicate {key} '{data[key]}'"}]
+            seen_ids.add(data['appointment_id'])
+            if data['status'] == 'Cancelled':
+                return []
+            start = _slot_minutes(data['date'], data['time'])
+            end = start + data['duration']
+            schedule = schedules.setdefault(data['doctor_id'], DoctorSchedule())
+            conflict = (schedule.find_conflict(start, end)
+                        or self._hospital.find_conflict(data['doctor_id'], start, end))
+            if conflict:
+                return [{'field': 'time', 'rule': 'conflict', 'message': f"Doctor is already booked by '{conflict}'"}]
+            schedule.book(start, end, data['appointment_id'])
+            return []
+        
+        if data[key] in seen_ids:
+            return [{'field': key, 'rule': 'duplicate', 'message': f"Duplicate {key} '{data[key]}'"}]
+        phone = _NON_DIGIT.sub('', data['phone']) if seen_phones is not None else None
+        if phone and phone in seen_phones:
+            return [{'field': 'phone', 'rule': 'duplicate', 'message': f"Duplicate phone '{data['phone']}'"}]
+        seen_ids.add(data[key])
+        if phone:
+            seen_phones.add(phone)
+        return []
+    
+    @staticmethod
+    def _slot_bounds(appointment):
+        start = _slot_minutes(appointment.date, appointment.time)
+        return start, start + appointment.duration
+    
+    def _existing_keys(self, collection, key):
+        # مرور واحد على السجلات الحالية لمنع تكرار المعرف أو رقم الهاتف
+        if 'phone' not in self.SCHEMAS[collection][0]:
+            return set(self._hospital.get_ids(collection)), None
+        seen_ids, seen_phones = set(), set()
+        for data in self._hospital.iter_records(collection, (key, 'phone')):
+            seen_ids.add(data[key])
+            phone = _NON_DIGIT.sub('', data.get('phone') or '')
+            if phone:
+                seen_phones.add(phone)
+        return seen_ids, seen_phones
     
-    def get_permissions(self):
-        return {
-            'manage_patients': True,
-            'manage_doctors': False,
-            'manage_medicines': False,
-            'manage_appointments': True,
-            'manage_users': False,
-            'view_reports': False
-        }
+    def _validated_chunks(self, collection, path, fmt, validator):
+        # قراءة متدفقة مع عدد محدود من الدفعات قيد التحقق حتى لا يُحمَّل الملف كله في الذاكرة
+        rows = enumerate(self.READERS[fmt](path), 1)
+        chunks = iter(lambda: list(itertools.islice(rows, self.CHUNK_SIZE)), [])
+        if self._workers == 1 or os.path.getsize(path) < self.PARALLEL_MIN_BYTES:
+            # عملية واحدة أو ملف صغير: لا فائدة من كلفة نقل الدفعات بين العمليات
+            for chunk in chunks:
+                yield _validate_import_chunk(collection, chunk, validator)
+            return
+        # التحقق عمل حسابي، فالعمليات المنفصلة وحدها تستفيد من تعدد الأنوية
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self._workers, initializer=_init_import_worker,
+                                 initargs=(validator,)) as pool:
+            for chunk in chunks:
+                pending.append(pool.submit(_validate_import_chunk, collection, chunk))
+                if len(pending) >= 2 * self._workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
 
 # ==============================================
-# نظام إدارة المستشفى
+# واجهة غير متزامنة (asyncio) فوق النظام
 # ==============================================
 
-class HospitalManagementSystem:
-    def __init__(self):
-        self._patients = []
-        self._doctors = []
-        self._medicines = []
-        self._appointments = []
-        self._users = []
-        self._current_user = None
-        self._initialize_default_users()
-        self._load_sample_data()
+class AsyncHospitalService:
+    def __init__(self, hospital=None, max_workers=8):
+        self._hospital = hospital or HospitalManagementSystem()
+        # النظام آمن للخيوط، فالعمليات تُنفذ في مجمع خيوط دون أن تحجز حلقة الأحداث
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hospital")
+        # الحفظ في خيط مستقل حتى لا ينتظر خلف الطلبات العادية
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hospital-io")
+        self._pending_save = None
+        self._save_lock = None
     
-    def _initialize_default_users(self):
-        default_admin = Admin("admin", "admin123")
-        default_doctor = DoctorUser("doctor", "doc123", "D001")
-        default_nurse = Nurse("nurse", "nurse123")
-        default_reception = Receptionist("reception", "reception123")
-        self._users = [default_admin, default_doctor, default_nurse, default_reception]
+    @property
+    def hospital(self):
+        return self._hospital
     
-    def _load_sample_data(self):
-        sample_patients = [
-            Patient("P001", "Ahmed Mohamed", 35, "Male", "01001234567", "Cairo - New Cairo", "Penicillin allergy"),
-            Patient("P002", "Fatma Ali", 28, "Female", "01009876543", "Giza - Dokki", "No medical history"),
-            Patient("P003", "Mohamed Said", 45, "Male", "01005556677", "Alexandria - Smouha", "High blood pressure, Diabetes"),
-        ]
-        self._patients = sample_patients
-        
-        sample_doctors = [
-            Doctor("D001", "Dr. Khalid Abdelrahman", "Internal Medicine", "01001112233", "khalid@hospital.com", "Sun-Thu 9AM-5PM"),
-            Doctor("D002", "Dr. Mona Hussein", "Gynecology", "01002223344", "mona@hospital.com", "Sat-Wed 10AM-6PM"),
-            Doctor("D003", "Dr. Amr Ibrahim", "Orthopedic Surgery", "01003334455", "amr@hospital.com", "Mon-Fri 8AM-4PM"),
-            Doctor("D004", "Dr. Sara Mahmoud", "Pediatrics", "01004445566", "sara@hospital.com", "Sun-Thu 11AM-7PM"),
-        ]
-        self._doctors = sample_doctors
-        
-        sample_medicines = [
-            Medicine("M001", "Paracetamol", 15, 500, "Analgesics", "500mg"),
-            Medicine("M002", "Amoxicillin", 45, 200, "Antibiotics", "500mg"),
-            Medicine("M003", "Atenolol", 30, 150, "Cardiac", "50mg"),
-            Medicine("M004", "Metformin", 25, 300, "Diabetes", "850mg"),
-            Medicine("M005", "Ibuprofen", 20, 400, "Anti-inflammatory", "400mg"),
-            Medicine("M006", "Loratadine", 35, 250, "Antihistamine", "10mg"),
-            Medicine("M007", "Omeprazole", 40, 180, "Gastrointestinal", "20mg"),
-            Medicine("M008", "Citalopram", 55, 120, "Antidepressants", "20mg"),
-        ]
-        self._medicines = sample_medicines
+    async def __aenter__(self):
+        return self
     
-    def login(self, username, password):
-        for user in self._users:
-            if user.username == username and user.verify_password(password):
-                self._current_user = user
-                return True
-        return False
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
     
-    def logout(self):
-        self._current_user = None
+    async def _call(self, method, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, method, *args)
     
-    def get_current_user(self):
-        return self._current_user
+    # ---------- الدخول ----------
     
-    def get_patients_list(self):
-        return self._patients
+    async def login(self, username, password):
+        # يعيد المستخدم أو None دون تغيير حالة مشتركة؛ كل جلسة تمرر مستخدمها للعمليات
+        return await self._call(self._hospital.authenticate, username, password)
     
-    def get_doctors_list(self):
-        return self._doctors
+    # ---------- الإضافة والتعديل ----------
     
-    def get_medicines_list(self):
-        return self._medicines
+    async def add_patient(self, patient_data):
+        return await self._call(self._hospital.add_patient, patient_data)
     
-    def get_appointments_list(self):
-        return self._appointments
+    async def add_doctor(self, doctor_data):
+        return await self._call(self._hospital.add_doctor, doctor_data)
     
-    def get_todays_appointments(self):
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        return [app for app in self._appointments if app.get('date') == today]
+    async def add_medicine(self, medicine_data):
+        return await self._call(self._hospital.add_medicine, medicine_data)
     
-    def add_patient(self, patient_data):
-        try:
-            patient = Patient(**patient_data)
-            self._patients.append(patient)
-            return True, f"Patient '{patient.name}' added successfully!"
-        except Exception as e:
-            return False, str(e)
+    async def schedule_appointment(self, appointment_data, user=None):
+        return await self._call(self._hospital.schedule_appointment, appointment_data, user)
     
-    def add_doctor(self, doctor_data):
-        try:
-            doctor = Doctor(**doctor_data)
-            self._doctors.append(doctor)
-            return True, f"Doctor '{doctor.name}' added successfully!"
-        except Exception as e:
-            return False, str(e)
+    async def create_prescription(self, prescription_data, user=None):
+        return await self._call(self._hospital.create_prescription, prescription_data, user)
     
-    def add_medicine(self, medicine_data):
-        try:
-            medicine = Medicine(**medicine_data)
-            self._medicines.append(medicine)
-            return True, f"Medicine '{medicine.name}' added successfully!"
-        except Exception as e:
-            return False, str(e)
+    async def adjust_stock(self, medicine_id, delta):
+        return await self._call(self._hospital.adjust_stock, medicine_id, delta)
     
-    def schedule_appointment(self, appointment_data):
-        appointment_id = f"A{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-        appointment_data['appointment_id'] = appointment_id
-        appointment_data['status'] = 'Scheduled'
-        appointment_data['created_by'] = self._current_user.username if self._current_user else "Unknown"
-        
-        self._appointments.append(appointment_data)
-        
-        for patient in self._patients:
-            if patient.patient_id == appointment_data['patient_id']:
-                patient.add_appointment(appointment_data)
-                break
-        
-        for doctor in self._doctors:
-            if doctor.doctor_id == appointment_data['doctor_id']:
-                doctor.add_appointment(appointment_data)
-                break
-        
-        return True, f"Appointment scheduled successfully! ID: {appointment_id}"
+    # ---------- الاستعلامات ----------
     
-    def create_prescription(self, prescription_data):
-        prescription_id = f"RX{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-        prescription_data['prescription_id'] = prescription_id
-        prescription_data['date'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        prescription_data['prescribed_by'] = self._current_user.username if self._current_user else "Unknown"
-        
-        for item in prescription_data.get('items', []):
-            for medicine in self._medicines:
-                if medicine.medicine_id == item['medicine_id']:
-                    medicine.quantity -= item['quantity']
-                    break
-        
-        for patient in self._patients:
-            if patient.patient_id == prescription_data['patient_id']:
-                patient.add_prescription(prescription_data)
-                break
+    async def get_patient(self, patient_id):
+        return await self._call(self._hospital.get_patient, patient_id)
+    
+    async def get_doctor(self, doctor_id):
+        return await self._call(self._hospital.get_doctor, doctor_id)
+    
+    async def get_medicine(self, medicine_id):
+        return await self._call(self._hospital.get_medicine, medicine_id)
+    
+    async def get_appointment(self, appointment_id):
+        return await self._call(self._hospital.get_appointment, appointment_id)
+    
+    async def get_prescription(self, prescription_id):
+        return await self._call(self._hospital.get_prescription, prescription_id)
+    
+    async def get_patients_list(self):
+        return await self._call(self._hospital.get_patients_list)
+    
+    async def get_doctors_list(self):
+        return await self._call(self._hospital.get_doctors_list)
+    
+    async def get_medicines_list(self):
+        return await self._call(self._hospital.get_medicines_list)
+    
+    async def get_appointments_list(self):
+        return await self._call(self._hospital.get_appointments_list)
+    
+    async def get_prescriptions_list(self):
+        return await self._call(self._hospital.get_prescriptions_list)
+    
+    async def get_todays_appointments(self):
+        return await self._call(self._hospital.get_todays_appointments)
+    
+    async def get_appointments_on(self, date):
+        return await self._call(self._hospital.get_appointments_on, date)
+    
+    async def get_appointments_between(self, start_date, end_date):
+        return await self._call(self._hospital.get_appointments_between, start_date, end_date)
+    
+    async def get_week_appointments(self, start_date=None):
+        return await self._call(self._hospital.get_week_appointments, start_date)
+    
+    async def find_next_free_slot(self, doctor_id, date, time, duration=30):
+        return await self._call(self._hospital.find_next_free_slot, doctor_id, date, time, duration)
+    
+    # ---------- الحفظ والتحميل ----------
+    
+    async def load(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, self._hospital.load_data)
+    
+    async def save(self):
+        # الطلبات التي تصل قبل بدء الحفظ تشترك في عملية حفظ واحدة
+        if self._pending_save is None:
+            self._pending_save = asyncio.ensure_future(self._run_save())
+        return await asyncio.shield(self._pending_save)
+    
+    async def _run_save(self):
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()
+        async with self._save_lock:
+            # ما يصل بعد هذه اللحظة قد لا يشمله الحفظ الحالي فيبدأ عملية جديدة
+            self._pending_save = None
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._io_executor, self._hospital.save_data)
+    
+    async def close(self):
+        result = await self.save()
+        self._executor.shutdown(wait=False)
+        self._io_executor.shutdown(wait=True)
+        return result
+
+# ==============================================
+# خادم HTTP/JSON
+# ==============================================
+
+class HospitalRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 يبقي الاتصال مفتوحاً بين الطلبات (keep-alive)
+    protocol_version = "HTTP/1.1"
+    server_version = "HospitalHTTP/1.0"
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    GETTERS = {
+        'patients': 'get_patient',
+        'doctors': 'get_doctor',
+        'medicines': 'get_medicine',
+        'appointments': 'get_appointment',
+        'prescriptions': 'get_prescription',
+    }
+    CREATORS = {
+        'patients': 'add_patient',
+        'doctors': 'add_doctor',
+        'medicines': 'add_medicine',
+        'appointments': 'schedule_appointment',
+        'prescriptions': 'create_prescription',
+    }
+    # صلاحية كل مسار كتابة؛ القراءة والحفظ تكفيها هوية صالحة
+    ACTIONS = {
+        'patients': 'manage_patients',
+        'doctors': 'manage_doctors',
+        'medicines': 'manage_medicines',
+        'appointments': 'manage_appointments',
+        'prescriptions': 'prescribe_medicines',
+    }
+    # العمليات التي تسجل اسم منفذها
+    ATTRIBUTED = ('appointments', 'prescriptions')
+    
+    @property
+    def hospital(self):
+        return self.server.hospital
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
+    def _send_json(self, status, payload, etag=False, headers=()):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        if etag:
+            tag = '"%s"' % hashlib.sha1(body).hexdigest()
+            if tag in self.headers.get('If-None-Match', ''):
+                self.send_response(304)
+                self.send_header('ETag', tag)
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', tag)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_error(self, status, message):
+        self._send_json(status, {'error': message})
+    
+    def _authorize(self, action=None):
+        # HTTP Basic عبر CredentialStore؛ يعيد المستخدم أو None بعد إرسال الخطأ
+        scheme, _, credentials = self.headers.get('Authorization', '').partition(' ')
+        user = self.server.authenticate(credentials.strip()) if scheme.lower() == 'basic' else None
+        if user is None:
+            self._send_json(401, {'error': "Authentication required"},
+                            headers=[('WWW-Authenticate', 'Basic realm="hospital"')])
+            return None
+        if action is not None and not user.can(action):
+            self._send_error(403, f"Role '{user.role}' is not allowed to {action.replace('_', ' ')}")
+            return None
+        return user
+    
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        return data
+    
+    def _route(self):
+        parts = urlsplit(self.path)
+        segments = [segment for segment in parts.path.split('/') if segment]
+        if not segments or segments[0] != 'api':
+            return None, [], {}
+        return segments[1] if len(segments) > 1 else None, segments[2:], parse_qs(parts.query)
+    
+    def do_GET(self):
+        collection, rest, query = self._route()
+        if collection not in self.GETTERS:
+            return self._send_error(404, "Unknown endpoint")
+        if self._authorize() is None:
+            return
+        if rest:
+            entity = getattr(self.hospital, self.GETTERS[collection])(rest[0])
+            if entity is None or len(rest) > 1:
+                return self._send_error(404, f"'{rest[0]}' not found")
+            return self._send_json(200, entity.to_dict(), etag=True)
         
-        return True, f"Prescription created successfully! ID: {prescription_id}"
+        try:
+            offset = max(int(query.get('offset', ['0'])[0]), 0)
+            limit = min(max(int(query.get('limit', [str(self.DEFAULT_PAGE_SIZE)])[0]), 1), self.MAX_PAGE_SIZE)
+        except ValueError:
+            return self._send_error(400, "offset and limit must be integers")
+        if collection == 'appointments' and 'date' in query:
+            matches = self.hospital.get_appointments_on(query['date'][0])
+            items, total = matches[offset:offset + limit], len(matches)
+        else:
+            items, total = self.hospital.get_page(collection, offset, limit)
+        self._send_json(200, {
+            'items': [entity.to_dict() for entity in items],
+            'offset': offset,
+            'limit': limit,
+            'total': total,
+            'next_offset': offset + limit if offset + limit < total else None,
+        }, etag=True)
     
-    def save_data(self):
+    def do_POST(self):
+        collection, rest, _ = self._route()
         try:
-            patients_data = [patient.to_dict() for patient in self._patients]
-            with open('patients.json', 'w') as f:
-                json.dump(patients_data, f, indent=2)
-            
-            doctors_data = [doctor.to_dict() for doctor in self._doctors]
-            with open('doctors.json', 'w') as f:
-                json.dump(doctors_data, f, indent=2)
-            
-            medicines_data = [medicine.to_dict() for medicine in self._medicines]
-            with open('medicines.json', 'w') as f:
-                json.dump(medicines_data, f, indent=2)
-            
-            with open('appointments.json', 'w') as f:
-                json.dump(self._appointments, f, indent=2)
-            
-            return True, "All data saved successfully!"
-        except Exception as e:
-            return False, f"Error saving data: {e}"
+            data = self._read_json()
+        except ValueError as e:
+            return self._send_error(400, f"Invalid JSON: {e}")
+        
+        if collection == 'save' and not rest:
+            if self._authorize() is None:
+                return
+            success, message = self.hospital.save_data()
+            return self._send_json(200 if success else 500, {'message': message})
+        is_stock = collection == 'medicines' and rest[1:] == ['stock']
+        if not is_stock and (collection not in self.CREATORS or rest):
+            return self._send_error(404, "Unknown endpoint")
+        user = self._authorize(self.ACTIONS[collection])
+        if user is None:
+            return
+        if is_stock:
+            # 2.5 أو "3" ترفض بدل تقريبها بصمت
+            delta = data.get('delta')
+            if type(delta) is not int:
+                return self._send_error(400, "delta must be an integer")
+            success, message = self.hospital.adjust_stock(rest[0], delta)
+        else:
+            creator = getattr(self.hospital, self.CREATORS[collection])
+            try:
+                success, message = creator(data, user) if collection in self.ATTRIBUTED else creator(data)
+            except (KeyError, TypeError, ValueError) as e:
+                return self._send_error(400, f"Invalid {collection} data: {e}")
+        
+        if not success:
+            status = 404 if "not found" in message else 409 if "already" in message else 400
+            return self._send_error(status, message)
+        # الحفظ يتولاه AutosaveWorker الخاص بالخادم فلا ينتظر الطلب كتابة القرص
+        payload = {'message': message}
+        if "ID: " in message:
+            payload['id'] = message.rpartition("ID: ")[2]
+        self._send_json(200 if rest else 201, payload)
+
+class HospitalHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    MAX_SESSIONS = 1024
     
-    def load_data(self):
+    def __init__(self, address, hospital, verbose=False):
+        super().__init__(address, HospitalRequestHandler)
+        self.hospital = hospital
+        self.verbose = verbose
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+    
+    def authenticate(self, credentials):
+        # التجزئة بطيئة عمداً فتُحفظ نتيجة التحقق لكل ترويسة؛ تغيير كلمة المرور يبطلها
+        key = hashlib.sha256(credentials.encode('utf-8')).digest()
+        cached = self._sessions.get(key)
+        if cached is not None and cached[0].password_hash == cached[1]:
+            return cached[0]
         try:
-            with open('patients.json', 'r') as f:
-                patients_data = json.load(f)
-            self._patients = [Patient.from_dict(data) for data in patients_data]
-            
-            with open('doctors.json', 'r') as f:
-                doctors_data = json.load(f)
-            self._doctors = [Doctor.from_dict(data) for data in doctors_data]
-            
-            with open('medicines.json', 'r') as f:
-                medicines_data = json.load(f)
-            self._medicines = [Medicine.from_dict(data) for data in medicines_data]
-            
-            with open('appointments.json', 'r') as f:
-                self._appointments = json.load(f)
-            
-            return True, "All data loaded successfully!"
-        except Exception as e:
-            return False, f"Error loading data: {e}"
+            username, _, password = base64.b64decode(credentials, validate=True).decode('utf-8').partition(':')
+        except ValueError:
+            return None
+        user = self.hospital.authenticate(username, password)
+        if user is not None:
+            with self._sessions_lock:
+                if len(self._sessions) >= self.MAX_SESSIONS:
+                    self._sessions.clear()
+                self._sessions[key] = (user, user.password_hash)
+        return user
+
+def run_server(hospital, host="127.0.0.1", port=8080):
+    server = HospitalHTTPServer((host, port), hospital, verbose=True)
+    autosave = AutosaveWorker(hospital).start()
+    print(f"🌐 Serving hospital API on http://{host}:{server.server_port}/api/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # الإيقاف يحفظ التعديلات التي لم تُكتب بعد
+        autosave.stop()
 
 # ==============================================
 # واجهة الدخول
 # ==============================================
 
 class HospitalLoginSystem:
-    def __init__(self):
+    def __init__(self, storage=None, hospital=None):
+        if ctk is None:
+            raise RuntimeError("The GUI requires the optional 'customtkinter' package")
         self.app = ctk.CTk()
         self.app.title("Hospital Management System - Login")
         self.app.geometry("500x650")
@@ -541,7 +3911,14 @@ class HospitalLoginSystem:
         # تعيين خلفية سوداء
         self.app.configure(fg_color=COLORS["secondary_dark"])
         
-        self.hospital_system = HospitalManagementSystem()
+        if hospital is None:
+            # التحميل قبل أي تعديل حتى لا يكتب الحفظ التلقائي بيانات العينة فوق البيانات المحفوظة
+            hospital = HospitalManagementSystem(storage)
+            if hospital.get_storage().has_data():
+                success, message = hospital.load_data()
+                if not success:
+                    messagebox.showerror("Error", message)
+        self.hospital_system = hospital
         self.setup_ui()
     
     def setup_ui(self):
@@ -628,7 +4005,7 @@ class HospitalLoginSystem:
         self.password.pack(pady=15)
         
         # زر الدخول
-        login_btn = ctk.CTkButton(
+        self.login_btn = login_btn = ctk.CTkButton(
             login_frame,
             text="ACCESS SYSTEM",
             command=self.authenticate,
@@ -683,6 +4060,8 @@ class HospitalLoginSystem:
         self.app.bind('<Return>', lambda event: self.authenticate())
     
     def authenticate(self):
+        if self.login_btn.cget("state") == "disabled":
+            return
         username = self.username.get().strip()
         password = self.password.get().strip()
         
@@ -690,7 +4069,21 @@ class HospitalLoginSystem:
             messagebox.showerror("Input Error", "Please enter both username and password!")
             return
         
-        if self.hospital_system.login(username, password):
+        # التحقق من كلمة المرور مكلف عمداً فيتم في خيط منفصل حتى لا تتجمد الواجهة
+        self.login_btn.configure(state="disabled", text="VERIFYING...")
+        result = []
+        worker = threading.Thread(target=lambda: result.append(self.hospital_system.login(username, password)),
+                                  daemon=True)
+        worker.start()
+        self.app.after(50, lambda: self.finish_authentication(worker, result, username))
+    
+    def finish_authentication(self, worker, result, username):
+        if worker.is_alive():
+            self.app.after(50, lambda: self.finish_authentication(worker, result, username))
+            return
+        self.login_btn.configure(state="normal", text="ACCESS SYSTEM")
+        
+        if result and result[0]:
             messagebox.showinfo("Login Successful", f"Welcome, {username}!\nLoading system...")
             self.app.destroy()
             
@@ -704,6 +4097,106 @@ class HospitalLoginSystem:
     def run(self):
         self.app.mainloop()
 
+# ==============================================
+# جدول افتراضي: يعرض الصفوف الظاهرة فقط
+# ==============================================
+
+class VirtualTable:
+    def __init__(self, tree, scrollbar, fetch_page, row_values):
+        # fetch_page(offset, limit) -> (entities, total)
+        self._tree = tree
+        self._scrollbar = scrollbar
+        self._fetch_page = fetch_page
+        self._row_values = row_values
+        self._offset = 0
+        self._total = 0
+        self._visible = int(tree.cget("height"))
+        self._rows = []
+        self._selected_key = None
+        
+        scrollbar.configure(command=self._on_scrollbar)
+        tree.bind("<Configure>", self._on_resize)
+        tree.bind("<<TreeviewSelect>>", self._on_select)
+        tree.bind("<MouseWheel>", lambda event: self.scroll(-3 if event.delta > 0 else 3))
+        tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        tree.bind("<Button-5>", lambda event: self.scroll(3))
+        tree.bind("<Prior>", lambda event: self.scroll(-self._visible))
+        tree.bind("<Next>", lambda event: self.scroll(self._visible))
+        tree.bind("<Up>", lambda event: self._on_arrow(-1))
+        tree.bind("<Down>", lambda event: self._on_arrow(1))
+        self.refresh()
+    
+    def refresh(self):
+        entities, self._total = self._fetch_page(self._offset, self._visible)
+        last_offset = max(self._total - self._visible, 0)
+        if self._offset > last_offset:
+            # تقلص عدد السجلات منذ آخر عرض
+            self._offset = last_offset
+            entities, self._total = self._fetch_page(self._offset, self._visible)
+        
+        # إعادة استخدام الصفوف الموجودة بدل حذفها وإنشائها من جديد
+        selected = None
+        for index, entity in enumerate(entities):
+            values = self._row_values(entity)
+            if index < len(self._rows):
+                self._tree.item(self._rows[index], values=values)
+            else:
+                self._rows.append(self._tree.insert("", "end", values=values))
+            if values[0] == self._selected_key:
+                selected = self._rows[index]
+        for row in self._rows[len(entities):]:
+            self._tree.delete(row)
+        del self._rows[len(entities):]
+        
+        self._tree.selection_set((selected,) if selected else ())
+        if self._total:
+            self._scrollbar.set(self._offset / self._total, min(self._offset + self._visible, self._total) / self._total)
+        else:
+            self._scrollbar.set(0, 1)
+    
+    def set_source(self, fetch_page):
+        self._fetch_page = fetch_page
+        self._offset = 0
+        self.refresh()
+    
+    def scroll(self, rows):
+        offset = min(max(self._offset + rows, 0), max(self._total - self._visible, 0))
+        if offset != self._offset:
+            self._offset = offset
+            self.refresh()
+        return "break"
+    
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll(int(float(amount) * self._total) - self._offset)
+        elif action == "scroll":
+            self.scroll(int(amount) * (self._visible if unit == "pages" else 1))
+    
+    def _on_resize(self, event):
+        row_height = int(ttk.Style(self._tree).lookup("Treeview", "rowheight") or 20)
+        # صف واحد يذهب لعناوين الأعمدة
+        visible = max(event.height // row_height - 1, 1)
+        if visible != self._visible:
+            self._visible = visible
+            self.refresh()
+    
+    def _on_select(self, event):
+        selection = self._tree.selection()
+        if selection:
+            self._selected_key = self._tree.item(selection[0], "values")[0]
+    
+    def _on_arrow(self, step):
+        # عند حافة النافذة ننقل النافذة بدل الخروج منها
+        if not self._rows:
+            return None
+        edge = self._rows[-1] if step > 0 else self._rows[0]
+        if self._tree.focus() != edge:
+            return None
+        self.scroll(step)
+        self._selected_key = self._tree.item(edge, "values")[0]
+        self._tree.selection_set((edge,))
+        return "break"
+
 # ==============================================
 # الواجهة الرئيسية - مع تحسينات التصميم
 # ==============================================
@@ -738,8 +4231,27 @@ class HospitalMainApp:
         )
         self.main_content.pack(side="top", expand=True, fill="both")
         
+        # الحفظ يتم في خيط خلفي فلا تتجمد الواجهة أثناء الكتابة
+        self.autosave = AutosaveWorker(self.hospital).start()
+        self._reported_flushes = 0
+        self._search_job = None
+        self._dashboard_job = None
+        self._dashboard_day = datetime.date.today()
+        self.insights_label = None
+        self._insights_ready = False
+        # تنبيهات المخزون تصل من خيوط الكتابة وتُعرض من الخيط الرئيسي
+        self._stock_alerts = deque()
+        self.hospital.add_stock_listener(self.queue_stock_alert)
+        # بناء فهرس البحث مسبقاً حتى يكون البحث فورياً عند أول استخدام
+        threading.Thread(target=self.hospital.build_search_index, daemon=True).start()
+        # مخزن التحليلات يُبنى في الخلفية ويظهر ملخصه في اللوحة عند اكتماله
+        threading.Thread(target=self.hospital.get_analytics, daemon=True).start()
+        self.app.protocol("WM_DELETE_WINDOW", self.close)
+        
         self.setup_navbar()
         self.show_dashboard()
+        self.poll_autosave()
+        self.poll_stock_alerts()
     
     def setup_navbar(self):
         # الجزء الأيسر من شريط التنقل (الشعار)
@@ -788,6 +4300,25 @@ class HospitalMainApp:
         right_frame = ctk.CTkFrame(self.navbar, fg_color="transparent")
         right_frame.pack(side="right", padx=20)
         
+        # حالة الحفظ التلقائي
+        self.autosave_label = ctk.CTkLabel(
+            right_frame,
+            text="💾 Autosave on",
+            font=("Arial", 12),
+            text_color=COLORS["text_secondary"]
+        )
+        self.autosave_label.pack(side="left", padx=10)
+        
+        # عدد الأصناف تحت حد إعادة الطلب
+        self.stock_alert_label = ctk.CTkLabel(
+            right_frame,
+            text="",
+            font=("Arial", 12),
+            text_color=COLORS["warning"]
+        )
+        self.stock_alert_label.pack(side="left", padx=10)
+        self.update_stock_alert_label()
+        
         # زر المستخدم مع معلومات
         user_info_btn = ctk.CTkButton(
             right_frame,
@@ -859,9 +4390,75 @@ class HospitalMainApp:
         change_pass_btn.pack(pady=10)
     
     def clear_main_content(self):
+        if self._dashboard_job is not None:
+            self.app.after_cancel(self._dashboard_job)
+            self._dashboard_job = None
         for widget in self.main_content.winfo_children():
             widget.destroy()
     
+    def refresh_dashboard_stats(self, interval=5000):
+        # تحديث دوري للبطاقات فقط عند تغير العدادات، دون إعادة بناء الصفحة
+        stats = self.hospital.get_dashboard_stats()
+        if stats['version'] != self._dashboard_version or self._dashboard_day != datetime.date.today():
+            self._dashboard_version = stats['version']
+            self._dashboard_day = datetime.date.today()
+            for key, label in self.dashboard_counts.items():
+                label.configure(text=str(stats[key]))
+            self.refresh_insights()
+        elif not self._insights_ready:
+            self.refresh_insights()
+        self._dashboard_job = self.app.after(interval, self.refresh_dashboard_stats)
+    
+    def queue_stock_alert(self, event, medicine_id, quantity):
+        self._stock_alerts.append((event, medicine_id, quantity))
+    
+    def poll_stock_alerts(self):
+        alerts = []
+        while self._stock_alerts:
+            alerts.append(self._stock_alerts.popleft())
+        if alerts:
+            self.update_stock_alert_label()
+            if self._dashboard_job is not None:
+                self.refresh_low_stock()
+        self.app.after(500, self.poll_stock_alerts)
+    
+    def update_stock_alert_label(self):
+        count = self.hospital.count_low_stock()
+        self.stock_alert_label.configure(text=f"⚠️ {count} low stock" if count else "")
+    
+    def refresh_low_stock(self):
+        lines = []
+        for medicine_id, quantity in self.hospital.get_low_stock()[:8]:
+            medicine = self.hospital.get_medicine(medicine_id)
+            lines.append(f"{medicine.name if medicine else medicine_id}: {quantity} left")
+        self.low_stock_label.configure(
+            text="\n".join(lines) or f"All medicines are above {self.hospital.get_reorder_level()} units")
+    
+    def refresh_insights(self):
+        if self.insights_label is None:
+            return
+        analytics = self.hospital.get_analytics(build=False)
+        self._insights_ready = analytics is not None
+        if analytics is None:
+            self.insights_label.configure(text="Building analytics...")
+            return
+        today = datetime.date.today()
+        by_category = sorted(analytics.stock_value_by_category().items(), key=lambda item: -item[1])[:3]
+        by_specialty = analytics.appointments_by_specialty(today - datetime.timedelta(days=6), today)
+        busiest = sorted(((count, name) for name, count in by_specialty.items() if count), reverse=True)[:3]
+        lines = [
+            f"Stock value: {analytics.stock_value():,.2f}"
+            + (" (top: " + ", ".join(f"{name} {value:,.0f}" for name, value in by_category) + ")" if by_category else ""),
+            "Busiest specialties (7 days): "
+            + (", ".join(f"{name} ({count})" for count, name in busiest) or "no appointments"),
+        ]
+        self.insights_label.configure(text="\n".join(lines))
+    
+    def get_appointment_names(self, appointment):
+        patient = self.hospital.get_patient(appointment.patient_id)
+        doctor = self.hospital.get_doctor(appointment.doctor_id)
+        return (patient.name if patient else "N/A", doctor.name if doctor else "N/A")
+    
     def show_dashboard(self):
         self.clear_main_content()
         
@@ -902,14 +4499,17 @@ class HospitalMainApp:
         stats_frame = ctk.CTkFrame(content_frame, fg_color="transparent")
         stats_frame.pack(pady=20, padx=20, fill="x")
         
+        stats = self.hospital.get_dashboard_stats()
         stats_data = [
-            ("👥 Total Patients", len(self.hospital.get_patients_list()), COLORS["primary"]),
-            ("👨‍⚕️ Total Doctors", len(self.hospital.get_doctors_list()), COLORS["accent"]),
-            ("💊 Medicines Stock", len(self.hospital.get_medicines_list()), COLORS["success"]),
-            ("📅 Today's Appointments", len(self.hospital.get_todays_appointments()), COLORS["warning"])
+            ("👥 Total Patients", 'patients', COLORS["primary"]),
+            ("👨‍⚕️ Total Doctors", 'doctors', COLORS["accent"]),
+            ("💊 Medicines Stock", 'medicines', COLORS["success"]),
+            ("📅 Today's Appointments", 'appointments_today', COLORS["warning"])
         ]
+        self.dashboard_counts = {}
+        self._dashboard_version = stats['version']
         
-        for i, (title, count, color) in enumerate(stats_data):
+        for i, (title, key, color) in enumerate(stats_data):
             card = ctk.CTkFrame(
                 stats_frame,
                 width=320,
@@ -932,11 +4532,12 @@ class HospitalMainApp:
             
             count_label = ctk.CTkLabel(
                 card,
-                text=str(count),
+                text=str(stats[key]),
                 font=("Arial", 36, "bold"),
                 text_color=color
             )
             count_label.pack(pady=10, padx=25, anchor="w")
+            self.dashboard_counts[key] = count_label
             
             # إضافة مؤشرات طاقة للمخزون
             if i == 2:  # Medicines Stock
@@ -954,6 +4555,48 @@ class HospitalMainApp:
                     )
                     indicator.pack(side="left", padx=2)
         
+        # الأصناف تحت حد إعادة الطلب، تُحدَّث فور وصول تنبيه
+        low_stock_frame = ctk.CTkFrame(
+            content_frame,
+            fg_color=COLORS["card"],
+            corner_radius=15,
+            border_color=COLORS["warning"],
+            border_width=2
+        )
+        low_stock_frame.pack(pady=(0, 10), padx=20, fill="x")
+        
+        low_stock_title = ctk.CTkLabel(
+            low_stock_frame,
+            text=f"⚠️ LOW STOCK (below {self.hospital.get_reorder_level()} units)",
+            font=("Arial", 16, "bold"),
+            text_color=COLORS["warning"]
+        )
+        low_stock_title.pack(pady=(15, 5), padx=30, anchor="w")
+        
+        self.low_stock_label = ctk.CTkLabel(
+            low_stock_frame,
+            text="",
+            font=("Arial", 13),
+            text_color=COLORS["text"],
+            justify="left"
+        )
+        self.low_stock_label.pack(pady=(0, 15), padx=30, anchor="w")
+        self.refresh_low_stock()
+        
+        # ملخص من مخزن التحليلات العمودي (يتطلب NumPy)
+        self.insights_label = None
+        self._insights_ready = False
+        if np is not None:
+            self.insights_label = ctk.CTkLabel(
+                content_frame,
+                text="",
+                font=("Arial", 13),
+                text_color=COLORS["text_secondary"],
+                justify="left"
+            )
+            self.insights_label.pack(pady=(0, 10), padx=40, anchor="w")
+            self.refresh_insights()
+        
         # جدول المواعيد اليومية
         appointments_frame = ctk.CTkFrame(
             content_frame,
@@ -1002,13 +4645,14 @@ class HospitalMainApp:
         # إضافة بيانات المواعيد
         today_appointments = self.hospital.get_todays_appointments()
         for app in today_appointments:
-            status_color = COLORS["success"] if app['status'] == 'Completed' else COLORS["warning"]
+            status_color = COLORS["success"] if app.status == 'Completed' else COLORS["warning"]
+            patient_name, doctor_name = self.get_appointment_names(app)
             tree.insert("", "end", values=(
-                app['time'],
-                app['patient_name'],
-                app['doctor_name'],
-                app['reason'][:30] + "..." if len(app['reason']) > 30 else app['reason'],
-                app['status']
+                app.time,
+                patient_name,
+                doctor_name,
+                app.reason[:30] + "..." if len(app.reason) > 30 else app.reason,
+                app.status
             ))
         
         # إضافة شريط التمرير
@@ -1019,7 +4663,7 @@ class HospitalMainApp:
         tree_scroll.pack(side="right", fill="y", pady=(0, 30))
         
         # زر إضافة موعد جديد - تم تعديل النص
-        if self.current_user.get_permissions()['manage_appointments']:
+        if self.current_user.can('manage_appointments'):
             new_appointment_btn = ctk.CTkButton(
                 appointments_frame,
                 text="➕ NEW APPOINTMENT",  # تم تعديل النص هنا
@@ -1031,6 +4675,8 @@ class HospitalMainApp:
                 text_color=COLORS["secondary_dark"]
             )
             new_appointment_btn.pack(pady=(0, 20), padx=30, fill="x")
+        
+        self._dashboard_job = self.app.after(5000, self.refresh_dashboard_stats)
     
     def show_patients(self):
         self.clear_main_content()
@@ -1092,6 +4738,7 @@ class HospitalMainApp:
         search_btn = ctk.CTkButton(
             search_frame,
             text="🔍",
+            command=lambda: self.search_patients(search_entry.get()),
             width=60,
             height=50,
             fg_color=COLORS["primary"],
@@ -1101,6 +4748,10 @@ class HospitalMainApp:
         )
         search_btn.pack(side="left")
         
+        # البحث أثناء الكتابة بعد توقف قصير فقط
+        search_entry.bind("<KeyRelease>", lambda event: self.schedule_patient_search(search_entry.get()))
+        search_entry.bind("<Return>", lambda event: self.search_patients(search_entry.get()))
+        
         # جدول المرضى
         table_frame = ctk.CTkFrame(
             self.main_content,
@@ -1135,24 +4786,38 @@ class HospitalMainApp:
             tree.heading(col, text=col)
             tree.column(col, width=180)
         
-        # إضافة بيانات المرضى
-        patients = self.hospital.get_patients_list()
-        for patient in patients:
-            tree.insert("", "end", values=(
+        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical")
+        # الصفوف تُجلب عند التمرير فلا يتأثر فتح الصفحة بحجم البيانات
+        self.patients_table = VirtualTable(
+            tree, tree_scroll, lambda offset, limit: self.hospital.get_page('patients', offset, limit),
+            lambda patient: (
                 patient.patient_id,
                 patient.name,
                 patient.age,
                 patient.gender,
                 patient.phone,
                 patient.address[:30] + "..." if len(patient.address) > 30 else patient.address
-            ))
-        
-        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=tree_scroll.set)
+            )
+        )
         
         tree.pack(side="left", fill="both", expand=True, padx=20, pady=20)
         tree_scroll.pack(side="right", fill="y", pady=20)
     
+    def schedule_patient_search(self, query, delay=250):
+        if self._search_job is not None:
+            self.app.after_cancel(self._search_job)
+        self._search_job = self.app.after(delay, lambda: self.search_patients(query))
+    
+    def search_patients(self, query):
+        if self._search_job is not None:
+            self.app.after_cancel(self._search_job)
+            self._search_job = None
+        if not query.strip():
+            self.patients_table.set_source(lambda offset, limit: self.hospital.get_page('patients', offset, limit))
+            return
+        results = self.hospital.search_patients(query, limit=1000)
+        self.patients_table.set_source(lambda offset, limit: (results[offset:offset + limit], len(results)))
+    
     def show_doctors(self):
         self.clear_main_content()
         
@@ -1223,18 +4888,16 @@ class HospitalMainApp:
             tree.heading(col, text=col)
             tree.column(col, width=200)
         
-        doctors = self.hospital.get_doctors_list()
-        for doctor in doctors:
-            tree.insert("", "end", values=(
-                doctor.doctor_id,
-                doctor.name,
-                doctor.specialty,
-                doctor.phone,
-                doctor.schedule[:30] + "..." if len(doctor.schedule) > 30 else doctor.schedule
-            ))
-        
-        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=tree_scroll.set)
+        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical")
+        # الصفوف تُجلب عند التمرير فلا يتأثر فتح الصفحة بحجم البيانات
+        VirtualTable(tree, tree_scroll, lambda offset, limit: self.hospital.get_page('doctors', offset, limit),
+                     lambda doctor: (
+                         doctor.doctor_id,
+                         doctor.name,
+                         doctor.specialty,
+                         doctor.phone,
+                         doctor.schedule[:30] + "..." if len(doctor.schedule) > 30 else doctor.schedule
+                     ))
         
         tree.pack(side="left", fill="both", expand=True, padx=20, pady=20)
         tree_scroll.pack(side="right", fill="y", pady=20)
@@ -1263,7 +4926,7 @@ class HospitalMainApp:
         toolbar.pack(fill="x", padx=40, pady=20)
         toolbar.pack_propagate(False)
         
-        if self.current_user.get_permissions()['manage_medicines']:
+        if self.current_user.can('manage_medicines'):
             add_medicine_btn = ctk.CTkButton(
                 toolbar,
                 text="➕ ADD MEDICINE",
@@ -1309,19 +4972,17 @@ class HospitalMainApp:
             tree.heading(col, text=col)
             tree.column(col, width=150)
         
-        medicines = self.hospital.get_medicines_list()
-        for medicine in medicines:
-            tree.insert("", "end", values=(
-                medicine.medicine_id,
-                medicine.name,
-                f"${medicine.price:.2f}",
-                medicine.quantity,
-                medicine.category,
-                medicine.dosage
-            ))
-        
-        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=tree_scroll.set)
+        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical")
+        # الصفوف تُجلب عند التمرير فلا يتأثر فتح الصفحة بحجم البيانات
+        VirtualTable(tree, tree_scroll, lambda offset, limit: self.hospital.get_page('medicines', offset, limit),
+                     lambda medicine: (
+                         medicine.medicine_id,
+                         medicine.name,
+                         f"${medicine.price:.2f}",
+                         medicine.quantity,
+                         medicine.category,
+                         medicine.dosage
+                     ))
         
         tree.pack(side="left", fill="both", expand=True, padx=20, pady=20)
         tree_scroll.pack(side="right", fill="y", pady=20)
@@ -1350,7 +5011,7 @@ class HospitalMainApp:
         toolbar.pack(fill="x", padx=40, pady=20)
         toolbar.pack_propagate(False)
         
-        if self.current_user.get_permissions()['manage_appointments']:
+        if self.current_user.can('manage_appointments'):
             schedule_btn = ctk.CTkButton(
                 toolbar,
                 text="➕ NEW APPOINTMENT",  # تم تعديل النص هنا
@@ -1396,20 +5057,17 @@ class HospitalMainApp:
             tree.heading(col, text=col)
             tree.column(col, width=150)
         
-        appointments = self.hospital.get_appointments_list()
-        for app in appointments:
-            tree.insert("", "end", values=(
-                app.get('appointment_id', 'N/A'),
-                app.get('date', 'N/A'),
-                app.get('time', 'N/A'),
-                app.get('patient_name', 'N/A'),
-                app.get('doctor_name', 'N/A'),
-                app.get('reason', 'N/A')[:20] + "..." if len(app.get('reason', '')) > 20 else app.get('reason', 'N/A'),
-                app.get('status', 'N/A')
-            ))
-        
-        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=tree_scroll.set)
+        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical")
+        # الصفوف تُجلب عند التمرير فلا يتأثر فتح الصفحة بحجم البيانات
+        VirtualTable(tree, tree_scroll, lambda offset, limit: self.hospital.get_page('appointments', offset, limit),
+                     lambda app: (
+                         app.appointment_id,
+                         app.date or 'N/A',
+                         app.time or 'N/A',
+                         *self.get_appointment_names(app),
+                         app.reason[:20] + "..." if len(app.reason) > 20 else app.reason or 'N/A',
+                         app.status
+                     ))
         
         tree.pack(side="left", fill="both", expand=True, padx=20, pady=20)
         tree_scroll.pack(side="right", fill="y", pady=20)
@@ -2031,9 +5689,7 @@ class HospitalMainApp:
                 
                 appointment_data = {
                     'patient_id': patient_id,
-                    'patient_name': patient_var.get().split(" - ")[1],
                     'doctor_id': doctor_id,
-                    'doctor_name': doctor_var.get().split(" - ")[1],
                     'date': date_entry.get(),
                     'time': time_entry.get(),
                     'reason': reason_entry.get()
@@ -2082,23 +5738,94 @@ class HospitalMainApp:
     # ==============================================
     
     def generate_patient_report(self):
-        messagebox.showinfo("Patient Report", "Patient report generation will be implemented in the next version.")
+        self.run_report('patients')
     
     def generate_inventory_report(self):
-        messagebox.showinfo("Inventory Report", "Inventory report generation will be implemented in the next version.")
+        self.run_report('inventory')
     
     def generate_daily_report(self):
-        messagebox.showinfo("Daily Report", "Daily report generation will be implemented in the next version.")
+        self.run_report('daily')
     
     def generate_prescription_report(self):
-        messagebox.showinfo("Prescription Report", "Prescription report generation will be implemented in the next version.")
+        self.run_report('prescriptions')
+    
+    def run_report(self, report):
+        path = filedialog.asksaveasfilename(
+            title="Save Report",
+            initialfile=f"{report}_report.csv",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("PDF", "*.pdf")]
+        )
+        if not path:
+            return
+        
+        dialog = ctk.CTkToplevel(self.app)
+        dialog.title("Generating Report")
+        dialog.geometry("400x160")
+        dialog.resizable(False, False)
+        dialog.configure(fg_color=COLORS["secondary_dark"])
+        
+        status_label = ctk.CTkLabel(
+            dialog,
+            text=f"Generating {os.path.basename(path)}...",
+            font=("Arial", 14),
+            text_color=COLORS["text"]
+        )
+        status_label.pack(pady=(30, 15))
+        
+        progress_bar = ctk.CTkProgressBar(dialog, width=320, progress_color=COLORS["primary"])
+        progress_bar.set(0)
+        progress_bar.pack(pady=10)
+        
+        # التقرير يُكتب في خيط خلفي والواجهة تقرأ التقدم دورياً فقط
+        state = {'done': 0, 'total': 0, 'summary': None, 'error': None}
+        
+        def progress(done, total):
+            state['done'], state['total'] = done, total
+        
+        def work():
+            try:
+                state['summary'] = ReportEngine(self.hospital).generate(report, path, progress=progress)
+            except Exception as e:
+                state['error'] = str(e)
+        
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        
+        def poll():
+            if worker.is_alive():
+                if state['total']:
+                    progress_bar.set(min(state['done'] / state['total'], 1))
+                    status_label.configure(text=f"{state['done']:,} / {state['total']:,} rows")
+                self.app.after(100, poll)
+                return
+            dialog.destroy()
+            if state['error']:
+                messagebox.showerror("Report Error", state['error'])
+            else:
+                details = "\n".join(f"{key}: {value}" for key, value in state['summary'].items())
+                messagebox.showinfo("Report Ready", f"Saved to {path}\n\n{details}")
+        
+        poll()
     
     def save_data(self):
-        success, message = self.hospital.save_data()
-        if success:
-            messagebox.showinfo("Success", message)
-        else:
-            messagebox.showerror("Error", message)
+        self.autosave.flush_now()
+        self.autosave_label.configure(text="💾 Saving...")
+    
+    def poll_autosave(self):
+        # القراءة من الخيط الرئيسي فقط لأن Tk لا يقبل التحديث من خيوط أخرى
+        worker = self.autosave
+        if worker.flush_count != self._reported_flushes:
+            self._reported_flushes = worker.flush_count
+            success, message = worker.last_result
+            if success:
+                self.autosave_label.configure(text=f"💾 Saved · {worker.last_latency * 1000:.0f} ms")
+            else:
+                self.autosave_label.configure(text="⚠️ Save failed")
+                messagebox.showerror("Error", message)
+        elif worker.pending_changes:
+            self.autosave_label.configure(text=f"💾 {worker.pending_changes} unsaved")
+        self.app.after(1000, self.poll_autosave)
     
     def load_data(self):
         success, message = self.hospital.load_data()
@@ -2128,11 +5855,19 @@ class HospitalMainApp:
                             return self.show_appointments
         return None
     
+    def close(self):
+        self.hospital.remove_stock_listener(self.queue_stock_alert)
+        self.autosave.stop()
+        self.app.destroy()
+    
     def logout(self):
+        self.hospital.remove_stock_listener(self.queue_stock_alert)
+        self.autosave.stop()
         self.hospital.logout()
         self.app.destroy()
         
-        login_app = HospitalLoginSystem()
+        # نفس النظام ونفس التخزين: نظام جديد كان سيبدأ ببيانات العينة فوق سجل مرتبط بالبيانات الفعلية
+        login_app = HospitalLoginSystem(hospital=self.hospital)
         login_app.run()
     
     def run(self):
@@ -2142,9 +5877,65 @@ class HospitalMainApp:
 # التشغيل الرئيسي
 # ==============================================
 
+def create_storage(kind, data_dir, durability="normal"):
+    if kind == "sqlite":
+        return SqliteStorage(os.path.join(data_dir, "hospital.db"), durability=durability)
+    return JsonStorage(data_dir, durability=durability)
+
 def main():
+    parser = argparse.ArgumentParser(description="Golden Care Hospital Management System")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument("--durability", choices=JsonStorage.DURABILITY_MODES, default="normal",
+                        help="off: fastest, normal: fsync snapshots, full: also fsync every journal flush")
+    parser.add_argument("--roles", help="JSON file with custom role definitions")
+    parser.add_argument("--serve", action="store_true", help="run the HTTP/JSON API server instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--import", dest="import_file", nargs=2, metavar=("COLLECTION", "FILE"),
+                        help="bulk import patients, doctors, medicines or appointments from a .csv or .jsonl file and exit")
+    parser.add_argument("--validate", dest="validate_file", nargs=2, metavar=("COLLECTION", "FILE"),
+                        help="check a file against the import rules without importing it")
+    parser.add_argument("--error-report", help="write every import/validation error to this JSON-lines file")
+    args = parser.parse_args()
+    if args.roles:
+        ROLE_POLICY.load(args.roles)
+    
+    def open_hospital():
+        # مثل واجهة الدخول: مجلد بلا بيانات يبدأ ببيانات العينة، وفشل التحميل يوقف البرنامج
+        storage = create_storage(args.storage, args.data_dir, args.durability)
+        hospital = HospitalManagementSystem(storage)
+        if storage.has_data():
+            success, message = hospital.load_data()
+            if not success:
+                storage.close()
+                sys.exit(message)
+        return hospital
+    
+    if args.import_file or args.validate_file:
+        hospital = open_hospital()
+        storage = hospital.get_storage()
+        try:
+            if args.import_file:
+                collection, path = args.import_file
+                summary = hospital.import_records(collection, path, error_report=args.error_report)
+            else:
+                collection, path = args.validate_file
+                summary = hospital.validate_records(collection, path, error_report=args.error_report)
+        finally:
+            # ينتظر ضغط السجل الجاري في الخلفية قبل خروج العملية
+            storage.close()
+        print(json.dumps(summary, indent=2))
+        return
+    
+    if args.serve:
+        run_server(open_hospital(), args.host, args.port)
+        return
+    
+    if ctk is None:
+        parser.error("the GUI needs customtkinter; --serve, --import and --validate work without it")
     print("🏥 Starting Golden Care Hospital Management System...")
-    login_app = HospitalLoginSystem()
+    login_app = HospitalLoginSystem(create_storage(args.storage, args.data_dir, args.durability))
     login_app.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def open_hospital(tmp_path):
+    # يفتح نظاماً على نفس المجلد في كل استدعاء، ويغلق التخزين في النهاية
+    from hospital_system import HospitalManagementSystem, create_storage
+    opened = []
+    
+    def factory(kind="json"):
+        hospital = HospitalManagementSystem(create_storage(kind, str(tmp_path)))
+        opened.append(hospital)
+        return hospital
+    
+    yield factory
+    for hospital in opened:
+        hospital.get_storage().close()
+
+
+@pytest.fixture
+def hospital(open_hospital):
+    hospital = open_hospital()
+    assert hospital.save_data()[0]
+    return hospital
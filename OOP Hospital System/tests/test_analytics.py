@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+MEDICINE = {'medicine_id': "M100", 'name': "Ibuprofen", 'price': 10, 'quantity': 40,
+            'category': "Analgesics", 'dosage': "400mg"}
+
+
+def expected_stock_value(hospital):
+    totals = {}
+    for medicine in hospital.get_medicines_list():
+        totals[medicine.category] = totals.get(medicine.category, 0) + medicine.price * medicine.quantity
+    return totals
+
+
+def test_store_matches_the_records(hospital):
+    analytics = hospital.get_analytics()
+    assert analytics.stock_value_by_category() == pytest.approx(expected_stock_value(hospital))
+    assert sum(analytics.patients_by_gender().values()) == hospital.count('patients')
+    assert analytics.age_distribution()["30-44"] == 1
+    assert analytics.stock_value("Cardiac") == 30 * 150
+
+
+def test_writes_update_the_built_store(hospital):
+    analytics = hospital.get_analytics()
+    assert hospital.add_medicine(dict(MEDICINE))[0]
+    assert hospital.adjust_stock("M001", -100)[0]
+    assert hospital.schedule_appointment({'patient_id': "P001", 'doctor_id': "D004",
+                                          'date': "2026-11-02", 'time': "10:00"})[0]
+    assert analytics.stock_value_by_category() == pytest.approx(expected_stock_value(hospital))
+    assert "M100" in analytics.low_stock(50)
+    assert analytics.appointments_by_specialty("2026-11-01", "2026-11-30")["Pediatrics"] == 1
+    assert analytics.appointments_by_specialty(status="Cancelled")["Pediatrics"] == 0
+
+
+def test_writes_during_the_build_are_not_lost(hospital, monkeypatch):
+    iter_records = hospital.iter_records
+    
+    def iter_records_then_write(collection, fields=None):
+        yield from iter_records(collection, fields)
+        if collection == 'medicines':
+            # المخزن قرأ الأدوية للتو: هذه الكتابات تصل أثناء بنائه
+            assert hospital.add_medicine(dict(MEDICINE))[0]
+            assert hospital.adjust_stock("M002", -50)[0]
+    
+    monkeypatch.setattr(hospital, 'iter_records', iter_records_then_write)
+    analytics = hospital.get_analytics()
+    assert analytics.stock_value_by_category() == pytest.approx(expected_stock_value(hospital))
+    assert analytics.low_stock(50) == ["M100"]
+
+
+def test_unknown_labels_do_not_grow_the_store(hospital):
+    analytics = hospital.get_analytics()
+    assert analytics.stock_value("No Such Category") == 0
+    assert "No Such Category" not in analytics.stock_value_by_category()
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_bookings_take_each_slot_once(hospital):
+    from hospital_system import AsyncHospitalService
+
+    async def scenario():
+        async with AsyncHospitalService(hospital) as service:
+            doctor, nurse = await asyncio.gather(service.login("doctor", "doc123"), service.login("nurse", "nurse123"))
+            assert await service.login("doctor", "wrong") is None
+            bookings = [service.schedule_appointment({'patient_id': "P001", 'doctor_id': "D001",
+                                                      'date': "2026-11-02", 'time': "10:00"},
+                                                     doctor if i % 2 else nurse)
+                        for i in range(10)]
+            results = await asyncio.gather(*bookings)
+            return results, await service.get_appointments_on("2026-11-02")
+
+    results, appointments = run(scenario())
+    successes = [success for success, _ in results]
+    assert successes.count(True) == 1 and len(appointments) == 1
+    # كل طلب يحمل مستخدمه لا آخر من سجّل الدخول
+    assert appointments[0].created_by == ("doctor" if successes.index(True) % 2 else "nurse")
+    assert hospital.get_current_user() is None
+
+
+def test_saves_requested_together_share_one_write(hospital, monkeypatch):
+    from hospital_system import AsyncHospitalService
+    calls = []
+    save_data = hospital.save_data
+
+    def slow_save():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return save_data()
+
+    monkeypatch.setattr(hospital, 'save_data', slow_save)
+
+    async def scenario():
+        service = AsyncHospitalService(hospital)
+        results = await asyncio.gather(*(service.save() for _ in range(5)))
+        await service.close()
+        return results
+
+    results = run(scenario())
+    assert all(success for success, _ in results)
+    # حفظ للدفعة كلها ثم حفظ الإغلاق
+    assert len(calls) == 2
+    assert all(name.startswith("hospital-io") for name in calls)
+
+
+def test_close_saves_pending_changes(open_hospital):
+    from hospital_system import AsyncHospitalService
+    hospital = open_hospital()
+    assert hospital.save_data()[0]
+
+    async def scenario():
+        async with AsyncHospitalService(hospital) as service:
+            assert (await service.add_patient({'patient_id': "P100", 'name': "Mona Adel", 'age': 41,
+                                               'gender': "Female", 'phone': "01001239876"}))[0]
+            assert (await service.adjust_stock("M001", -7))[0]
+
+    run(scenario())
+    hospital.get_storage().close()
+    reloaded = open_hospital()
+    assert reloaded.load_data()[0]
+    assert reloaded.get_patient("P100").name == "Mona Adel"
+    assert reloaded.get_medicine("M001").quantity == 493
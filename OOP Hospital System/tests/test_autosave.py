@@ -0,0 +1,66 @@
+import time
+
+from hospital_system import AutosaveWorker
+
+
+def wait_until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_a_burst_of_changes_is_saved_once(hospital, open_hospital):
+    worker = AutosaveWorker(hospital, delay=0.1, max_delay=5.0).start()
+    try:
+        for _ in range(50):
+            assert hospital.adjust_stock("M001", -1)[0]
+        assert wait_until(lambda: worker.flush_count == 1)
+        time.sleep(0.2)
+        assert (worker.flush_count, worker.changes_saved, worker.pending_changes) == (1, 50, 0)
+        assert worker.last_result[0]
+    finally:
+        worker.stop()
+    reloaded = open_hospital()
+    assert reloaded.load_data()[0]
+    assert reloaded.get_medicine("M001").quantity == 450
+
+
+def test_steady_changes_are_saved_within_the_max_delay(hospital):
+    worker = AutosaveWorker(hospital, delay=0.2, max_delay=0.3).start()
+    try:
+        # تعديل كل 50 مللي ثانية لا يترك فترة هدوء، فالحد الأقصى وحده يفرض الحفظ
+        started = time.monotonic()
+        while time.monotonic() - started < 1.0:
+            assert hospital.adjust_stock("M002", -1)[0]
+            time.sleep(0.05)
+        assert worker.flush_count >= 2
+    finally:
+        worker.stop()
+    assert worker.pending_changes == 0
+
+
+def test_stop_saves_what_is_left(hospital, open_hospital):
+    worker = AutosaveWorker(hospital, delay=60.0, max_delay=60.0).start()
+    assert hospital.adjust_stock("M003", 5)[0]
+    assert wait_until(lambda: worker.pending_changes == 1)
+    assert worker.flush_count == 0
+    worker.stop()
+    assert (worker.flush_count, worker.changes_saved) == (1, 1)
+    assert hospital.adjust_stock("M003", 5)[0]
+    assert worker.pending_changes == 0
+    reloaded = open_hospital()
+    assert reloaded.load_data()[0]
+    assert reloaded.get_medicine("M003").quantity == 155
+
+
+def test_flush_now_saves_without_waiting(hospital):
+    worker = AutosaveWorker(hospital, delay=60.0, max_delay=60.0).start()
+    try:
+        worker.flush_now()
+        assert wait_until(lambda: worker.flush_count == 1)
+        assert worker.changes_saved == 0 and worker.average_latency is not None
+    finally:
+        worker.stop()
@@ -0,0 +1,86 @@
+import base64
+import http.client
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def api(hospital):
+    from hospital_system import HospitalHTTPServer
+    server = HospitalHTTPServer(("127.0.0.1", 0), hospital)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def request(method, path, body=None, user=("admin", "admin123"), headers=None):
+        headers = dict(headers or {})
+        if user:
+            headers['Authorization'] = "Basic " + base64.b64encode(":".join(user).encode()).decode()
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = "application/json"
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            payload = response.read()
+            return response.status, dict(response.getheaders()), json.loads(payload) if payload else None
+        finally:
+            connection.close()
+
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_need_valid_credentials(api):
+    status, headers, payload = api("GET", "/api/patients", user=None)
+    assert status == 401 and headers['WWW-Authenticate'] == 'Basic realm="hospital"'
+    assert api("GET", "/api/patients", user=("admin", "wrong"))[0] == 401
+    assert api("POST", "/api/save", {}, user=None)[0] == 401
+    assert api("GET", "/api/patients")[0] == 200
+
+
+def test_unchanged_resources_answer_304(api):
+    status, headers, payload = api("GET", "/api/patients/P001")
+    assert status == 200 and payload['patient_id'] == "P001"
+    status, _, payload = api("GET", "/api/patients/P001", headers={'If-None-Match': headers['ETag']})
+    assert status == 304 and payload is None
+    assert api("POST", "/api/medicines/M001/stock", {'delta': -1})[0] == 200
+    assert api("GET", "/api/medicines/M001", headers={'If-None-Match': headers['ETag']})[0] == 200
+
+
+def test_pages_walk_the_whole_collection(api):
+    _, _, first = api("GET", "/api/medicines?limit=5")
+    assert (first['total'], first['next_offset'], len(first['items'])) == (8, 5, 5)
+    _, _, second = api("GET", "/api/medicines?offset=5&limit=5")
+    assert second['next_offset'] is None
+    ids = [item['medicine_id'] for item in first['items'] + second['items']]
+    assert ids == [f"M00{i}" for i in range(1, 9)]
+    assert api("GET", "/api/medicines?limit=ten")[0] == 400
+
+
+@pytest.mark.parametrize("path, body, status, error", [
+    ("/api/patients", {'patient_id': "P100", 'name': "Mona Adel", 'gender': "Female", 'phone': "01001239876"},
+     400, "Missing required field 'age'"),
+    ("/api/patients", {'patient_id': "P001", 'name': "Mona Adel", 'age': 41, 'gender': "Female",
+                       'phone': "01001239876"}, 409, "ID 'P001' already exists"),
+    ("/api/prescriptions", {'patient_id': "P001", 'items': [{'medicine_id': "M001", 'quantity': "2"}]},
+     400, "Quantity must be positive"),
+    ("/api/medicines/M001/stock", {'delta': 2.5}, 400, "delta must be an integer"),
+    ("/api/medicines/M001/stock", {'delta': "3"}, 400, "delta must be an integer"),
+    ("/api/medicines/M001/stock", {}, 400, "delta must be an integer"),
+])
+def test_invalid_writes_are_rejected(api, hospital, path, body, status, error):
+    assert api("POST", path, body)[::2] == (status, {'error': error})
+    assert hospital.get_medicine("M001").quantity == 500
+
+
+def test_writes_are_checked_against_the_role(api, hospital):
+    prescription = {'patient_id': "P001", 'items': [{'medicine_id': "M001", 'quantity': 2}]}
+    status, _, payload = api("POST", "/api/prescriptions", prescription, user=("doctor", "doc123"))
+    assert status == 201 and hospital.get_prescription(payload['id']).prescribed_by == "doctor"
+    assert api("POST", "/api/prescriptions", prescription, user=("reception", "reception123"))[0] == 403
+    assert api("POST", "/api/medicines/M001/stock", {'delta': 5}, user=("doctor", "doc123"))[0] == 403
+    assert hospital.get_medicine("M001").quantity == 498
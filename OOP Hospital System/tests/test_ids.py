@@ -0,0 +1,65 @@
+import gc
+import os
+import threading
+import weakref
+
+import pytest
+
+import hospital_system
+from hospital_system import IdGenerator
+
+
+def test_ids_are_unique_and_sorted_across_threads():
+    generator = IdGenerator("A")
+    batches = []
+
+    def worker():
+        batches.append([generator.next_id() for _ in range(2000)])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id_ for batch in batches for id_ in batch}) == 16000
+    assert all(batch == sorted(batch) for batch in batches)
+    assert all(len(id_) == 27 and id_.startswith("A") for id_ in batches[0])
+
+
+def test_ids_keep_increasing_when_the_clock_stands_still(monkeypatch):
+    monkeypatch.setattr(hospital_system, 'time_ns', lambda: 1_700_000_000_000_000_000)
+    generator = IdGenerator("R")
+    ids = [generator.next_id() for _ in range(100)]
+    # نفاد البتات العشوائية ينقل المولد إلى المللي ثانية التالية
+    generator._random = (1 << IdGenerator.RANDOM_BITS) - 1
+    ids.append(generator.next_id())
+    assert ids == sorted(set(ids))
+    assert ids[-1][1:11] > ids[0][1:11]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_forked_children_do_not_repeat_the_parent_ids(monkeypatch):
+    # الوقت ثابت: بدون إعادة البذر يعيد الابن نفس المعرف التالي للأب
+    monkeypatch.setattr(hospital_system, 'time_ns', lambda: 1_700_000_000_000_000_000)
+    generator = IdGenerator("A")
+    generator.next_id()
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        os.write(write_end, generator.next_id().encode())
+        os._exit(0)
+    os.close(write_end)
+    child_id = os.read(read_end, 64).decode()
+    os.close(read_end)
+    os.waitpid(pid, 0)
+    assert child_id and child_id != generator.next_id()
+
+
+def test_fork_hook_does_not_keep_generators_alive():
+    generator = IdGenerator("A")
+    assert generator in hospital_system._ID_GENERATORS
+    ref = weakref.ref(generator)
+    del generator
+    gc.collect()
+    assert ref() is None
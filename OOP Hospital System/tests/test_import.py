@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+PATIENTS_CSV = """patient_id,name,age,gender,phone,address
+P100,Nour Hassan,31,Female,0111 222 3333,Cairo
+P101,Omar Adel,abc,Male,01112223334,Giza
+P102,,40,Male,01112223335,
+P103,Laila Samir,22,Female,(011) 1222-3333,Aswan
+P100,Nour Again,31,Female,01199999999,Cairo
+P104,Karim Fathy,52,Male,12ab,Luxor
+P001,Existing Id,60,Male,01188888888,Tanta
+P105,Hana Youssef,19,Female,01005556677,Suez
+P106,Yara Mostafa,27,Female,01177777777,Minya
+"""
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_csv_import_reports_every_rejected_row(hospital, tmp_path):
+    path = write(tmp_path, "patients.csv", PATIENTS_CSV)
+    report = str(tmp_path / "errors.jsonl")
+    summary = hospital.import_records('patients', path, error_report=report)
+    
+    assert (summary['rows'], summary['imported'], summary['invalid'], summary['duplicates']) == (9, 2, 3, 4)
+    assert summary['errors_by_rule'] == {'number': 1, 'required': 1, 'phone_format': 1, 'duplicate': 4}
+    assert hospital.get_patient("P100").name == "Nour Hassan"
+    assert hospital.get_patient("P106") is not None
+    assert hospital.get_patient("P103") is None
+    
+    with open(report, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert entries == summary['errors']
+    assert [(entry['id'], entry['field'], entry['rule']) for entry in entries] == [
+        ("P101", 'age', 'number'),
+        ("P102", 'name', 'required'),
+        ("P103", 'phone', 'duplicate'),
+        ("P100", 'patient_id', 'duplicate'),
+        ("P104", 'phone', 'phone_format'),
+        ("P001", 'patient_id', 'duplicate'),
+        ("P105", 'phone', 'duplicate'),
+    ]
+
+
+def test_dry_run_adds_nothing(hospital, tmp_path):
+    path = write(tmp_path, "patients.csv", PATIENTS_CSV)
+    before = hospital.count('patients')
+    summary = hospital.validate_records('patients', path)
+    assert (summary['valid'], summary['imported']) == (2, 0)
+    assert hospital.count('patients') == before
+    assert hospital.get_patient("P100") is None
+
+
+def test_jsonl_appointments_reject_conflicts_and_bad_references(hospital, tmp_path):
+    rows = [
+        {'appointment_id': "A900", 'patient_id': "P001", 'doctor_id': "D001", 'date': "2026-12-01", 'time': "09:00"},
+        {'appointment_id': "A901", 'patient_id': "P002", 'doctor_id': "D001", 'date': "2026-12-01", 'time': "09:15"},
+        {'appointment_id': "A902", 'patient_id': "P002", 'doctor_id': "D001", 'date': "2026-12-01", 'time': "09:30"},
+        {'appointment_id': "A903", 'patient_id': "P999", 'doctor_id': "D002", 'date': "2026-12-01", 'time': "09:00"},
+        {'appointment_id': "A904", 'patient_id': "P003", 'doctor_id': "D002", 'date': "2026-12-01", 'time': "9am"},
+    ]
+    text = "\n".join(json.dumps(row) for row in rows) + "\n{not json\n"
+    summary = hospital.import_records('appointments', write(tmp_path, "appointments.jsonl", text))
+    
+    assert (summary['rows'], summary['imported'], summary['conflicts'], summary['invalid']) == (6, 2, 1, 3)
+    assert summary['errors_by_rule'] == {'conflict': 1, 'reference': 1, 'time_format': 1, 'format': 1}
+    assert summary['errors'][0]['message'] == "Doctor is already booked by 'A900'"
+    assert [appointment.appointment_id for appointment in hospital.get_appointments_on("2026-12-01")] == ["A900", "A902"]
+    assert "A902" in hospital.get_patient("P002").appointments
+    assert hospital.schedule_appointment({'patient_id': "P003", 'doctor_id': "D001",
+                                          'date': "2026-12-01", 'time': "09:40"})[0] is False
+
+
+def test_imported_records_survive_reload(open_hospital, tmp_path):
+    hospital = open_hospital()
+    assert hospital.save_data()[0]
+    assert hospital.import_records('patients', write(tmp_path, "patients.csv", PATIENTS_CSV))['imported'] == 2
+    reloaded = open_hospital()
+    assert reloaded.load_data()[0]
+    assert reloaded.get_patient("P106").phone == "01177777777"
+
+
+def test_unknown_collection_and_format(hospital, tmp_path):
+    with pytest.raises(ValueError):
+        hospital.import_records('users', write(tmp_path, "users.csv", "username\n"))
+    with pytest.raises(ValueError):
+        hospital.import_records('patients', write(tmp_path, "patients.xml", "<patients/>"))
+
+
+def test_cli_stops_when_saved_data_cannot_be_loaded(hospital, tmp_path, monkeypatch, capsys):
+    from hospital_system import main
+    (tmp_path / "patients.json").write_text("{not json", encoding='utf-8')
+    path = write(tmp_path, "patients.csv", PATIENTS_CSV)
+    monkeypatch.setattr('sys.argv', ["hospital_system.py", "--data-dir", str(tmp_path), "--validate", "patients", path])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert str(exit_info.value).startswith("Error loading data:")
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,47 @@
+import threading
+
+PATIENT = {'patient_id': "P100", 'name': "Mona Adel", 'age': 41, 'gender': "Female",
+           'phone': "01001239876", 'address': "Cairo"}
+
+
+def test_counts_follow_writes(hospital):
+    assert hospital.get_dashboard_stats()['patients'] == 3
+    assert hospital.add_patient(dict(PATIENT))[0]
+    assert hospital.schedule_appointment({'patient_id': "P100", 'doctor_id': "D001",
+                                          'date': "2026-11-02", 'time': "10:00"})[0]
+    assert hospital.create_prescription({'patient_id': "P100",
+                                         'items': [{'medicine_id': "M001", 'quantity': 3},
+                                                   {'medicine_id': "M002", 'quantity': 2}]})[0]
+    stats = hospital.get_dashboard_stats("2026-11-02")
+    assert (stats['patients'], stats['appointments'], stats['prescriptions']) == (4, 1, 1)
+    assert stats['appointments_today'] == 1
+    assert hospital.get_dashboard_stats()['dispensed_today'] == 5
+
+
+def test_first_count_during_a_write_counts_it_once(hospital):
+    # العد الأول يُطلب بين إضافة المريض إلى السجل وحدث الكتابة
+    index_patient = hospital._index_patient
+    counts, readers = [], []
+    
+    def index_then_count(patient):
+        index_patient(patient)
+        reader = threading.Thread(target=lambda: counts.append(hospital.get_dashboard_stats()['patients']))
+        reader.start()
+        # العد ينتظر انتهاء الكتابة، فلا ننتظره هنا أكثر من مهلة قصيرة
+        reader.join(0.2)
+        readers.append(reader)
+    
+    hospital._index_patient = index_then_count
+    assert hospital.add_patient(dict(PATIENT))[0]
+    readers[0].join()
+    assert counts == [4]
+    assert hospital.get_dashboard_stats()['patients'] == 4
+
+
+def test_reload_recounts_from_storage(hospital, open_hospital):
+    assert hospital.add_patient(dict(PATIENT))[0]
+    assert hospital.get_dashboard_stats()['patients'] == 4
+    assert hospital.save_data()[0]
+    reloaded = open_hospital()
+    assert reloaded.load_data()[0]
+    assert reloaded.get_dashboard_stats()['patients'] == 4
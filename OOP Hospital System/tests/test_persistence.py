@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+
+import pytest
+
+from hospital_system import HospitalManagementSystem, JsonStorage, Patient
+
+PATIENT = {'patient_id': "P100", 'name': "Mona Adel", 'age': 41, 'gender': "Female",
+           'phone': "01001239876", 'address': "Cairo"}
+
+
+def new_patient(patient_id):
+    return dict(PATIENT, patient_id=patient_id)
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_saved_changes_survive_reload(open_hospital, kind):
+    hospital = open_hospital(kind)
+    assert hospital.save_data()[0]
+    assert hospital.add_patient(dict(PATIENT))[0]
+    assert hospital.schedule_appointment({'patient_id': "P100", 'doctor_id': "D001",
+                                          'date': "2026-11-02", 'time': "10:00"})[0]
+    assert hospital.create_prescription({'patient_id': "P100",
+                                         'items': [{'medicine_id': "M001", 'quantity': 5}]})[0]
+    assert hospital.adjust_stock("M002", -20)[0]
+    assert hospital.save_data()[0]
+    hospital.get_storage().close()
+    
+    reloaded = open_hospital(kind)
+    assert reloaded.load_data()[0]
+    patient = reloaded.get_patient("P100")
+    assert (patient.name, patient.age, patient.phone) == ("Mona Adel", 41, "01001239876")
+    assert len(patient.appointments) == 1
+    assert len(patient.prescriptions) == 1
+    assert reloaded.get_medicine("M001").quantity == 495
+    assert reloaded.get_medicine("M002").quantity == 180
+    assert [appointment.patient_id for appointment in reloaded.get_appointments_on("2026-11-02")] == ["P100"]
+    # جدول الطبيب يُبنى من جديد عند التحميل فيُكتشف التعارض
+    assert not reloaded.schedule_appointment({'patient_id': "P001", 'doctor_id': "D001",
+                                              'date': "2026-11-02", 'time': "10:15"})[0]
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_iter_records_reads_unloaded_records(open_hospital, kind):
+    hospital = open_hospital(kind)
+    assert hospital.add_patient(dict(PATIENT))[0]
+    assert hospital.save_data()[0]
+    hospital.get_storage().close()
+    
+    reloaded = open_hospital(kind)
+    assert reloaded.load_data()[0]
+    assert reloaded.get_patient("P001").name
+    records = list(reloaded.iter_records('patients', ('patient_id', 'name')))
+    assert sorted(record['patient_id'] for record in records) == ["P001", "P002", "P003", "P100"]
+    assert {record['patient_id']: record['name'] for record in records}["P100"] == "Mona Adel"
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_records_are_built_only_when_first_used(open_hospital, monkeypatch, kind):
+    hospital = open_hospital(kind)
+    assert hospital.save_data()[0]
+    hospital.get_storage().close()
+    built = []
+    from_dict = Patient.from_dict
+    monkeypatch.setattr(Patient, 'from_dict', classmethod(lambda cls, data: built.append(data['patient_id'])
+                                                           or from_dict(data)))
+    
+    reloaded = open_hospital(kind)
+    assert reloaded.load_data()[0]
+    assert reloaded.count('patients') == 3 and built == []
+    assert reloaded.get_patient("P002").name == "Fatma Ali"
+    assert reloaded.get_patient("P002") is reloaded.get_patient("P002")
+    assert [patient.patient_id for patient in reloaded.get_page('patients', 0, 1)[0]] == ["P001"]
+    assert built == ["P002", "P001"]
+    assert reloaded.save_data()[0]
+    assert sorted(record['patient_id'] for record in reloaded.iter_records('patients')) == ["P001", "P002", "P003"]
+    assert built == ["P002", "P001"]
+
+
+def test_save_refuses_to_overwrite_unloaded_data(hospital, open_hospital):
+    assert hospital.add_patient(dict(PATIENT))[0]
+    assert hospital.save_data()[0]
+    
+    fresh = open_hospital()
+    success, message = fresh.save_data()
+    assert not success
+    assert "not loaded" in message
+
+
+def test_replay_skips_journal_lines_already_in_snapshot(hospital, tmp_path, open_hospital):
+    assert hospital.add_patient(dict(PATIENT))[0]
+    assert hospital.save_data()[0]
+    hospital.get_storage().close()
+    with open(tmp_path / "snapshot.json") as f:
+        snapshot_seq = json.load(f)['seq']
+    # سطر لكيان موجود في اللقطة، كما يحدث عند إضافة متزامنة مع كتابة اللقطة
+    with open(tmp_path / "journal.log", 'a') as f:
+        f.write(json.dumps({'seq': snapshot_seq + 1, 'kind': 'patient', 'data': dict(PATIENT)}) + "\n")
+    
+    reloaded = open_hospital()
+    assert reloaded.load_data()[0]
+    assert reloaded.count('patients') == 4
+
+
+def test_compaction_skips_journal_lines_already_in_snapshot(tmp_path):
+    hospital = HospitalManagementSystem(JsonStorage(str(tmp_path), compact_threshold=1))
+    assert hospital.save_data()[0]
+    assert hospital.add_patient(dict(PATIENT))[0]
+    assert hospital.schedule_appointment({'patient_id': "P100", 'doctor_id': "D001",
+                                          'date': "2026-11-02", 'time': "10:00"})[0]
+    # الحفظ يدوّر السجل ويدمجه في اللقطة
+    assert hospital.save_data()[0]
+    hospital.get_storage().close()
+    with open(tmp_path / "snapshot.json") as f:
+        snapshot_seq = json.load(f)['seq']
+    appointment = hospital.get_appointments_on("2026-11-02")[0].to_dict()
+    with open(tmp_path / "journal.log", 'a') as f:
+        for offset, kind, data in ((1, 'patient', PATIENT), (2, 'appointment', appointment)):
+            f.write(json.dumps({'seq': snapshot_seq + offset, 'kind': kind, 'data': data}) + "\n")
+    
+    compacting = HospitalManagementSystem(JsonStorage(str(tmp_path), compact_threshold=1))
+    assert compacting.load_data()[0]
+    assert compacting.save_data()[0]
+    compacting.get_storage().close()
+    assert os.path.getsize(tmp_path / "journal.log") == 0
+    
+    reloaded = HospitalManagementSystem(JsonStorage(str(tmp_path)))
+    assert reloaded.load_data()[0]
+    assert reloaded.get_patient("P100").appointments == [appointment['appointment_id']]
+    assert reloaded.get_doctor("D001").appointments == [appointment['appointment_id']]
+    reloaded.get_storage().close()
+
+
+def test_adds_during_snapshots_and_compaction_are_not_lost(tmp_path):
+    hospital = HospitalManagementSystem(JsonStorage(str(tmp_path), compact_threshold=20))
+    assert hospital.save_data()[0]
+    added = []
+    stop = threading.Event()
+    
+    def writer():
+        index = 0
+        while not stop.is_set() or index < 200:
+            patient_id = f"R{index:05d}"
+            if hospital.add_patient(new_patient(patient_id))[0]:
+                added.append(patient_id)
+            index += 1
+    
+    thread = threading.Thread(target=writer)
+    thread.start()
+    for _ in range(20):
+        assert hospital.save_data()[0]
+    stop.set()
+    thread.join()
+    assert hospital.save_data()[0]
+    hospital.get_storage().close()
+    
+    reloaded = HospitalManagementSystem(JsonStorage(str(tmp_path)))
+    assert reloaded.load_data()[0]
+    assert reloaded.count('patients') == 3 + len(added)
+    assert all(patient_id in reloaded.get_ids('patients') for patient_id in added)
+    reloaded.get_storage().close()
+
+
+def test_interrupted_snapshot_keeps_previous_state(hospital, tmp_path, open_hospital):
+    assert hospital.add_patient(dict(PATIENT))[0]
+    assert hospital.save_data()[0]
+    hospital.get_storage().close()
+    # ملف مؤقت متبقٍ من كتابة لم تكتمل لا يُقرأ بدل اللقطة الصحيحة
+    with open(tmp_path / "patients.json.tmp", 'w') as f:
+        f.write("[\n{\"patient_id\":")
+    
+    reloaded = open_hospital()
+    assert reloaded.load_data()[0]
+    assert reloaded.get_patient("P100").name == "Mona Adel"
+    assert not os.path.exists(tmp_path / "patients.json.tmp")
@@ -0,0 +1,31 @@
+from hospital_system import EntityRegistry, Medicine
+
+
+def make_registry(count):
+    registry = EntityRegistry('medicine_id')
+    registry.add_many([Medicine(f"M{i:03d}", f"Drug {i}", 10, 5, "General") for i in range(count)])
+    return registry
+
+
+def test_remove_keeps_pages_and_indexing_consistent():
+    registry = make_registry(5)
+    assert registry.remove("M001").medicine_id == "M001"
+    assert registry.remove("M001") is None
+    # آخر عنصر يأخذ مكان المحذوف
+    assert [m.medicine_id for m in registry.page(0, 10)] == ["M000", "M004", "M002", "M003"]
+    assert registry[1].medicine_id == "M004"
+    assert len(registry) == 4
+    registry.remove("M003")
+    registry.add(Medicine("M010", "Drug 10", 10, 5, "General"))
+    assert [m.medicine_id for m in registry[:]] == ["M000", "M004", "M002", "M010"]
+    for medicine_id in ["M000", "M004", "M002", "M010"]:
+        assert registry.remove(medicine_id) is not None
+    assert registry.page(0, 10) == [] and len(registry) == 0
+
+
+def test_reset_replaces_slots():
+    registry = make_registry(3)
+    registry.reset([Medicine("M100", "Drug", 10, 5, "General"), Medicine("M101", "Drug", 10, 5, "General")])
+    assert registry.remove("M100") is not None
+    assert [m.medicine_id for m in registry.page(0, 10)] == ["M101"]
+    assert registry.remove("M000") is None
@@ -0,0 +1,79 @@
+import csv
+import datetime
+import json
+
+import pytest
+
+import hospital_system
+from hospital_system import ReportEngine
+
+
+def test_inventory_report_as_csv(hospital, tmp_path):
+    assert hospital.adjust_stock("M008", -80)[0]
+    path = tmp_path / "inventory.csv"
+    summary = ReportEngine(hospital).generate('inventory', str(path))
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['medicine_id', 'name', 'category', 'quantity', 'price', 'stock_value']
+    assert rows[1] == ['M001', 'Paracetamol', 'Analgesics', '500', '15.00', '7500.00']
+    assert rows[8] == ['M008', 'Citalopram', 'Antidepressants', '40', '55.00', '2200.00']
+    assert rows[9] == []
+    assert rows[10:12] == [['total_medicines', '8'], ['total_units', '2020']]
+    assert (summary['stock_value'], summary['low_stock_items']) == (54650.0, 1)
+    assert summary['value_by_category']['Cardiac'] == 4500.0
+
+
+def test_patient_report_as_jsonl_with_progress(hospital, tmp_path, monkeypatch):
+    assert hospital.schedule_appointment({'patient_id': "P001", 'doctor_id': "D001",
+                                          'date': "2026-11-02", 'time': "10:00"})[0]
+    assert hospital.create_prescription({'patient_id': "P001",
+                                         'items': [{'medicine_id': "M001", 'quantity': 2}]})[0]
+    monkeypatch.setattr(ReportEngine, 'PROGRESS_EVERY', 2)
+    progress = []
+    path = tmp_path / "patients.jsonl"
+    ReportEngine(hospital).generate('patients', str(path), progress=lambda done, total: progress.append((done, total)))
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [line['patient_id'] for line in lines[:3]] == ["P001", "P002", "P003"]
+    assert (lines[0]['appointments'], lines[0]['prescriptions'], lines[1]['appointments']) == (1, 1, 0)
+    assert lines[3] == {'summary': {'total_patients': 3, 'average_age': 36.0, 'genders': {'Male': 2, 'Female': 1},
+                                    'total_appointments': 1, 'total_prescriptions': 1}}
+    assert progress == [(2, 3), (3, 3)]
+
+
+def test_daily_report_lists_the_days_appointments_and_prescriptions(hospital, tmp_path):
+    today = datetime.date.today()
+    for time in ("11:00", "09:00"):
+        assert hospital.schedule_appointment({'patient_id': "P002", 'doctor_id': "D002",
+                                              'date': today.isoformat(), 'time': time})[0]
+    assert hospital.create_prescription({'patient_id': "P002", 'doctor_id': "D002",
+                                         'items': [{'medicine_id': "M001", 'quantity': 2},
+                                                   {'medicine_id': "M002", 'quantity': 3}]})[0]
+    path = tmp_path / "daily.jsonl"
+    summary = ReportEngine(hospital).generate('daily', str(path), date=today)
+    rows = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()[:-1]]
+    assert [(row['type'], row['time']) for row in rows[:2]] == [('appointment', "09:00"), ('appointment', "11:00")]
+    assert (rows[2]['type'], rows[2]['status_or_units']) == ('prescription', 5)
+    assert summary == {'date': today.isoformat(), 'appointments': 2, 'appointments_by_status': {'Scheduled': 2},
+                       'prescriptions': 1, 'units_dispensed': 5}
+
+
+def test_prescription_report_as_pdf(hospital, tmp_path):
+    pytest.importorskip("reportlab")
+    for _ in range(60):
+        assert hospital.create_prescription({'patient_id': "P003",
+                                             'items': [{'medicine_id': "M004", 'quantity': 1}]})[0]
+    path = tmp_path / "prescriptions.pdf"
+    summary = ReportEngine(hospital).generate('prescriptions', str(path))
+    assert path.read_bytes().startswith(b"%PDF")
+    assert summary == {'total_prescriptions': 60, 'total_units': 60, 'top_medicines': {'M004': 60}}
+
+
+def test_unknown_reports_and_missing_pdf_support(hospital, tmp_path, monkeypatch):
+    engine = ReportEngine(hospital)
+    with pytest.raises(ValueError):
+        engine.generate('staff', str(tmp_path / "staff.csv"))
+    with pytest.raises(ValueError):
+        engine.generate('patients', str(tmp_path / "patients.xlsx"))
+    monkeypatch.setattr(hospital_system, 'pdf_canvas', None)
+    with pytest.raises(RuntimeError):
+        engine.generate('patients', str(tmp_path / "patients.pdf"))
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+BOOKING = {'patient_id': "P001", 'doctor_id': "D001", 'date': "2026-11-02", 'time': "10:00"}
+
+
+def book(hospital, **changes):
+    return hospital.schedule_appointment(dict(BOOKING, **changes))
+
+
+def test_overlapping_booking_is_rejected_with_next_free_slot(hospital):
+    assert book(hospital, duration=45)[0]
+    success, message = book(hospital, patient_id="P002", time="10:30")
+    assert not success
+    assert "Next free slot: 2026-11-02 10:45" in message
+
+
+def test_back_to_back_and_other_doctors_do_not_conflict(hospital):
+    assert book(hospital)[0]
+    assert book(hospital, time="10:30")[0]
+    assert book(hospital, time="09:30")[0]
+    assert book(hospital, doctor_id="D002")[0]
+    assert len(hospital.get_appointments_on("2026-11-02")) == 4
+
+
+@pytest.mark.parametrize("duration", [0, -15, "30", 45.0, True])
+def test_invalid_duration_is_rejected(hospital, duration):
+    success, message = book(hospital, duration=duration)
+    assert not success
+    assert message == "Duration must be positive"
+    assert hospital.count('appointments') == 0
+
+
+@pytest.mark.parametrize("changes, message", [
+    ({'date': "2026-13-01"}, "Date must be YYYY-MM-DD"),
+    ({'time': "25:00"}, "Time must be HH:MM"),
+    ({'patient_id': "P999"}, "Patient 'P999' not found"),
+    ({'doctor_id': "D999"}, "Doctor 'D999' not found"),
+])
+def test_invalid_booking_is_rejected(hospital, changes, message):
+    assert book(hospital, **changes) == (False, message)
+
+
+def test_concurrent_bookings_for_one_slot_admit_exactly_one(hospital):
+    results = []
+    barrier = threading.Barrier(8)
+    
+    def worker(index):
+        barrier.wait()
+        results.append(book(hospital, patient_id=f"P00{index % 3 + 1}")[0])
+    
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+
+
+def test_booking_records_the_acting_user(hospital):
+    user = hospital.authenticate("reception", "reception123")
+    assert hospital.schedule_appointment(dict(BOOKING), user)[0]
+    assert hospital.get_appointments_on("2026-11-02")[0].created_by == "reception"
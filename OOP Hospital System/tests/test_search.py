@@ -0,0 +1,39 @@
+from hospital_system import PatientSearchIndex
+
+
+def ids(patients):
+    return [patient.patient_id for patient in patients]
+
+
+def test_prefix_fuzzy_and_multi_term_queries(hospital):
+    assert ids(hospital.search_patients("moham")) == ["P001", "P003"]
+    # خطأ حرف واحد في الاسم
+    assert ids(hospital.search_patients("Mohamd")) == ["P001", "P003"]
+    assert ids(hospital.search_patients("mohamed cairo")) == ["P001"]
+    assert ids(hospital.search_patients("giza fatma")) == ["P002"]
+    assert ids(hospital.search_patients("01005556677")) == ["P003"]
+    assert hospital.search_patients("mohamed giza") == []
+    assert hospital.search_patients("  ") == []
+    assert ids(hospital.search_patients("moham", limit=1)) == ["P001"]
+
+
+def test_new_patients_are_searchable(hospital):
+    assert hospital.search_patients("mona") == []
+    assert hospital.add_patient({'patient_id': "P100", 'name': "Mona Adel", 'age': 41, 'gender': "Female",
+                                 'phone': "01001239876", 'address': "Tanta"})[0]
+    assert ids(hospital.search_patients("mona tanta")) == ["P100"]
+
+
+def test_duplicate_ids_in_one_batch_keep_the_last_record():
+    index = PatientSearchIndex()
+    index.add("P001", "Ahmed Mohamed", "01001234567", "Cairo")
+    index.add_many([("P002", "Fatma Ali", "", "Giza"),
+                    ("P002", "Fatma Hassan", "", "Aswan"),
+                    ("P003", "Mohamed Said", "", "Alexandria")])
+    assert len(index) == 3
+    assert index.search("ali") == [] and index.search("giza") == []
+    assert index.search("fatma aswan") == ["P002"]
+    assert index.search("mohamed") == ["P001", "P003"]
+    index.remove("P002")
+    assert index.search("fatma") == [] and index.search("ahmed") == ["P001"]
+    assert index._tokens == sorted(index._postings)
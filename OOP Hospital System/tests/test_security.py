@@ -0,0 +1,77 @@
+import pytest
+
+from hospital_system import (Admin, CredentialStore, Nurse, PasswordHasher, Receptionist,
+                             RolePolicy, StaffUser)
+
+# كلفة منخفضة حتى تبقى الاختبارات سريعة؛ الصيغة نفسها في الحالتين
+FAST_SCRYPT = PasswordHasher('scrypt', n=2 ** 10)
+FAST_PBKDF2 = PasswordHasher('pbkdf2_sha256', iterations=1000)
+
+
+@pytest.mark.parametrize("hasher", [FAST_SCRYPT, FAST_PBKDF2], ids=['scrypt', 'pbkdf2'])
+def test_hash_round_trip(hasher):
+    encoded = hasher.hash("s3cret")
+    assert encoded.startswith(hasher.algorithm + "$")
+    assert "s3cret" not in encoded
+    assert PasswordHasher.verify("s3cret", encoded)
+    assert not PasswordHasher.verify("S3cret", encoded)
+    assert hasher.hash("s3cret") != encoded
+    assert not hasher.needs_rehash(encoded)
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        PasswordHasher('md5')
+
+
+def test_login_upgrades_outdated_hashes():
+    store = CredentialStore(FAST_SCRYPT)
+    user = Nurse("nurse", "x")
+    user.set_password("nurse123", FAST_PBKDF2)
+    store.add(user)
+    assert store.authenticate("nurse", "wrong") is None
+    assert user.password_hash.startswith("pbkdf2_sha256$")
+    assert store.authenticate("nurse", "nurse123") is user
+    assert user.password_hash.startswith("scrypt$1024$")
+    assert store.authenticate("nurse", "nurse123") is user
+
+
+def test_unknown_user_and_duplicates():
+    store = CredentialStore(FAST_SCRYPT)
+    store.add(Admin("root", "pw"))
+    assert store.authenticate("nobody", "pw") is None
+    with pytest.raises(ValueError):
+        store.add(Receptionist("root", "pw"))
+
+
+def test_hospital_authenticate_does_not_log_in(hospital):
+    user = hospital.authenticate("doctor", "doc123")
+    assert user is not None and user.role == "doctor"
+    assert hospital.get_current_user() is None
+    assert hospital.authenticate("doctor", "admin123") is None
+
+
+@pytest.mark.parametrize("role, action, allowed", [
+    ("admin", "manage_users", True),
+    ("doctor", "manage_appointments", True),
+    ("doctor", "manage_medicines", False),
+    ("nurse", "manage_medicines", True),
+    ("doctor", "prescribe_medicines", True),
+    ("nurse", "prescribe_medicines", False),
+    ("receptionist", "view_reports", False),
+    ("janitor", "view_reports", False),
+])
+def test_role_permissions(role, action, allowed):
+    assert StaffUser("u", "p", role).can(action) is allowed
+
+
+def test_custom_roles_and_unknown_actions():
+    policy = RolePolicy()
+    policy.define_role("pharmacist", ["manage_medicines"])
+    pharmacist = StaffUser("u", "p", "pharmacist")
+    assert policy.can(pharmacist, "manage_medicines")
+    assert not policy.can(pharmacist, "manage_patients")
+    with pytest.raises(ValueError):
+        policy.define_role("pharmacist", ["fly"])
+    with pytest.raises(KeyError):
+        policy.can(pharmacist, "fly")
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+
+def prescribe(hospital, *items):
+    return hospital.create_prescription({
+        'patient_id': "P001",
+        'items': [{'medicine_id': medicine_id, 'quantity': quantity} for medicine_id, quantity in items],
+    })
+
+
+def test_prescription_dispenses_every_item(hospital):
+    assert prescribe(hospital, ("M001", 10), ("M002", 5), ("M001", 2))[0]
+    assert hospital.get_medicine("M001").quantity == 488
+    assert hospital.get_medicine("M002").quantity == 195
+
+
+def test_failed_item_leaves_all_stock_untouched(hospital):
+    success, message = prescribe(hospital, ("M001", 10), ("M008", 121))
+    assert not success
+    assert message == "Insufficient stock for 'Citalopram'"
+    assert hospital.get_medicine("M001").quantity == 500
+    assert hospital.get_medicine("M008").quantity == 120
+    assert len(hospital.get_prescriptions_list()) == 0
+
+
+@pytest.mark.parametrize("items, message", [
+    ((("M001", 0),), "Quantity must be positive"),
+    ((("M999", 1),), "Medicine 'M999' not found"),
+])
+def test_invalid_items_are_rejected(hospital, items, message):
+    assert prescribe(hospital, *items) == (False, message)
+
+
+@pytest.mark.parametrize("data, message", [
+    ({'items': [{'medicine_id': "M001", 'quantity': 1}]}, "Missing required field 'patient_id'"),
+    ({'patient_id': "P001"}, "Missing required field 'items'"),
+    ({'patient_id': "P001", 'items': []}, "Items must be a non-empty list of medicine_id and quantity"),
+    ({'patient_id': "P001", 'items': [{'medicine_id': "M001"}]},
+     "Items must be a non-empty list of medicine_id and quantity"),
+    ({'patient_id': "P001", 'items': [{'medicine_id': "M001", 'quantity': "2"}]}, "Quantity must be positive"),
+    ({'patient_id': "P001", 'items': [{'medicine_id': "M001", 'quantity': 1.5}]}, "Quantity must be positive"),
+])
+def test_malformed_prescriptions_are_rejected_before_reserving(hospital, data, message):
+    assert hospital.create_prescription(data) == (False, message)
+    assert hospital.get_medicine("M001").quantity == 500
+    assert len(hospital.get_prescriptions_list()) == 0
+
+
+def test_concurrent_prescriptions_never_oversell(hospital):
+    # 120 وحدة: 12 وصفة فقط من 20 يمكن أن تنجح
+    results = []
+    barrier = threading.Barrier(20)
+    
+    def worker():
+        barrier.wait()
+        results.append(prescribe(hospital, ("M008", 10), ("M001", 1))[0])
+    
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 12
+    assert hospital.get_medicine("M008").quantity == 0
+    assert hospital.get_medicine("M001").quantity == 488
+
+
+def test_low_stock_alerts_fire_when_crossing_the_reorder_level(hospital):
+    events = []
+    hospital.add_stock_listener(lambda event, medicine_id, quantity: events.append((event, medicine_id, quantity)))
+    assert hospital.get_low_stock() == []
+    assert hospital.adjust_stock("M008", -100)[0]
+    assert hospital.get_low_stock() == [("M008", 20)]
+    assert hospital.adjust_stock("M008", 100)[0]
+    assert events == [('low', "M008", 20), ('restocked', "M008", 120)]
+    assert hospital.count_low_stock() == 0
+
+
+def test_listener_sees_the_first_crossing_before_any_query(hospital):
+    # المستويات الكسولة يجب أن تُحمَّل عند تسجيل المستمع وإلا ضاع أول تنبيه
+    events = []
+    hospital.add_stock_listener(lambda event, medicine_id, quantity: events.append(event))
+    assert hospital.adjust_stock("M008", -100)[0]
+    assert events == ['low']
@@ -0,0 +1,22 @@
+from hospital_system import RECORD_VALIDATOR
+
+
+def test_missing_required_fields_are_reported():
+    errors = RECORD_VALIDATOR.check('patients', {'patient_id': "P100", 'name': "Mona Adel", 'phone': "01001239876"})
+    assert [(error['field'], error['rule']) for error in errors] == [('age', 'required'), ('gender', 'required')]
+    assert errors[0]['message'] == "Missing required field 'age'"
+    # الحقل الذي رفضه المستدعي لا يُبلَّغ عنه مرتين
+    assert [error['field'] for error in RECORD_VALIDATOR.check('appointments', {}, ['date'])] == [
+        'patient_id', 'doctor_id', 'time']
+
+
+def test_direct_adds_reject_missing_fields(hospital):
+    assert hospital.add_patient({'patient_id': "P100", 'name': "Mona Adel", 'gender': "Female",
+                                 'phone': "01001239876"}) == (False, "Missing required field 'age'")
+    assert hospital.add_doctor({'doctor_id': "D100", 'name': "Dr. Sami", 'phone': "01001239876"}) == (
+        False, "Missing required field 'specialty'")
+    assert hospital.add_medicine({'medicine_id': "M100", 'name': "Drug", 'price': 5, 'category': "General"}) == (
+        False, "Missing required field 'quantity'")
+    assert hospital.schedule_appointment({'patient_id': "P001", 'doctor_id': "D001", 'date': "2026-11-02"}) == (
+        False, "Missing required field 'time'")
+    assert hospital.count('patients') == 3 and hospital.count('appointments') == 0